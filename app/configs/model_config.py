@@ -1,4 +1,5 @@
 # Enum class to define different LLM (Large Language Model) names
+import os
 from enum import Enum
 
 
@@ -36,6 +37,81 @@ def get_model_name(model: LLMModelName):
     return model.value
 
 
+# Token budget for the finance context placed in the prompt, per model.
+# Kept well below each model's context window so the base prompt, chat history
+# and the answer still fit, and so prompt size (and latency) stays bounded.
+CONTEXT_TOKEN_BUDGETS = {
+    LLMModelName.GPT_4_TURBO: 24_000,
+    LLMModelName.GPT_3S5_TURBO: 6_000,
+    LLMModelName.GPT_4O: 24_000,
+    LLMModelName.LLAMA3: 3_000,
+    LLMModelName.GPT_4O_MINI: 16_000,
+    LLMModelName.GPT_5: 48_000,
+    LLMModelName.GPT_5_MINI: 32_000,
+    LLMModelName.GEMINI_2_5_PRO: 64_000,
+    LLMModelName.GEMINI_2_5_FLASH: 48_000,
+    LLMModelName.GEMINI_2_5_FLASH_LITE: 32_000,
+    LLMModelName.GEMINI_2_0_FLASH: 32_000,
+    LLMModelName.GEMINI_2_0_FLASH_LITE: 24_000,
+}
+
+
+def get_context_token_budget(model: LLMModelName) -> int:
+    """
+    Returns the finance context token budget for the given LLM model.
+
+    The FINANCE_CONTEXT_TOKEN_BUDGET environment variable overrides the
+    per-model default.
+
+    Args:
+    - model (LLMModelName): The LLM model.
+
+    Returns:
+    - int: Maximum number of tokens for the finance context.
+    """
+    override = os.getenv("FINANCE_CONTEXT_TOKEN_BUDGET")
+    if override:
+        return int(override)
+    return CONTEXT_TOKEN_BUDGETS.get(model, 8_000)
+
+
+# Approximate list price in USD per 1M (input, output) tokens, used by the
+# model router to estimate the cost of a request
+MODEL_COSTS_PER_1M = {
+    LLMModelName.GPT_4_TURBO: (10.00, 30.00),
+    LLMModelName.GPT_3S5_TURBO: (0.50, 1.50),
+    LLMModelName.GPT_4O: (2.50, 10.00),
+    LLMModelName.LLAMA3: (0.0, 0.0),
+    LLMModelName.GPT_4O_MINI: (0.15, 0.60),
+    LLMModelName.GPT_5: (1.25, 10.00),
+    LLMModelName.GPT_5_MINI: (0.25, 2.00),
+    LLMModelName.GEMINI_2_5_PRO: (1.25, 10.00),
+    LLMModelName.GEMINI_2_5_FLASH: (0.30, 2.50),
+    LLMModelName.GEMINI_2_5_FLASH_LITE: (0.10, 0.40),
+    LLMModelName.GEMINI_2_0_FLASH: (0.10, 0.40),
+    LLMModelName.GEMINI_2_0_FLASH_LITE: (0.075, 0.30),
+}
+
+
+def get_history_token_budget(model: LLMModelName) -> int:
+    """
+    Returns the token budget for the verbatim chat history sent to the model.
+
+    The HISTORY_TOKEN_BUDGET environment variable overrides the default of a
+    quarter of the model's finance context budget.
+
+    Args:
+    - model (LLMModelName): The LLM model.
+
+    Returns:
+    - int: Maximum number of tokens for recent chat messages.
+    """
+    override = os.getenv("HISTORY_TOKEN_BUDGET")
+    if override:
+        return int(override)
+    return CONTEXT_TOKEN_BUDGETS.get(model, 8_000) // 4
+
+
 # Enum class to define different embedding model names
 class EmbeddingModelName(Enum):
     nomic_embed_text = "nomic-embed-text"
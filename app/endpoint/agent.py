@@ -1,46 +1,186 @@
-from fastapi import APIRouter, HTTPException
+import hashlib
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
-import logfire
 
 from app.model.agent_model import AgentRequest
-from app.services.agent_services import process_agent_output
+from app.model.analytics_model import FinanceAnalyticsReport
+from app.model.finance_model import FinanceInfo
+from app.services.admission_service import AdmissionRejected, get_admission_controller
+from app.services.agent_services import replay_response, start_agent_output
+from app.services.analytics_service import get_finance_analytics
+from app.services.cache_service import get_cache_stats
+from app.services.dataset_service import append_transactions, get_dataset
+from app.services.generation_service import (
+    get_coalescing_stats,
+    get_generation,
+    parse_event_id,
+    start_generation,
+    stream_sse,
+)
+from app.services.intent_service import answer_intent, get_intent_stats
+from app.services.model_router_service import get_model_router
+from app.services.prompt_cache_service import get_prompt_cache_stats
+from app.services.prompt_template_service import get_prompt_registry
+from app.services.resilience_service import get_resilience_stats
+from app.services.telemetry_service import record_stage, request_start_ns
+from app.services.transaction_service import TransactionStore, get_transaction_store
 
 
 router = APIRouter()
 
 
-@router.post("/chat")
-async def chat(request: AgentRequest):
+def _stream_mode_from_accept(accept: Optional[str]) -> str:
+    """Read the streaming mode from an "application/x-ndjson; mode=delta" header."""
+    if accept and "mode=delta" in accept.replace(" ", "").lower():
+        return "delta"
+    return "full"
+
+
+def _sse_headers(generation_id: str) -> dict:
+    """Headers that keep proxies from buffering or caching an SSE stream."""
+    return {
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+        "X-Generation-Id": generation_id,
+    }
+
+
+def _client_key(http_request: Request, api_key: Optional[str]) -> str:
+    """Identify the caller for admission limits: hashed API key, else client address."""
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+    client = http_request.client
+    return "ip:" + (client.host if client else "unknown")
+
+
+async def _agent_frames(
+    request: AgentRequest,
+    finance_info: FinanceInfo,
+    finance_hash: Optional[str],
+    store: Optional[TransactionStore],
+    stream_mode: str,
+    client_key: str,
+) -> AsyncIterator[str]:
     """
-    Chat endpoint that processes user queries with financial context.
+    Return the response frames for a chat request.
 
-    Streams the agent's response back to the client in real-time.
+    Known numeric intents (balance, spend vs budget, last N transactions) are
+    answered exactly from the data and replayed in the agent's format; every
+    other query goes to the agent. A new model run needs a slot from the
+    admission controller, held until the run is over; cached answers and
+    duplicates of a run in flight do not.
 
-    Args:
-        request: AgentRequest containing user_query, finance_info, and chat_history
+    Raises:
+        HTTPException: 429 or 503 with Retry-After when the run is not admitted
+    """
+    # Matching an intent may flatten inline transactions into a store
+    answer = await run_in_threadpool(
+        answer_intent,
+        request.user_query,
+        finance_info,
+        lambda: store or get_transaction_store(finance_info, finance_hash),
+    )
+    if answer is not None:
+        return replay_response(answer, stream_mode)
+
+    try:
+        return await start_agent_output(
+            user_query=request.user_query,
+            finance_info=finance_info,
+            chat_history=request.chat_history or [],
+            finance_hash=finance_hash,
+            store=store,
+            stream_mode=stream_mode,
+            conversation_id=request.conversation_id,
+            client_key=client_key,
+        )
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+def _record_validation(http_request: Request) -> None:
+    """Record the time to receive, parse and validate the request body."""
+    start_ns = request_start_ns(http_request.scope)
+    if start_ns is not None:
+        record_stage("validate", start_ns)
+
+
+def _resolve_finance(request: AgentRequest):
+    """
+    Validate the chat request and resolve its finance data.
+
+    Blocking: loading a dataset and appending new_transactions read and write
+    the dataset store and update its index, so it runs in the thread pool.
 
     Returns:
-        StreamingResponse with the agent's response
+        Tuple of (finance_info, finance_hash, store); hash and store are None
+        for inline finance_info
     """
     # Validate user query
     if not request.user_query or not request.user_query.strip():
         raise HTTPException(status_code=400, detail="User query cannot be empty")
 
-    # Validate finance info
-    if not request.finance_info:
-        raise HTTPException(status_code=400, detail="Finance info is required")
+    # Resolve finance info, either sent inline or from a stored dataset
+    if request.dataset_id:
+        dataset = get_dataset(request.dataset_id)
+        if dataset is None:
+            raise HTTPException(status_code=404, detail="Dataset not found")
+        if request.new_transactions:
+            append_transactions(dataset, request.new_transactions)
+        return dataset.finance_info, dataset.content_hash, dataset.store
+    if request.finance_info:
+        return request.finance_info, None, None
+    raise HTTPException(
+        status_code=400, detail="Either finance_info or dataset_id is required"
+    )
+
+
+@router.post("/chat")
+async def chat(
+    request: AgentRequest,
+    http_request: Request,
+    accept: Optional[str] = Header(None),
+    x_api_key: Optional[str] = Header(None),
+):
+    """
+    Chat endpoint that processes user queries with financial context.
 
-    # Initialize chat history if not provided
-    chat_history = request.chat_history if request.chat_history else []
+    Streams the agent's response back to the client in real-time, either as
+    full response frames (default) or as text deltas when stream_mode is
+    "delta" or the Accept header asks for mode=delta.
+
+    Args:
+        request: AgentRequest containing user_query, finance_info or dataset_id,
+            and chat_history
+        http_request: The raw request, for the client address
+        accept: Accept header, used to negotiate the streaming mode
+        x_api_key: X-API-Key header, keys the per-user admission limits
+
+    Returns:
+        StreamingResponse with the agent's response
+    """
+    _record_validation(http_request)
+    finance_info, finance_hash, store = await run_in_threadpool(_resolve_finance, request)
+    frames = await _agent_frames(
+        request,
+        finance_info,
+        finance_hash,
+        store,
+        request.stream_mode or _stream_mode_from_accept(accept),
+        _client_key(http_request, x_api_key),
+    )
 
     try:
         # Process the request and stream the response
         return StreamingResponse(
-            process_agent_output(
-                user_query=request.user_query,
-                finance_info=request.finance_info,
-                chat_history=chat_history,
-            ),
+            frames,
             media_type="application/x-ndjson",  # Newline-delimited JSON
         )
     except Exception as e:
@@ -49,3 +189,141 @@ async def chat(request: AgentRequest):
             status_code=500,
             detail=f"An error occurred while processing your request: {str(e)}",
         )
+
+
+@router.post("/chat/sse")
+async def chat_sse(
+    request: AgentRequest,
+    http_request: Request,
+    x_api_key: Optional[str] = Header(None),
+):
+    """
+    Chat endpoint streaming the response as Server-Sent Events.
+
+    The agent run is decoupled from the connection and buffered server-side
+    for GENERATION_BUFFER_TTL seconds. Each event id is
+    "<generation_id>:<seq>"; after a dropped connection the client resumes
+    with GET /agent/chat/sse/{generation_id} and a Last-Event-ID header
+    instead of paying for a new model run. Frames use the delta format
+    unless stream_mode is "full".
+
+    Args:
+        request: AgentRequest containing user_query, finance_info or dataset_id,
+            and chat_history
+        http_request: The raw request, for the client address
+        x_api_key: X-API-Key header, keys the per-user admission limits
+
+    Returns:
+        StreamingResponse of text/event-stream events
+    """
+    _record_validation(http_request)
+    finance_info, finance_hash, store = await run_in_threadpool(_resolve_finance, request)
+
+    generation = start_generation(
+        await _agent_frames(
+            request,
+            finance_info,
+            finance_hash,
+            store,
+            request.stream_mode or "delta",
+            _client_key(http_request, x_api_key),
+        )
+    )
+    return StreamingResponse(
+        stream_sse(generation),
+        media_type="text/event-stream",
+        headers=_sse_headers(generation.generation_id),
+    )
+
+
+@router.get("/chat/sse/{generation_id}")
+async def resume_chat_sse(
+    generation_id: str,
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Resume a buffered generation after the last event the client received.
+
+    Args:
+        generation_id: Id of the generation, the part of the event id before ":"
+        last_event_id: Last-Event-ID header sent by the reconnecting client;
+            without it the generation is replayed from the start
+
+    Returns:
+        StreamingResponse of the remaining text/event-stream events
+    """
+    generation = get_generation(generation_id)
+    if generation is None:
+        raise HTTPException(status_code=404, detail="Generation not found or expired")
+
+    event_generation_id, after = parse_event_id(last_event_id)
+    if event_generation_id not in (None, generation_id):
+        raise HTTPException(
+            status_code=400, detail="Last-Event-ID belongs to another generation"
+        )
+    return StreamingResponse(
+        stream_sse(generation, after),
+        media_type="text/event-stream",
+        headers=_sse_headers(generation_id),
+    )
+
+
+@router.post("/analytics", response_model=FinanceAnalyticsReport)
+def finance_analytics(finance_info: FinanceInfo):
+    """
+    Return the pre-computed analytics of finance data sent inline.
+
+    Cash flow per month and week, month-end balances per account, category
+    and merchant rollups, recurring payments and budget vs actual, built once
+    per content hash. Stored datasets use GET /agent/datasets/{id}/analytics.
+    A plain function, so the build runs in the thread pool.
+    """
+    return get_finance_analytics(finance_info).report()
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """Return hit/miss/eviction counters for the server-side caches."""
+    return get_cache_stats()
+
+
+@router.get("/coalescing/stats")
+async def coalescing_stats():
+    """Return how many model runs were shared by identical concurrent requests."""
+    return get_coalescing_stats()
+
+
+@router.get("/prompt-cache/stats")
+async def prompt_cache_stats():
+    """Return cached vs uncached input tokens per model and Gemini cache counters."""
+    return get_prompt_cache_stats()
+
+
+@router.get("/prompts/stats")
+async def prompt_template_stats():
+    """Return the compiled prompt templates with their token counts and latency."""
+    return get_prompt_registry().stats()
+
+
+@router.get("/intent/stats")
+async def intent_stats():
+    """Return how many queries the intent router answered without the model."""
+    return get_intent_stats()
+
+
+@router.get("/models/stats")
+async def model_stats():
+    """Return model routing decisions and time to first token per model."""
+    return get_model_router().stats()
+
+
+@router.get("/providers/stats")
+async def provider_stats():
+    """Return hedging/failover counters and the circuit breaker of each provider."""
+    return get_resilience_stats()
+
+
+@router.get("/admission/stats")
+async def admission_stats():
+    """Return the admission limits, current load and rejection counters."""
+    return get_admission_controller().stats()
@@ -0,0 +1,198 @@
+from tempfile import SpooledTemporaryFile
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+
+from app.model.analytics_model import FinanceAnalyticsReport
+from app.model.dataset_model import (
+    DatasetInfo,
+    TransactionAppendRequest,
+    TransactionAppendResponse,
+)
+from app.services.analytics_service import get_finance_analytics
+from app.services.dataset_service import (
+    append_transactions,
+    create_dataset,
+    dataset_summary,
+    delete_dataset,
+    get_dataset,
+    get_dataset_store,
+)
+from app.services.ingest_service import (
+    TransactionsDigest,
+    ingest_finance_json,
+    ingest_finance_stream,
+)
+from app.services.utility_service import compute_finance_hash
+
+
+router = APIRouter()
+
+# Streamed exports kept for persistence stay in memory up to this size
+_SPOOL_MEMORY_SIZE = 1024 * 1024
+
+_FINANCE_INFO_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": {"$ref": "#/components/schemas/FinanceInfo"}}
+        },
+    }
+}
+
+
+def _validation_error(e: ValidationError) -> RequestValidationError:
+    """Report a body ValidationError the same way FastAPI does."""
+    return RequestValidationError(
+        [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+    )
+
+
+@router.post("", response_model=DatasetInfo, openapi_extra=_FINANCE_INFO_BODY)
+async def upload_dataset(request: Request):
+    """
+    Upload a finance export once and get back a dataset id.
+
+    The export is parsed and validated a single time and kept server-side, so
+    subsequent /agent/chat calls only need to send the dataset_id. The raw
+    body goes through the fast ingestion path, which skips building a model
+    per transaction; invalid bodies get the usual 422 validation errors.
+    Parsing and storing run in the thread pool, off the event loop.
+
+    Args:
+        request: Request whose body is the user's full financial export
+
+    Returns:
+        DatasetInfo describing the stored dataset
+    """
+    body = await request.body()
+    digest = TransactionsDigest()
+    try:
+        finance_info, store = await run_in_threadpool(ingest_finance_json, body, digest)
+    except ValidationError as e:
+        raise _validation_error(e)
+
+    if not (len(store) or finance_info.accounts or finance_info.budgets):
+        raise HTTPException(status_code=400, detail="Finance info is empty")
+
+    dataset = await run_in_threadpool(
+        create_dataset,
+        finance_info,
+        store=store,
+        payload=body,
+        content_hash=compute_finance_hash(finance_info, digest.hexdigest()),
+    )
+    return dataset_summary(dataset)
+
+
+@router.post("/stream", response_model=DatasetInfo, openapi_extra=_FINANCE_INFO_BODY)
+async def upload_dataset_stream(request: Request):
+    """
+    Upload a very large finance export without buffering it.
+
+    Same as POST /agent/datasets, but the body is parsed incrementally while
+    it arrives and transactions are written to the store in small batches, so
+    peak memory depends on the batch size rather than on the export size.
+    When the dataset store persists exports, the body is spooled to a
+    temporary file instead of being kept in memory. Parsing, spooling and
+    storing run in worker threads, off the event loop.
+
+    Args:
+        request: Request whose body is the user's full financial export
+
+    Returns:
+        DatasetInfo describing the stored dataset
+    """
+    digest = TransactionsDigest()
+    spool = (
+        SpooledTemporaryFile(max_size=_SPOOL_MEMORY_SIZE)
+        if get_dataset_store().keeps_payload
+        else None
+    )
+
+    def on_chunk(chunk: bytes) -> None:
+        spool.write(chunk)
+
+    try:
+        try:
+            finance_info, store = await ingest_finance_stream(
+                request.stream(), on_chunk if spool is not None else None, digest=digest
+            )
+        except ValidationError as e:
+            raise _validation_error(e)
+
+        if not (len(store) or finance_info.accounts or finance_info.budgets):
+            raise HTTPException(status_code=400, detail="Finance info is empty")
+
+        if spool is not None:
+            spool.seek(0)
+        dataset = await run_in_threadpool(
+            create_dataset,
+            finance_info,
+            store=store,
+            payload=spool,
+            content_hash=compute_finance_hash(finance_info, digest.hexdigest()),
+        )
+    finally:
+        if spool is not None:
+            spool.close()
+    return dataset_summary(dataset)
+
+
+# The handlers below are plain functions, so FastAPI runs them in its thread
+# pool: loading a dataset, building analytics and appending read and write
+# SQLite and update the retrieval index, which would block the event loop
+@router.get("/{dataset_id}", response_model=DatasetInfo)
+def read_dataset(dataset_id: str):
+    """Return metadata for a stored dataset."""
+    dataset = get_dataset(dataset_id)
+    if dataset is None:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return dataset_summary(dataset)
+
+
+@router.get("/{dataset_id}/analytics", response_model=FinanceAnalyticsReport)
+def read_dataset_analytics(dataset_id: str):
+    """
+    Return the pre-computed analytics of a stored dataset.
+
+    Built on first use and kept up to date incrementally as transactions are
+    appended.
+    """
+    dataset = get_dataset(dataset_id)
+    if dataset is None:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return get_finance_analytics(
+        dataset.finance_info, dataset.store, dataset.content_hash
+    ).report()
+
+
+@router.post("/{dataset_id}/transactions", response_model=TransactionAppendResponse)
+def append_dataset_transactions(
+    dataset_id: str, request: TransactionAppendRequest
+):
+    """
+    Append new transactions to a stored dataset.
+
+    Transactions whose id is already present in the dataset are skipped.
+    """
+    dataset = get_dataset(dataset_id)
+    if dataset is None:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+
+    added = append_transactions(dataset, request.transactions)
+    return TransactionAppendResponse(
+        added=len(added),
+        skipped=len(request.transactions) - len(added),
+        dataset=dataset_summary(dataset),
+    )
+
+
+@router.delete("/{dataset_id}")
+def remove_dataset(dataset_id: str):
+    """Delete a stored dataset."""
+    if not delete_dataset(dataset_id):
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return {"status": "deleted", "dataset_id": dataset_id}
@@ -1,7 +1,12 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel
 
-from app.model.finance_model import FinanceInfo
+from app.model.finance_model import FinanceInfo, Transaction
+
+
+# "full": every frame is the whole response so far (default)
+# "delta": frames carry only new text, followed by one full final frame
+StreamMode = Literal["full", "delta"]
 
 
 class ChatMessage(BaseModel):
@@ -12,15 +17,41 @@ class ChatMessage(BaseModel):
 
 
 class AgentRequest(BaseModel):
-    """Request model for the agent endpoint."""
+    """
+    Request model for the agent endpoint.
+
+    Either finance_info (the full export, re-sent every turn) or dataset_id
+    (a dataset previously uploaded to /agent/datasets) must be provided.
+    """
 
     user_query: str
-    finance_info: FinanceInfo
+    finance_info: Optional[FinanceInfo] = None
+    dataset_id: Optional[str] = None
+    # Transactions to append to the stored dataset before answering
+    new_transactions: Optional[List[Transaction]] = None
     # Avoid mutable default list which can leak state across requests
     chat_history: Optional[List[ChatMessage]] = None
+    # Streaming format; can also be requested with "Accept: application/x-ndjson; mode=delta"
+    stream_mode: Optional[StreamMode] = None
+    # Stable id of the conversation; older turns are summarised once per conversation
+    conversation_id: Optional[str] = None
 
 
 class AgentResponse(BaseModel):
     """Response model for the agent endpoint."""
 
     response_text: str
+
+
+class AgentResponseDelta(BaseModel):
+    """Frame of the delta streaming mode carrying newly generated text."""
+
+    seq: int
+    delta: str
+
+
+class AgentResponseFinal(AgentResponse):
+    """Last frame of the delta streaming mode with the complete, validated response."""
+
+    seq: int
+    done: bool = True
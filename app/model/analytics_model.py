@@ -0,0 +1,87 @@
+from datetime import date
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class CashFlowPeriod(BaseModel):
+    """Money in and out during one month or week."""
+
+    period: str
+    credit: float
+    debit: float
+    transfer: float
+    net: float
+    transactions: int
+
+
+class BalancePoint(BaseModel):
+    """An account's net flow during a month and its balance at the month's end."""
+
+    period: str
+    net_flow: float
+    closing_balance: Optional[float] = None
+
+
+class AccountBalanceHistory(BaseModel):
+    """Month-end running balances of one account."""
+
+    account_id: str
+    account_name: Optional[str] = None
+    bank_name: Optional[str] = None
+    balance: Optional[float] = None
+    months: List[BalancePoint]
+
+
+class CategoryTotal(BaseModel):
+    """Count and total of the transactions of one category and type."""
+
+    category: str
+    type: str
+    count: int
+    total: float
+
+
+class MerchantTotal(BaseModel):
+    """Count and total of the transactions with one merchant and type."""
+
+    merchant: str
+    type: str
+    count: int
+    total: float
+
+
+class RecurringPayment(BaseModel):
+    """A merchant paid at a regular interval, such as a subscription or rent."""
+
+    merchant: str
+    frequency: str
+    interval_days: float
+    occurrences: int
+    average_amount: float
+    fixed_amount: bool
+    monthly_cost: float
+    last_date: date
+    next_expected_date: date
+
+
+class BudgetStatus(BaseModel):
+    """A monthly budget compared with the debits of that month."""
+
+    period: str
+    budget: float
+    spent: float
+    remaining: float
+    percent_used: Optional[float] = None
+
+
+class FinanceAnalyticsReport(BaseModel):
+    """Every pre-computed aggregate of a user's finance data."""
+
+    transactions: int
+    monthly_cash_flow: List[CashFlowPeriod]
+    weekly_cash_flow: List[CashFlowPeriod]
+    accounts: List[AccountBalanceHistory]
+    categories: List[CategoryTotal]
+    merchants: List[MerchantTotal]
+    recurring: List[RecurringPayment]
+    budgets: List[BudgetStatus]
@@ -0,0 +1,31 @@
+from datetime import datetime
+from typing import List
+from pydantic import BaseModel
+
+from app.model.finance_model import Transaction
+
+
+class DatasetInfo(BaseModel):
+    """Metadata describing a finance dataset stored on the server."""
+
+    dataset_id: str
+    content_hash: str
+    total_transactions: int
+    total_accounts: int
+    total_budgets: int
+    created_at: datetime
+    updated_at: datetime
+
+
+class TransactionAppendRequest(BaseModel):
+    """Request model for appending new transactions to a stored dataset."""
+
+    transactions: List[Transaction]
+
+
+class TransactionAppendResponse(BaseModel):
+    """Response model describing the result of a transaction append."""
+
+    added: int
+    skipped: int
+    dataset: DatasetInfo
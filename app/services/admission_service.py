@@ -0,0 +1,381 @@
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from app.services.cache_service import LRUCache, register_cache
+
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() != "false"
+
+# Model runs in flight per worker
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "32"))
+
+# Model runs in flight or queued per user (API key or client address)
+ADMISSION_MAX_PER_USER = int(os.getenv("ADMISSION_MAX_PER_USER", "4"))
+
+# Requests waiting for a free slot per worker
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))
+
+# Seconds a request may wait for a slot before it is shed
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+
+# Estimated prompt tokens admitted per minute, per worker and per user; 0 disables
+ADMISSION_TOKENS_PER_MINUTE = int(os.getenv("ADMISSION_TOKENS_PER_MINUTE", "0"))
+ADMISSION_USER_TOKENS_PER_MINUTE = int(
+    os.getenv("ADMISSION_USER_TOKENS_PER_MINUTE", "200000")
+)
+
+# Weight of the newest run in the moving average of the slot holding time
+_SERVICE_TIME_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is refused or shed; maps to an HTTP 429 or 503."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        """
+        Args:
+            status_code: 429 when the user is over their limits, 503 when the
+                worker is overloaded
+            detail: Message for the client
+            retry_after: Suggested seconds before retrying
+        """
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Bucket of tokens refilled continuously, holding at most one minute's worth."""
+
+    def __init__(self, tokens_per_minute: float):
+        """
+        Args:
+            tokens_per_minute: Refill rate, also the bucket capacity
+        """
+        self.capacity = float(tokens_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_consume(self, tokens: float) -> float:
+        """
+        Take tokens from the bucket if it holds enough.
+
+        A request larger than the capacity only needs a full bucket, so it is
+        delayed rather than refused forever.
+
+        Args:
+            tokens: Number of tokens to take
+
+        Returns:
+            0 when the tokens were taken, otherwise the seconds until they
+            will be available
+        """
+        self._refill()
+        cost = min(tokens, self.capacity)
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def refund(self, tokens: float) -> None:
+        """Give back tokens of a request that was not run after all."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + min(tokens, self.capacity))
+
+
+class AdmissionTicket:
+    """A granted slot; release it when the model run is over."""
+
+    def __init__(self, controller: "AdmissionController", user: str):
+        self._controller = controller
+        self.user = user
+        self.granted_at = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        """Free the slot and admit the next queued request; safe to call twice."""
+        if not self._released:
+            self._released = True
+            self._controller._release(self)
+
+
+class AdmissionController:
+    """
+    Bound the model runs of a worker, fairly across users.
+
+    At most max_concurrent runs are in flight. Further requests wait in a
+    bounded queue with one FIFO lane per user, served round-robin so a burst
+    from one user cannot starve the others. Every user is limited to
+    max_per_user runs in flight or queued and to a token bucket of estimated
+    prompt tokens per minute; a global bucket keeps the worker under the
+    provider's rate limit. A request whose expected wait exceeds the queue
+    timeout is shed immediately instead of timing out later.
+
+    Over-limit users get 429, an overloaded worker answers 503, both with a
+    Retry-After estimate. The controller lives on the event loop and is not
+    meant to be shared between threads.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_per_user: int,
+        max_queue: int,
+        queue_timeout: float,
+        tokens_per_minute: int = 0,
+        user_tokens_per_minute: int = 0,
+    ):
+        """
+        Args:
+            max_concurrent: Runs in flight at once
+            max_per_user: Runs in flight or queued per user
+            max_queue: Requests allowed to wait for a slot
+            queue_timeout: Seconds a request may wait before it is shed
+            tokens_per_minute: Global estimated prompt tokens per minute, 0 for no limit
+            user_tokens_per_minute: Same per user, 0 for no limit
+        """
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.tokens_per_minute = tokens_per_minute
+        self.user_tokens_per_minute = user_tokens_per_minute
+        self._bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        # An idle bucket is full again after a minute, so it can simply expire
+        self._user_buckets = register_cache(
+            "admission_buckets", LRUCache(maxsize=10_000, ttl=60)
+        )
+        self._active = 0
+        self._queued = 0
+        self._per_user: Dict[str, int] = {}
+        self._lanes: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._service_time: Optional[float] = None
+        self._counters = {
+            "admitted": 0,
+            "waited": 0,
+            "rejected_user_concurrency": 0,
+            "rejected_user_tokens": 0,
+            "shed_tokens": 0,
+            "shed_queue_full": 0,
+            "shed_deadline": 0,
+        }
+
+    def _expected_wait(self, ahead: int) -> float:
+        """Seconds until a slot frees up for a request with ahead requests before it."""
+        service = self._service_time or 1.0
+        return (ahead + 1) * service / self.max_concurrent
+
+    def _reject(self, counter: str, status_code: int, detail: str, wait: float) -> None:
+        self._counters[counter] += 1
+        raise AdmissionRejected(status_code, detail, max(1, math.ceil(wait)))
+
+    def _take_tokens(self, user: str, tokens: int) -> None:
+        """Charge the user's and the global token bucket, or reject."""
+        bucket = None
+        if self.user_tokens_per_minute:
+            bucket = self._user_buckets.get(user)
+            if bucket is None:
+                bucket = TokenBucket(self.user_tokens_per_minute)
+            wait = bucket.try_consume(tokens)
+            self._user_buckets.set(user, bucket)
+            if wait:
+                self._reject(
+                    "rejected_user_tokens", 429, "Token rate limit exceeded", wait
+                )
+        if self._bucket is not None:
+            wait = self._bucket.try_consume(tokens)
+            if wait:
+                if bucket is not None:
+                    bucket.refund(tokens)
+                self._reject("shed_tokens", 503, "Server is at capacity", wait)
+
+    def _refund_tokens(self, user: str, tokens: int) -> None:
+        bucket = self._user_buckets.get(user)
+        if bucket is not None:
+            bucket.refund(tokens)
+        if self._bucket is not None:
+            self._bucket.refund(tokens)
+
+    def _grant(self, user: str) -> AdmissionTicket:
+        self._active += 1
+        self._counters["admitted"] += 1
+        return AdmissionTicket(self, user)
+
+    def _leave(self, user: str) -> None:
+        count = self._per_user.get(user, 0) - 1
+        if count > 0:
+            self._per_user[user] = count
+        else:
+            self._per_user.pop(user, None)
+
+    def _dequeue(self, user: str, waiter: asyncio.Future) -> None:
+        lane = self._lanes.get(user)
+        if lane is not None and waiter in lane:
+            lane.remove(waiter)
+            self._queued -= 1
+            if not lane:
+                del self._lanes[user]
+
+    def _dispatch(self) -> None:
+        """Hand free slots to queued requests, one user lane at a time."""
+        while self._active < self.max_concurrent and self._lanes:
+            user, lane = self._lanes.popitem(last=False)
+            waiter = lane.popleft()
+            if lane:
+                # The user goes to the back of the round-robin
+                self._lanes[user] = lane
+            self._queued -= 1
+            self._active += 1
+            self._counters["admitted"] += 1
+            waiter.set_result(None)
+
+    async def acquire(self, user: str, tokens: int) -> AdmissionTicket:
+        """
+        Wait for a slot for a model run.
+
+        Args:
+            user: Key of the user, such as a hashed API key or client address
+            tokens: Estimated prompt tokens of the run
+
+        Returns:
+            The granted AdmissionTicket
+
+        Raises:
+            AdmissionRejected: When the request is refused or shed
+        """
+        if self._per_user.get(user, 0) >= self.max_per_user:
+            self._reject(
+                "rejected_user_concurrency",
+                429,
+                "Too many concurrent requests",
+                self._service_time or 1.0,
+            )
+        must_wait = self._active >= self.max_concurrent or self._queued > 0
+        if must_wait:
+            if self._queued >= self.max_queue:
+                self._reject(
+                    "shed_queue_full",
+                    503,
+                    "Server is busy",
+                    self._expected_wait(self._queued),
+                )
+            expected = self._expected_wait(self._queued)
+            if self._service_time is not None and expected > self.queue_timeout:
+                self._reject("shed_deadline", 503, "Server is busy", expected)
+        self._take_tokens(user, tokens)
+
+        self._per_user[user] = self._per_user.get(user, 0) + 1
+        if not must_wait:
+            return self._grant(user)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._lanes.setdefault(user, deque()).append(waiter)
+        self._queued += 1
+        self._counters["waited"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                self._dequeue(user, waiter)
+                self._leave(user)
+                self._refund_tokens(user, tokens)
+                self._reject(
+                    "shed_deadline",
+                    503,
+                    "Server is busy",
+                    self._expected_wait(self._queued),
+                )
+        except asyncio.CancelledError:
+            # The client went away while queued
+            if waiter.done():
+                # Granted just now: hand the slot straight to the next request
+                self._active -= 1
+                self._leave(user)
+                self._dispatch()
+            else:
+                waiter.cancel()
+                self._dequeue(user, waiter)
+                self._leave(user)
+                self._refund_tokens(user, tokens)
+            raise
+        return AdmissionTicket(self, user)
+
+    def _release(self, ticket: AdmissionTicket) -> None:
+        held = time.monotonic() - ticket.granted_at
+        if self._service_time is None:
+            self._service_time = held
+        else:
+            self._service_time += _SERVICE_TIME_ALPHA * (held - self._service_time)
+        self._active -= 1
+        self._leave(ticket.user)
+        self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the limits, current load and admission counters.
+
+        Returns:
+            Dictionary with limits, in-flight and queued counts, the average
+            slot holding time and rejection counters
+        """
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_per_user": self.max_per_user,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "tokens_per_minute": self.tokens_per_minute,
+            "user_tokens_per_minute": self.user_tokens_per_minute,
+            "active": self._active,
+            "queued": self._queued,
+            "active_users": len(self._per_user),
+            "avg_service_time": (
+                round(self._service_time, 4) if self._service_time is not None else None
+            ),
+            **self._counters,
+        }
+
+
+_controller = AdmissionController(
+    max_concurrent=ADMISSION_MAX_CONCURRENT,
+    max_per_user=ADMISSION_MAX_PER_USER,
+    max_queue=ADMISSION_QUEUE_SIZE,
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+    tokens_per_minute=ADMISSION_TOKENS_PER_MINUTE,
+    user_tokens_per_minute=ADMISSION_USER_TOKENS_PER_MINUTE,
+)
+
+
+def get_admission_controller() -> AdmissionController:
+    """Return the process-wide admission controller."""
+    return _controller
+
+
+async def release_after(
+    frames: AsyncIterator[str], ticket: AdmissionTicket
+) -> AsyncIterator[str]:
+    """
+    Stream frames and release the admission slot once the run is over.
+
+    Args:
+        frames: Frames of the admitted model run
+        ticket: Slot held by the run
+
+    Yields:
+        The frames unchanged
+    """
+    try:
+        async for frame in frames:
+            yield frame
+    finally:
+        ticket.release()
@@ -1,42 +1,130 @@
-import logfire
+import asyncio
+import os
+import time
+
 from pydantic import ValidationError
 from pydantic_ai import Agent, RunContext
-from pydantic_ai.messages import ModelRequest, ModelResponse, SystemPromptPart
-from typing import List, AsyncIterator, Optional
+from pydantic_ai.usage import RunUsage
+from typing import Dict, List, AsyncIterator, Callable, Optional, Tuple
 from threading import Lock
 
-from app.configs.model_config import LLMModelName
-from app.model.agent_model import AgentResponse, ChatMessage
+from app.configs.model_config import (
+    LLMModelName,
+    get_context_token_budget,
+    get_history_token_budget,
+)
+from app.model.agent_model import (
+    AgentResponse,
+    AgentResponseDelta,
+    AgentResponseFinal,
+    ChatMessage,
+    StreamMode,
+)
 from app.model.finance_model import FinanceInfo
-from app.services.finance_service import flatten_finance_info
-from app.services.llm_service import get_llm_model_config
+from app.services.admission_service import (
+    ADMISSION_ENABLED,
+    AdmissionTicket,
+    get_admission_controller,
+    release_after,
+)
+from app.services.analytics_service import FinanceAnalytics, get_finance_analytics
+from app.services.cache_service import LRUCache, register_cache
+from app.services.finance_service import build_finance_summary, build_transaction_sample
+from app.services.generation_service import coalesce
+from app.services.history_service import compact_history
+from app.services.llm_service import get_llm_model_config, get_model_provider
+from app.services.model_router_service import get_model_router
+from app.services.prompt_cache_service import prompt_cache_settings, record_usage
+from app.services.prompt_template_service import CompiledPrompt, get_prompt_registry
+from app.services.resilience_service import (
+    FALLBACK_MODELS,
+    StreamCandidate,
+    get_hedge_delay,
+    hedged_stream,
+)
+from app.services.response_cache_service import (
+    history_fingerprint,
+    lookup_response,
+    normalize_query,
+    store_response,
+)
+from app.services.retrieval_service import get_transaction_index
+from app.services.telemetry_service import (
+    record_first_token,
+    record_stream,
+    record_tokens,
+    stage,
+)
+from app.services.tool_service import register_finance_tools
+from app.services.transaction_service import TransactionStore, get_transaction_store
 from app.services.utility_service import (
-    convert_chat_history_to_messages,
+    compute_finance_hash,
+    estimate_tokens,
+    extract_query_terms,
 )
 
-from app.configs.prompt import base_prompt
+# Aggregate finance summary, keyed by the finance content hash
+_summary_cache = register_cache(
+    "finance_summary",
+    LRUCache(
+        maxsize=int(os.getenv("PROMPT_CACHE_SIZE", "64")),
+        ttl=float(os.getenv("PROMPT_CACHE_TTL", "3600")),
+    ),
+)
 
-# configure logfire
-logfire.configure(token="pylf_v1_us_L1PBl6ddHRBrDvk9wst2F1jzKMYsjSwgpwVw0YPmvqWd")
-logfire.instrument_pydantic_ai()
+# System prompt (compiled template and summary), keyed by content hash and prompt
+_system_prompt_cache = register_cache(
+    "system_prompt",
+    LRUCache(
+        maxsize=int(os.getenv("PROMPT_CACHE_SIZE", "64")) * 2,
+        ttl=float(os.getenv("PROMPT_CACHE_TTL", "3600")),
+    ),
+)
+
+# Transactions relevant to a question, keyed by content hash, token budget and
+# query terms
+_prompt_cache = register_cache(
+    "finance_prompt",
+    LRUCache(
+        maxsize=int(os.getenv("PROMPT_CACHE_SIZE", "64")) * 4,
+        ttl=float(os.getenv("PROMPT_CACHE_TTL", "3600")),
+    ),
+)
+
+# The tools give exact answers over every row, so the prompt only needs a sample
+_CONTEXT_MAX_ROWS = int(os.getenv("FINANCE_CONTEXT_MAX_ROWS", "50"))
 
 
 class FinanceDeps:
     """Dependencies for the finance agent containing user's financial context."""
 
-    def __init__(self, finance_context: str):
-        self.finance_context = finance_context
+    def __init__(
+        self,
+        system_prompt: str,
+        finance_info: FinanceInfo,
+        store: TransactionStore,
+        cache_key: Optional[str] = None,
+        analytics: Optional[FinanceAnalytics] = None,
+    ):
+        self.system_prompt = system_prompt
+        self.finance_info = finance_info
+        self.store = store
+        # Pre-computed cash flow, balances, rollups and recurring payments
+        self.analytics = analytics or FinanceAnalytics(finance_info, store)
+        # Shared by requests with the same prompt prefix, for provider caching
+        self.cache_key = cache_key
 
 
 class FinanceAgentService:
     """
-    Singleton service for managing the Finance Agent.
-    Ensures a single agent instance is created and reused across all requests.
+    Singleton service for managing the Finance Agents.
+    One agent is built per model used by the model router and reused across
+    all requests routed to that model.
     """
 
     _instance: Optional["FinanceAgentService"] = None
     _lock: Lock = Lock()
-    _agent: Optional[Agent] = None
+    _agents: Optional[Dict[LLMModelName, Agent]] = None
 
     def __new__(cls):
         """
@@ -52,88 +140,472 @@ class FinanceAgentService:
         """
         Initialize the singleton instance.
         Note: __init__ is called every time the singleton is accessed,
-        but we only want to initialize the agent once.
+        but we only want to initialize the agents once.
         """
-        # Only initialize if agent hasn't been created yet
-        if self._agent is None:
+        # Only initialize if the agents haven't been created yet
+        if self._agents is None:
             with self._lock:
-                if self._agent is None:
-                    self._initialize_agent()
+                if self._agents is None:
+                    self._initialize_agents()
 
-    def _initialize_agent(self) -> None:
+    def _initialize_agents(self) -> None:
         """
-        Private method to initialize the agent with configuration and system prompt.
+        Private method to build one agent per routed model.
         This is called only once during the first instantiation.
         """
-        self._agent = Agent(
-            model=get_llm_model_config(LLMModelName.GPT_4O_MINI),
+        agents = {
+            model_name: FinanceAgentService._build_agent(model_name)
+            for model_name in get_model_router().models()
+        }
+        # Fallbacks are optional: a provider without an API key is left out
+        for model_name in FALLBACK_MODELS:
+            if model_name not in agents:
+                try:
+                    agents[model_name] = FinanceAgentService._build_agent(model_name)
+                except (KeyError, ValueError):
+                    continue
+        FinanceAgentService._agents = agents
+
+    @staticmethod
+    def _build_agent(model_name: LLMModelName) -> Agent:
+        """Build the finance agent for one model, with its instructions and tools."""
+        agent = Agent(
+            model=get_llm_model_config(model_name),
             output_type=AgentResponse,
+            deps_type=FinanceDeps,
         )
 
-        # Register system prompt after agent creation
-        @self._agent.system_prompt
-        def finance_system_prompt(ctx: RunContext[FinanceDeps]) -> str:
-            """Dynamic system prompt that includes the user's finance information."""
-            return FinanceAgentService._build_finance_system_prompt(
-                ctx.deps.finance_context
-            )
+        # The finance context is injected only through instructions. They are
+        # evaluated on every run and are never stored in the message history,
+        # so the context is sent exactly once per model request.
+        @agent.instructions
+        def finance_instructions(ctx: RunContext[FinanceDeps]) -> str:
+            """Instructions that include the user's finance information."""
+            return ctx.deps.system_prompt
+
+        # Exact filters and aggregations over the columnar transaction store
+        register_finance_tools(agent)
+        return agent
 
     @staticmethod
-    def _build_finance_system_prompt(finance_context: str) -> str:
-        """Construct the full system prompt text including the finance context."""
+    def _build_finance_system_prompt(prompt: CompiledPrompt, finance_summary: str) -> str:
+        """
+        Construct the system prompt: the compiled template first, then the summary.
+
+        Nothing in it depends on the question, so it is identical across the
+        turns of a conversation and providers can cache it as a prefix.
+        """
         return (
-            base_prompt
-            + f"Here is the user's financial information:\n\n{finance_context}\n\n"
-            "Use this information to answer the user's questions about their finances."
+            prompt.text
+            + f"Here is the user's financial information:\n\n{finance_summary}"
         )
 
     @staticmethod
-    def get_agent() -> Agent:
+    def _build_user_prompt(user_query: str, transactions_text: str) -> str:
+        """The question, preceded by the transactions relevant to it."""
+        if not transactions_text:
+            return user_query
+        return f"{transactions_text}\n\nQuestion: {user_query}"
+
+    @staticmethod
+    def _get_finance_prompt(
+        finance_info: FinanceInfo,
+        user_query: str,
+        finance_hash: Optional[str] = None,
+        store: Optional[TransactionStore] = None,
+        model_name: Optional[LLMModelName] = None,
+        prompt: Optional[CompiledPrompt] = None,
+    ) -> Tuple[str, str]:
         """
-        Static method to get the singleton agent instance.
+        Return the system prompt and the transactions relevant to a question.
+
+        The prompt is laid out for provider prefix caching: the system prompt
+        (static instructions, then the user's finance summary) depends only on
+        the finance data, while the token-budgeted sample of transactions
+        varies per question and is sent last, with the question itself. Both
+        parts are cached.
+
+        Args:
+            finance_info: The user's financial information
+            user_query: The user's question, used to pick relevant transactions
+            finance_hash: Precomputed content hash of finance_info, if known
+            store: Columnar store of the transactions, looked up when omitted
+            model_name: Model the prompt is for, sets the token budget;
+                the router's default model when omitted
+            prompt: Compiled prompt template; the standard tier's when omitted
+
+        Returns:
+            Tuple of (system_text, transactions_text); transactions_text is
+            empty when there are no transactions
+        """
+        with stage("prompt"):
+            finance_hash = finance_hash or compute_finance_hash(finance_info)
+            model_name = model_name or get_model_router().default_model()
+            token_budget = get_context_token_budget(model_name)
+
+            prompt = prompt or get_prompt_registry().select("standard", finance_hash)
+
+            summary = _summary_cache.get(finance_hash)
+            if summary is None:
+                if store is None:
+                    store = get_transaction_store(finance_info, finance_hash)
+                summary = build_finance_summary(
+                    finance_info,
+                    store,
+                    get_finance_analytics(finance_info, store, finance_hash),
+                )
+                _summary_cache.set(finance_hash, summary)
+            system_text = _system_prompt_cache.get((finance_hash, prompt.key))
+            if system_text is None:
+                system_text = FinanceAgentService._build_finance_system_prompt(
+                    prompt, summary
+                )
+                _system_prompt_cache.set((finance_hash, prompt.key), system_text)
+
+            key = (finance_hash, token_budget, tuple(extract_query_terms(user_query)))
+            transactions_text = _prompt_cache.get(key)
+            if transactions_text is None:
+                if store is None:
+                    store = get_transaction_store(finance_info, finance_hash)
+                transactions_text = build_transaction_sample(
+                    store,
+                    token_budget - estimate_tokens(summary),
+                    query=user_query,
+                    max_rows=_CONTEXT_MAX_ROWS,
+                    index=get_transaction_index(store, finance_hash),
+                )
+                _prompt_cache.set(key, transactions_text)
+            return system_text, transactions_text
+
+    @staticmethod
+    def get_agent(model_name: Optional[LLMModelName] = None) -> Agent:
+        """
+        Static method to get the pre-built agent of a model.
+
+        Args:
+            model_name: One of the router's models; its default model when omitted
 
         Returns:
             Agent: The configured finance agent instance
         """
         instance = FinanceAgentService()
-        return instance._agent
+        model_name = model_name or get_model_router().default_model()
+        agent = instance._agents.get(model_name)
+        if agent is None:
+            with FinanceAgentService._lock:
+                agent = instance._agents.get(model_name)
+                if agent is None:
+                    agent = FinanceAgentService._build_agent(model_name)
+                    instance._agents[model_name] = agent
+        return agent
+
+    @staticmethod
+    def _stream_candidates(
+        model_name: LLMModelName,
+        start: Callable[[Agent], AsyncIterator[str]],
+    ) -> List[StreamCandidate]:
+        """The routed model followed by the configured fallbacks that are available."""
+        instance = FinanceAgentService()
+        models = [model_name] + [
+            m for m in FALLBACK_MODELS if m != model_name and m in instance._agents
+        ]
+        return [
+            StreamCandidate(
+                get_model_provider(m),
+                m.value,
+                lambda agent=FinanceAgentService.get_agent(m): start(agent),
+            )
+            for m in models
+        ]
+
+    @staticmethod
+    async def start_agent_output(
+        user_query: str,
+        finance_info: FinanceInfo,
+        chat_history: List[ChatMessage],
+        finance_hash: Optional[str] = None,
+        store: Optional[TransactionStore] = None,
+        stream_mode: StreamMode = "full",
+        conversation_id: Optional[str] = None,
+        client_key: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Start answering a question and return its response frames.
+
+        In "full" mode every frame is the whole response so far, re-validated
+        on each tick. In "delta" mode frames only carry the newly generated
+        text with a sequence number, the output is validated once at the end
+        and a final frame with the complete response is sent for integrity,
+        so long answers cost linear CPU and bandwidth.
+
+        The model is picked per request by the model router (small talk to
+        the fast tier, analysis to the strong tier). If it has not produced a
+        first frame within its p95 latency a hedged request goes to the
+        fallback model and the first to answer wins; failures before the
+        first frame fail over, guarded by per-provider circuit breakers. Answers are cached per
+        model, finance content hash, normalised question and recent history;
+        a cached answer is replayed in the same framing without calling the
+        model. Identical requests arriving while an answer is being generated
+        attach to that run instead of starting their own.
+
+        With a client_key, a new model run must first be granted a slot by
+        the admission controller, for the prompt tokens estimated for the
+        routed model and tier. Cached answers and requests attaching to a
+        run in flight are never charged. The decision is made before this
+        returns, so a rejection can still become an HTTP status.
+
+        Args:
+            user_query: The user's question
+            finance_info: The user's financial information
+            chat_history: Previous conversation history
+            finance_hash: Precomputed content hash of finance_info, if known
+            store: Columnar store of the transactions, looked up when omitted
+            stream_mode: "full" or "delta"
+            conversation_id: Client supplied conversation id, keys the history summary
+            client_key: Key of the caller for the admission limits; runs are
+                not admission controlled when omitted
+
+        Returns:
+            Newline-delimited JSON strings: AgentResponse objects in full mode,
+            AgentResponseDelta frames and an AgentResponseFinal in delta mode
+
+        Raises:
+            AdmissionRejected: When a new model run is refused or shed
+        """
+        if finance_hash is None:
+            # Serialises every inline transaction
+            finance_hash = await asyncio.to_thread(compute_finance_hash, finance_info)
+
+        router = get_model_router()
+        if store is not None:
+            row_count = len(store)
+        else:
+            row_count = len(finance_info.transactions or [])
+        route = router.route(
+            user_query, history_messages=len(chat_history), row_count=row_count
+        )
+        model_name = route.model
+
+        # Repeated questions against unchanged data are answered from the cache
+        cached = lookup_response(model_name.value, finance_hash, user_query, chat_history)
+        if cached is not None:
+            return replay_response(cached, stream_mode)
+
+        async def admit() -> AdmissionTicket:
+            tokens = await asyncio.to_thread(
+                estimate_prompt_tokens,
+                user_query,
+                finance_info,
+                chat_history,
+                finance_hash,
+                store,
+                model_name,
+                route.tier,
+            )
+            return await get_admission_controller().acquire(client_key, tokens)
+
+        def start(ticket: Optional[AdmissionTicket]) -> AsyncIterator[str]:
+            frames = FinanceAgentService._run_model(
+                model_name,
+                route.tier,
+                user_query,
+                finance_info,
+                chat_history,
+                finance_hash,
+                store,
+                stream_mode,
+                conversation_id,
+            )
+            # The slot is held until the run is over, however many follow it
+            return frames if ticket is None else release_after(frames, ticket)
+
+        # Identical requests in flight (double submits, shared accounts) share one run
+        key = (
+            model_name.value,
+            finance_hash,
+            normalize_query(user_query),
+            history_fingerprint(chat_history, last=len(chat_history)),
+            stream_mode,
+            route.tier,
+        )
+        admitted = client_key is not None and ADMISSION_ENABLED
+        return await coalesce(key, start, admit if admitted else None)
 
     @staticmethod
     async def process_agent_output(
-        user_query: str, finance_info: FinanceInfo, chat_history: List[ChatMessage]
+        user_query: str,
+        finance_info: FinanceInfo,
+        chat_history: List[ChatMessage],
+        finance_hash: Optional[str] = None,
+        store: Optional[TransactionStore] = None,
+        stream_mode: StreamMode = "full",
+        conversation_id: Optional[str] = None,
     ) -> AsyncIterator[str]:
         """
         Process the agent output with user query, finance info, and chat history.
         Streams validated JSON response objects back to the client.
 
+        Same as start_agent_output without admission control.
+
         Args:
             user_query: The user's question
             finance_info: The user's financial information
             chat_history: Previous conversation history
+            finance_hash: Precomputed content hash of finance_info, if known
+            store: Columnar store of the transactions, looked up when omitted
+            stream_mode: "full" or "delta"
+            conversation_id: Client supplied conversation id, keys the history summary
 
         Yields:
-            Newline-delimited JSON strings containing validated AgentResponse objects
+            Newline-delimited JSON strings: AgentResponse objects in full mode,
+            AgentResponseDelta frames and an AgentResponseFinal in delta mode
         """
-        # Flatten finance info into readable text context
-        finance_context = flatten_finance_info(finance_info)
+        frames = await FinanceAgentService.start_agent_output(
+            user_query,
+            finance_info,
+            chat_history,
+            finance_hash,
+            store,
+            stream_mode,
+            conversation_id,
+        )
+        async for frame in frames:
+            yield frame
 
-        # Convert chat history to PydanticAI message format
-        message_history = convert_chat_history_to_messages(chat_history)
+    @staticmethod
+    def _prepare_context(
+        finance_info: FinanceInfo,
+        user_query: str,
+        finance_hash: str,
+        store: Optional[TransactionStore],
+        model_name: LLMModelName,
+        prompt: CompiledPrompt,
+    ) -> Tuple[TransactionStore, str, str, FinanceAnalytics]:
+        """
+        Build everything a model run needs from the finance data.
 
-        system_text = FinanceAgentService._build_finance_system_prompt(finance_context)
-        priming_request = ModelRequest(parts=[SystemPromptPart(content=system_text)])
-        message_history = [priming_request, *message_history]
+        Blocking; the store, retrieval index, prompts and analytics are cached
+        per content hash, so only a cache miss does real work.
 
-        # Get the finance agent instance (singleton)
-        agent = FinanceAgentService.get_agent()
+        Returns:
+            Tuple of (store, system_text, transactions_text, analytics)
+        """
+        if store is None:
+            store = get_transaction_store(finance_info, finance_hash)
 
-        # Stream the agent's response
-        async with agent.run_stream(
+        # Stable system prompt per dataset; the relevant transactions go last,
+        # with the question, so the provider can cache everything before them
+        system_text, transactions_text = FinanceAgentService._get_finance_prompt(
+            finance_info, user_query, finance_hash, store, model_name, prompt
+        )
+        analytics = get_finance_analytics(finance_info, store, finance_hash)
+        return store, system_text, transactions_text, analytics
+
+    @staticmethod
+    async def _run_model(
+        model_name: LLMModelName,
+        tier: str,
+        user_query: str,
+        finance_info: FinanceInfo,
+        chat_history: List[ChatMessage],
+        finance_hash: str,
+        store: Optional[TransactionStore],
+        stream_mode: StreamMode,
+        conversation_id: Optional[str],
+    ) -> AsyncIterator[str]:
+        """Stream the answer of the routed model, hedged with its fallbacks."""
+
+        def remember(response_text: str) -> None:
+            store_response(
+                model_name.value, finance_hash, user_query, chat_history, response_text
+            )
+
+        # Prompt template compiled for the routed tier, the version fixed per dataset
+        registry = get_prompt_registry()
+        prompt = registry.select(tier, finance_hash)
+        registry.record_request(prompt)
+
+        # Flattening, retrieval and analytics are CPU bound on a cache miss
+        store, system_text, transactions_text, analytics = await asyncio.to_thread(
+            FinanceAgentService._prepare_context,
+            finance_info,
             user_query,
-            deps=FinanceDeps(finance_context=finance_context),
+            finance_hash,
+            store,
+            model_name,
+            prompt,
+        )
+        user_prompt = FinanceAgentService._build_user_prompt(
+            user_query, transactions_text
+        )
+
+        # Recent turns verbatim, older ones as a cached rolling summary
+        with stage("history", turns=len(chat_history)):
+            message_history = compact_history(chat_history, model_name, conversation_id)
+
+        with stage("agent", model=model_name.value):
+            deps = FinanceDeps(
+                system_prompt=system_text,
+                finance_info=finance_info,
+                store=store,
+                cache_key=finance_hash,
+                analytics=analytics,
+            )
+
+            stream = (
+                FinanceAgentService._stream_deltas
+                if stream_mode == "delta"
+                else FinanceAgentService._stream_full
+            )
+            # The pre-built agents of the routed model and of its fallbacks
+            candidates = FinanceAgentService._stream_candidates(
+                model_name,
+                lambda agent: stream(
+                    agent, user_prompt, deps, message_history, on_complete=remember
+                ),
+            )
+        router = get_model_router()
+        winner: List[StreamCandidate] = []
+        started = time.perf_counter()
+        started_ns = time.time_ns()
+        first_ns = None
+        frames = sent = 0
+        async for frame in hedged_stream(
+            candidates, get_hedge_delay(router.p95(model_name)), winner.append
+        ):
+            if first_ns is None:
+                elapsed = time.perf_counter() - started
+                first_ns = time.time_ns()
+                router.record_latency(LLMModelName(winner[0].name), elapsed)
+                registry.record_latency(prompt, elapsed)
+                record_first_token(winner[0].name, started_ns, first_ns)
+            frames += 1
+            sent += len(frame)
+            yield frame
+        if first_ns is not None:
+            record_stream(winner[0].name, first_ns, frames, sent)
+
+    @staticmethod
+    async def _stream_full(
+        agent: Agent,
+        user_prompt: str,
+        deps: FinanceDeps,
+        message_history: list,
+        on_complete: Optional[Callable[[str], None]] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream the whole response so far on every tick, validated each time.
+
+        on_complete, if given, receives the final response text.
+        """
+        async with agent.run_stream(
+            user_prompt,
+            deps=deps,
             message_history=message_history,
+            model_settings=prompt_cache_settings(deps.cache_key),
         ) as result:
-            async for message, last in result.stream_responses():
+            async for message in result.stream_response():
+                last = message.state != "incomplete"
                 try:
                     profile = await result.validate_response_output(
                         message,
@@ -143,8 +615,138 @@ class FinanceAgentService:
                     if profile:
                         # Convert Pydantic model to JSON string with newline delimiter
                         yield profile.model_dump_json() + "\n"
+                        if last and on_complete is not None:
+                            on_complete(profile.response_text)
                 except ValidationError:
                     continue
+        FinanceAgentService._report_usage(agent, result.usage)
+
+    @staticmethod
+    async def _stream_deltas(
+        agent: Agent,
+        user_prompt: str,
+        deps: FinanceDeps,
+        message_history: list,
+        on_complete: Optional[Callable[[str], None]] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream the answer as text deltas followed by one validated final frame.
+
+        The run keeps the AgentResponse output of full mode; each partial
+        output's response_text is diffed against what was already sent and
+        only the new suffix is forwarded. The complete output is validated
+        once at the end. on_complete, if given, receives the validated
+        response text.
+        """
+        seq = 0
+        sent = ""
+        async with agent.run_stream(
+            user_prompt,
+            deps=deps,
+            message_history=message_history,
+            model_settings=prompt_cache_settings(deps.cache_key),
+        ) as result:
+            async for partial in result.stream_output():
+                text = partial.response_text
+                if len(text) <= len(sent) or not text.startswith(sent):
+                    continue
+                delta = text[len(sent) :]
+                yield AgentResponseDelta(seq=seq, delta=delta).model_dump_json() + "\n"
+                sent = text
+                seq += 1
+            response = await result.get_output()
+        FinanceAgentService._report_usage(agent, result.usage)
+
+        if on_complete is not None:
+            on_complete(response.response_text)
+        yield AgentResponseFinal(
+            seq=seq, response_text=response.response_text
+        ).model_dump_json() + "\n"
+
+    @staticmethod
+    def _report_usage(agent: Agent, usage: RunUsage) -> None:
+        """Record the prompt, cached and completion tokens of a finished run."""
+        model_name = getattr(agent.model, "model_name", str(agent.model))
+        report = record_usage(model_name, usage)
+        record_tokens(
+            model_name,
+            report["input_tokens"],
+            report["output_tokens"],
+            report["cached_tokens"],
+        )
+
+    @staticmethod
+    def _replay(response_text: str, stream_mode: StreamMode) -> List[str]:
+        """Frame a cached answer exactly like a live response in the given mode."""
+        if stream_mode == "delta":
+            return [
+                AgentResponseDelta(seq=0, delta=response_text).model_dump_json() + "\n",
+                AgentResponseFinal(seq=1, response_text=response_text).model_dump_json()
+                + "\n",
+            ]
+        return [AgentResponse(response_text=response_text).model_dump_json() + "\n"]
+
+
+def warm_up_agents() -> List[str]:
+    """
+    Build the agents, model providers and pooled HTTP clients ahead of traffic.
+
+    Missing API keys are not fatal here: the app still starts and the error
+    is reported by the first chat request, as before.
+
+    Returns:
+        Names of the models whose agents are ready
+    """
+    try:
+        instance = FinanceAgentService()
+    except (KeyError, ValueError):
+        return []
+    return [model_name.value for model_name in instance._agents]
+
+
+def estimate_prompt_tokens(
+    user_query: str,
+    finance_info: FinanceInfo,
+    chat_history: List[ChatMessage],
+    finance_hash: Optional[str] = None,
+    store: Optional[TransactionStore] = None,
+    model_name: Optional[LLMModelName] = None,
+    tier: str = "standard",
+) -> int:
+    """
+    Estimate the input tokens of the model request for a chat turn.
+
+    The budgeted prompt is built for the routed model and the template of its
+    tier; it is cached, so the run itself reuses it. The history counts up to
+    its token budget since older turns are summarised.
+
+    Args:
+        user_query: The user's question
+        finance_info: The user's financial information
+        chat_history: Previous conversation history
+        finance_hash: Precomputed content hash of finance_info, if known
+        store: Columnar store of the transactions, looked up when omitted
+        model_name: Model the question was routed to; the router's default
+            model when omitted
+        tier: Tier the question was routed to
+
+    Returns:
+        Estimated prompt token count
+    """
+    finance_hash = finance_hash or compute_finance_hash(finance_info)
+    model_name = model_name or get_model_router().default_model()
+    prompt = get_prompt_registry().select(tier, finance_hash)
+    system_text, transactions_text = FinanceAgentService._get_finance_prompt(
+        finance_info, user_query, finance_hash, store, model_name, prompt
+    )
+    history_tokens = sum(estimate_tokens(m.content) for m in chat_history)
+    history_budget = get_history_token_budget(model_name)
+    return (
+        estimate_tokens(system_text)
+        + estimate_tokens(transactions_text)
+        + estimate_tokens(user_query)
+        + min(history_tokens, history_budget)
+    )
 
 
 # Convenience function for backward compatibility
@@ -158,9 +760,62 @@ def get_agent() -> Agent:
     return FinanceAgentService.get_agent()
 
 
+async def replay_response(
+    response_text: str, stream_mode: StreamMode = "full"
+) -> AsyncIterator[str]:
+    """
+    Stream an already known answer in the same frames as a live agent response.
+
+    Args:
+        response_text: The complete answer
+        stream_mode: "full" or "delta"
+
+    Yields:
+        Newline-delimited JSON strings
+    """
+    for frame in FinanceAgentService._replay(response_text, stream_mode):
+        yield frame
+
+
+async def start_agent_output(
+    user_query: str,
+    finance_info: FinanceInfo,
+    chat_history: List[ChatMessage],
+    finance_hash: Optional[str] = None,
+    store: Optional[TransactionStore] = None,
+    stream_mode: StreamMode = "full",
+    conversation_id: Optional[str] = None,
+    client_key: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """
+    Start answering a question, admission controlled per client_key.
+
+    See FinanceAgentService.start_agent_output().
+
+    Raises:
+        AdmissionRejected: When a new model run is refused or shed
+    """
+    return await FinanceAgentService.start_agent_output(
+        user_query,
+        finance_info,
+        chat_history,
+        finance_hash,
+        store,
+        stream_mode,
+        conversation_id,
+        client_key,
+    )
+
+
 # Convenience function for backward compatibility
 async def process_agent_output(
-    user_query: str, finance_info: FinanceInfo, chat_history: List[ChatMessage]
+    user_query: str,
+    finance_info: FinanceInfo,
+    chat_history: List[ChatMessage],
+    finance_hash: Optional[str] = None,
+    store: Optional[TransactionStore] = None,
+    stream_mode: StreamMode = "full",
+    conversation_id: Optional[str] = None,
 ) -> AsyncIterator[str]:
     """
     Process the agent output with user query, finance info, and chat history.
@@ -172,11 +827,21 @@ async def process_agent_output(
         user_query: The user's question
         finance_info: The user's financial information
         chat_history: Previous conversation history
+        finance_hash: Precomputed content hash of finance_info, if known
+        store: Columnar store of the transactions, looked up when omitted
+        stream_mode: "full" or "delta"
+        conversation_id: Client supplied conversation id, keys the history summary
 
     Yields:
         Newline-delimited JSON strings containing validated AgentResponse objects
     """
     async for response in FinanceAgentService.process_agent_output(
-        user_query, finance_info, chat_history
+        user_query,
+        finance_info,
+        chat_history,
+        finance_hash,
+        store,
+        stream_mode,
+        conversation_id,
     ):
         yield response
@@ -0,0 +1,519 @@
+import os
+from datetime import date, timedelta
+from threading import Lock
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.model.analytics_model import (
+    AccountBalanceHistory,
+    BalancePoint,
+    BudgetStatus,
+    CashFlowPeriod,
+    CategoryTotal,
+    FinanceAnalyticsReport,
+    MerchantTotal,
+    RecurringPayment,
+)
+from app.model.finance_model import FinanceInfo
+from app.services.cache_service import LRUCache, register_cache
+from app.services.transaction_service import TransactionStore, get_transaction_store
+from app.services.utility_service import compute_finance_hash
+
+
+# Payments to one merchant needed before they can count as recurring
+RECURRING_MIN_OCCURRENCES = int(os.getenv("RECURRING_MIN_OCCURRENCES", "3"))
+
+# Recognised payment intervals: name, length in days and tolerance in days
+_FREQUENCIES = (
+    ("weekly", 7.0, 1.5),
+    ("biweekly", 14.0, 2.0),
+    ("monthly", 30.44, 4.0),
+    ("quarterly", 91.31, 10.0),
+    ("yearly", 365.25, 15.0),
+)
+
+# Share of the intervals between payments that must match the frequency
+_REGULAR_SHARE = 0.75
+
+# Relative spread (std / mean) of the amounts: at most this for a recurring
+# payment, and below the second for a fixed amount such as a subscription
+_MAX_AMOUNT_SPREAD = 0.5
+_FIXED_AMOUNT_SPREAD = 0.05
+
+_DAYS_PER_MONTH = 30.44
+_EPOCH = date(1970, 1, 1)
+
+
+def _add(table: Dict, key, count: int, total: float) -> None:
+    """Add a count and a total to the [count, total] entry of key."""
+    entry = table.get(key)
+    if entry is None:
+        table[key] = [count, total]
+    else:
+        entry[0] += count
+        entry[1] += total
+
+
+def _detect_recurring(
+    merchant: str, payments: List[Tuple[int, float]]
+) -> Optional[RecurringPayment]:
+    """
+    Decide whether the payments to a merchant follow a regular schedule.
+
+    Payments on the same day count as one. The median interval between
+    payment days must match a known frequency, most intervals must be close
+    to it and the amounts must not vary too much.
+
+    Args:
+        merchant: Merchant name
+        payments: (day number since 1970-01-01, amount) of every debit
+
+    Returns:
+        The RecurringPayment, or None when the payments are not regular
+    """
+    by_day: Dict[int, float] = {}
+    for day, amount in payments:
+        by_day[day] = by_day.get(day, 0.0) + amount
+    if len(by_day) < RECURRING_MIN_OCCURRENCES:
+        return None
+
+    days = np.array(sorted(by_day), dtype=np.int64)
+    amounts = np.array([by_day[day] for day in days.tolist()], dtype=np.float64)
+    intervals = np.diff(days).astype(np.float64)
+    median = float(np.median(intervals))
+    for frequency, length, tolerance in _FREQUENCIES:
+        if abs(median - length) <= tolerance:
+            break
+    else:
+        return None
+
+    regular = np.abs(intervals - length) <= tolerance
+    if regular.mean() < _REGULAR_SHARE:
+        return None
+    mean = float(amounts.mean())
+    if mean <= 0:
+        return None
+    spread = float(amounts.std()) / mean
+    if spread > _MAX_AMOUNT_SPREAD:
+        return None
+
+    interval = float(intervals[regular].mean())
+    last = _EPOCH + timedelta(days=int(days[-1]))
+    return RecurringPayment(
+        merchant=merchant,
+        frequency=frequency,
+        interval_days=round(interval, 1),
+        occurrences=len(days),
+        average_amount=round(mean, 2),
+        fixed_amount=spread <= _FIXED_AMOUNT_SPREAD,
+        monthly_cost=round(mean * _DAYS_PER_MONTH / interval, 2),
+        last_date=last,
+        next_expected_date=last + timedelta(days=round(interval)),
+    )
+
+
+class FinanceAnalytics:
+    """
+    Pre-computed aggregates of a user's finance data, maintained incrementally.
+
+    Cash flow per month and per week, net flow per account and month,
+    category and merchant rollups and the debits paid to every merchant are
+    accumulated from the columnar store. update() folds in only the rows
+    appended since the previous call, so new transactions never cause a
+    rescan of the history. Running balances, recurring payments and budget
+    vs actual are derived from these small tables when asked for; recurring
+    payments are re-detected only for merchants that were paid again.
+    """
+
+    def __init__(
+        self, finance_info: FinanceInfo, store: Optional[TransactionStore] = None
+    ):
+        """
+        Args:
+            finance_info: FinanceInfo object; its accounts and budgets are used
+            store: Columnar store of the transactions to aggregate, if any yet
+        """
+        self.accounts = finance_info.accounts or []
+        self.budgets = finance_info.budgets or []
+        self.rows = 0
+        self._lock = Lock()
+        self._months: Dict[str, Dict[str, List]] = {}
+        self._weeks: Dict[str, Dict[str, List]] = {}
+        self._account_months: Dict[str, Dict[str, float]] = {}
+        self._categories: Dict[Tuple[str, str], List] = {}
+        self._merchants: Dict[Tuple[str, str], List] = {}
+        self._payments: Dict[str, List[Tuple[int, float]]] = {}
+        self._recurring: Dict[str, Optional[RecurringPayment]] = {}
+        self._dirty: Set[str] = set()
+        if store is not None:
+            self.update(store)
+
+    def copy(self) -> "FinanceAnalytics":
+        """
+        Return an independent copy that can be updated without changing self.
+
+        Only the aggregate tables are copied, which is much cheaper than
+        rebuilding them from the store.
+        """
+        clone = FinanceAnalytics.__new__(FinanceAnalytics)
+        with self._lock:
+            clone.accounts = self.accounts
+            clone.budgets = self.budgets
+            clone.rows = self.rows
+            clone._lock = Lock()
+            clone._months = {
+                period: {key: list(entry) for key, entry in types.items()}
+                for period, types in self._months.items()
+            }
+            clone._weeks = {
+                period: {key: list(entry) for key, entry in types.items()}
+                for period, types in self._weeks.items()
+            }
+            clone._account_months = {
+                account: dict(flows) for account, flows in self._account_months.items()
+            }
+            clone._categories = {key: list(entry) for key, entry in self._categories.items()}
+            clone._merchants = {key: list(entry) for key, entry in self._merchants.items()}
+            clone._payments = {
+                merchant: list(payments) for merchant, payments in self._payments.items()
+            }
+            clone._recurring = dict(self._recurring)
+            clone._dirty = set(self._dirty)
+        return clone
+
+    def update(self, store: TransactionStore) -> int:
+        """
+        Fold the rows appended since the last update into the aggregates.
+
+        Args:
+            store: The store the aggregates were built from, with rows
+                appended at the end (see TransactionStore.extend)
+
+        Returns:
+            Number of rows that were added
+        """
+        with self._lock:
+            if len(store) <= self.rows:
+                return 0
+            rows = np.arange(self.rows, len(store))
+
+            for key, table in (("month", self._months), ("week", self._weeks)):
+                for (period, type_name), (count, total) in store.totals(
+                    [key, "type"], rows
+                ).items():
+                    _add(table.setdefault(period, {}), type_name, count, total)
+            for labels, (count, total) in store.totals(
+                ["category", "type"], rows
+            ).items():
+                _add(self._categories, labels, count, total)
+            for labels, (count, total) in store.totals(
+                ["merchant", "type"], rows
+            ).items():
+                _add(self._merchants, labels, count, total)
+
+            # Credits flow in, debits and transfers out (as in balance_at_date)
+            for (account, period, type_name), (_, total) in store.totals(
+                ["account", "month", "type"], rows
+            ).items():
+                if account == "unassigned" or period == "undated":
+                    continue
+                flows = self._account_months.setdefault(account, {})
+                change = total if type_name == "credit" else -total
+                flows[period] = flows.get(period, 0.0) + change
+
+            debits = rows[
+                (store.type_codes[rows] == store.types.lookup("debit"))
+                & ~np.isnat(store.dates[rows])
+            ]
+            labels = store.merchants.labels
+            for code, day, amount in zip(
+                store.merchant_codes[debits].tolist(),
+                store.dates[debits].astype("datetime64[D]").view(np.int64).tolist(),
+                store.amounts[debits].tolist(),
+            ):
+                merchant = labels[code]
+                if merchant and merchant != "Unknown":
+                    self._payments.setdefault(merchant, []).append((day, amount))
+                    self._dirty.add(merchant)
+
+            added = len(store) - self.rows
+            self.rows = len(store)
+            return added
+
+    @staticmethod
+    def _cash_flow(
+        table: Dict[str, Dict[str, List]], last: Optional[int]
+    ) -> List[CashFlowPeriod]:
+        periods = sorted(period for period in table if period != "undated")
+        if last is not None:
+            periods = periods[-last:] if last > 0 else []
+        result = []
+        for period in periods:
+            types = table[period]
+            credit = types.get("credit", (0, 0.0))[1]
+            debit = types.get("debit", (0, 0.0))[1]
+            result.append(
+                CashFlowPeriod(
+                    period=period,
+                    credit=round(credit, 2),
+                    debit=round(debit, 2),
+                    transfer=round(types.get("transfer", (0, 0.0))[1], 2),
+                    net=round(credit - debit, 2),
+                    transactions=sum(count for count, _ in types.values()),
+                )
+            )
+        return result
+
+    def cash_flow(
+        self, period: str = "month", last: Optional[int] = None
+    ) -> List[CashFlowPeriod]:
+        """
+        Return money in and out per month or per week, oldest first.
+
+        Args:
+            period: month (labelled YYYY-MM) or week (labelled by its Monday)
+            last: Only the most recent periods, when given
+
+        Returns:
+            Credit, debit and transfer totals and credit minus debit per period
+
+        Raises:
+            ValueError: If period is not month or week
+        """
+        if period not in ("month", "week"):
+            raise ValueError(f"Unsupported cash flow period: {period}")
+        with self._lock:
+            return self._cash_flow(
+                self._months if period == "month" else self._weeks, last
+            )
+
+    def type_totals(self) -> Dict[str, Tuple[int, float]]:
+        """Return the count and total amount per transaction type."""
+        totals: Dict[str, List] = {}
+        with self._lock:
+            for (_, type_name), (count, total) in self._categories.items():
+                _add(totals, type_name, count, total)
+        return {name: (count, total) for name, (count, total) in sorted(totals.items())}
+
+    def running_balances(
+        self, account_id: Optional[str] = None
+    ) -> List[AccountBalanceHistory]:
+        """
+        Return the month-end balance of every account.
+
+        Works back from each account's current balance by undoing the net flow
+        of every later month. Transactions without an account id cannot be
+        attributed and are ignored.
+
+        Args:
+            account_id: Only this account; all accounts when omitted
+
+        Returns:
+            Net flow and closing balance per month and account, oldest first
+        """
+        results = []
+        with self._lock:
+            for account in self.accounts:
+                acc_id = str(account.id) if account.id else None
+                if acc_id is None or (account_id is not None and acc_id != account_id):
+                    continue
+                flows = self._account_months.get(acc_id, {})
+                balance = account.balance
+                months = []
+                for period in sorted(flows, reverse=True):
+                    months.append(
+                        BalancePoint(
+                            period=period,
+                            net_flow=round(flows[period], 2),
+                            closing_balance=(
+                                round(balance, 2) if balance is not None else None
+                            ),
+                        )
+                    )
+                    if balance is not None:
+                        balance -= flows[period]
+                results.append(
+                    AccountBalanceHistory(
+                        account_id=acc_id,
+                        account_name=account.account_name,
+                        bank_name=account.bank_name,
+                        balance=account.balance,
+                        months=months[::-1],
+                    )
+                )
+        return results
+
+    def categories(self) -> List[CategoryTotal]:
+        """Return the count and total per category and type, sorted by name."""
+        with self._lock:
+            return [
+                CategoryTotal(
+                    category=category,
+                    type=type_name,
+                    count=count,
+                    total=round(total, 2),
+                )
+                for (category, type_name), (count, total) in sorted(
+                    self._categories.items()
+                )
+            ]
+
+    def merchants(
+        self, type: Optional[str] = "debit", limit: Optional[int] = None
+    ) -> List[MerchantTotal]:
+        """
+        Return merchants ordered by total amount, largest first.
+
+        Args:
+            type: Only this transaction type (debit, i.e. spending, by default);
+                every type when None
+            limit: Maximum number of entries to return
+
+        Returns:
+            Count and total per merchant and type
+        """
+        with self._lock:
+            items = [
+                (merchant, type_name, count, total)
+                for (merchant, type_name), (count, total) in self._merchants.items()
+                if type is None or type_name == type
+            ]
+        items.sort(key=lambda item: (-item[3], item[0], item[1]))
+        return [
+            MerchantTotal(
+                merchant=merchant, type=type_name, count=count, total=round(total, 2)
+            )
+            for merchant, type_name, count, total in items[:limit]
+        ]
+
+    def recurring(self) -> List[RecurringPayment]:
+        """Return the detected recurring payments, highest monthly cost first."""
+        with self._lock:
+            for merchant in self._dirty:
+                self._recurring[merchant] = _detect_recurring(
+                    merchant, self._payments[merchant]
+                )
+            self._dirty.clear()
+            found = [
+                payment for payment in self._recurring.values() if payment is not None
+            ]
+        return sorted(
+            found, key=lambda payment: (-payment.monthly_cost, payment.merchant)
+        )
+
+    def budget_status(
+        self, year: Optional[int] = None, month: Optional[int] = None
+    ) -> List[BudgetStatus]:
+        """
+        Compare monthly budgets with actual debit spending.
+
+        Args:
+            year: Only budgets of this year
+            month: Only budgets of this month (1-12)
+
+        Returns:
+            Budget, amount spent, remaining amount and percentage used per month
+        """
+        results = []
+        with self._lock:
+            for budget in self.budgets:
+                if budget.year is None or budget.month is None:
+                    continue
+                if year is not None and budget.year != year:
+                    continue
+                if month is not None and budget.month != month:
+                    continue
+                period = f"{budget.year}-{budget.month:02d}"
+                spent = round(self._months.get(period, {}).get("debit", (0, 0.0))[1], 2)
+                amount = budget.amount or 0.0
+                results.append(
+                    BudgetStatus(
+                        period=period,
+                        budget=amount,
+                        spent=spent,
+                        remaining=round(amount - spent, 2),
+                        percent_used=round(100 * spent / amount, 1) if amount else None,
+                    )
+                )
+        return sorted(results, key=lambda status: status.period)
+
+    def report(self, merchant_limit: Optional[int] = 20) -> FinanceAnalyticsReport:
+        """
+        Return every aggregate at once.
+
+        Args:
+            merchant_limit: Maximum number of merchants per transaction type
+
+        Returns:
+            FinanceAnalyticsReport
+        """
+        return FinanceAnalyticsReport(
+            transactions=self.rows,
+            monthly_cash_flow=self.cash_flow("month"),
+            weekly_cash_flow=self.cash_flow("week"),
+            accounts=self.running_balances(),
+            categories=self.categories(),
+            merchants=[
+                merchant
+                for type_name in ("debit", "credit", "transfer")
+                for merchant in self.merchants(type_name, merchant_limit)
+            ],
+            recurring=self.recurring(),
+            budgets=self.budget_status(),
+        )
+
+
+_analytics_cache = register_cache(
+    "analytics",
+    LRUCache(maxsize=int(os.getenv("ANALYTICS_CACHE_SIZE", "32"))),
+)
+
+
+def get_finance_analytics(
+    finance_info: FinanceInfo,
+    store: Optional[TransactionStore] = None,
+    finance_hash: Optional[str] = None,
+) -> FinanceAnalytics:
+    """
+    Return the analytics of finance_info, built once per content hash.
+
+    Args:
+        finance_info: FinanceInfo object containing user's financial data
+        store: Columnar store of the transactions, looked up when omitted
+        finance_hash: Precomputed content hash of finance_info, if known
+
+    Returns:
+        FinanceAnalytics instance
+    """
+    key = finance_hash or compute_finance_hash(finance_info)
+    analytics = _analytics_cache.get(key)
+    if analytics is None:
+        if store is None:
+            store = get_transaction_store(finance_info, key)
+        analytics = FinanceAnalytics(finance_info, store)
+        _analytics_cache.set(key, analytics)
+    return analytics
+
+
+def advance_finance_analytics(
+    previous_hash: str, content_hash: str, store: TransactionStore
+) -> None:
+    """
+    Move the analytics of a dataset to its new content hash after an append.
+
+    Only the appended rows are aggregated, into a copy: other datasets with
+    the previous content share its cached analytics, which stay unchanged.
+    Nothing happens when the analytics of the previous content were never
+    built.
+
+    Args:
+        previous_hash: Content hash before the append
+        content_hash: Content hash after the append
+        store: The store with the appended rows at the end
+    """
+    previous = _analytics_cache.get(previous_hash)
+    if previous is not None:
+        analytics = previous.copy()
+        analytics.update(store)
+        _analytics_cache.set(content_hash, analytics)
@@ -0,0 +1,523 @@
+import hashlib
+import os
+from abc import ABC, abstractmethod
+import sqlite3
+import uuid
+from datetime import datetime, timezone
+from threading import Lock
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional, Union
+
+from app.model.dataset_model import DatasetInfo
+from app.model.finance_model import FinanceInfo, Transaction
+from app.services.analytics_service import advance_finance_analytics
+from app.services.cache_service import LRUCache, register_cache
+from app.services.ingest_service import ingest_finance_chunks, ingest_finance_json
+from app.services.retrieval_service import (
+    IndexSegment,
+    TransactionIndex,
+    advance_transaction_index,
+    get_transaction_index,
+)
+from app.services.transaction_service import TransactionStore, transaction_content_key
+from app.services.utility_service import compute_finance_hash
+
+
+def _chain_hash(previous_hash: str, transactions: List[Transaction]) -> str:
+    """Derive the content hash after appending transactions to a dataset."""
+    digest = hashlib.sha256(previous_hash.encode("utf-8"))
+    for trans in transactions:
+        digest.update(trans.model_dump_json(by_alias=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class FinanceDataset:
+    """
+    A parsed finance export stored server-side under a session id.
+
+    Holds the accounts, budgets and export info as a FinanceInfo and the
+    transactions in a columnar TransactionStore, so that chat turns can
+    reference the data by id instead of re-uploading it.
+    """
+
+    def __init__(
+        self,
+        dataset_id: str,
+        finance_info: FinanceInfo,
+        store: Optional[TransactionStore] = None,
+        content_hash: Optional[str] = None,
+        created_at: Optional[datetime] = None,
+        updated_at: Optional[datetime] = None,
+    ):
+        """
+        Args:
+            dataset_id: Session id of the dataset
+            finance_info: The export; its transactions move into the store
+                when no store is given
+            store: Columnar store of the transactions, if already built
+            content_hash: Content hash of the export, computed when omitted
+            created_at: Creation time, defaults to now
+            updated_at: Time of the last append, defaults to created_at
+        """
+        self.dataset_id = dataset_id
+        self.content_hash = content_hash or compute_finance_hash(finance_info)
+        if store is None:
+            store = TransactionStore.from_finance_info(finance_info)
+        if finance_info.transactions is not None:
+            # The store replaces the per-row models
+            finance_info = finance_info.model_copy(update={"transactions": None})
+        self.finance_info = finance_info
+        self.store = store
+        self.created_at = created_at or datetime.now(timezone.utc)
+        self.updated_at = updated_at or self.created_at
+        self._lock = Lock()
+        self._transaction_ids = store.id_set()
+        self._content_keys = store.content_keys()
+
+    @classmethod
+    def create(
+        cls,
+        finance_info: FinanceInfo,
+        store: Optional[TransactionStore] = None,
+        content_hash: Optional[str] = None,
+    ) -> "FinanceDataset":
+        """
+        Create a new dataset with a freshly generated session id.
+
+        Args:
+            finance_info: FinanceInfo object containing user's financial data
+            store: Columnar store of the transactions, if already built
+            content_hash: Content hash of the export, computed when omitted
+
+        Returns:
+            FinanceDataset instance
+        """
+        return cls(
+            dataset_id=uuid.uuid4().hex,
+            finance_info=finance_info,
+            store=store,
+            content_hash=content_hash,
+        )
+
+    @property
+    def transaction_count(self) -> int:
+        return len(self.store)
+
+    def append_transactions(
+        self,
+        transactions: Iterable[Transaction],
+        persist: Optional[Callable[["FinanceDataset", List[Transaction]], None]] = None,
+    ) -> List[Transaction]:
+        """
+        Append new transactions to the dataset, skipping ones it already holds.
+
+        Transactions are matched by id, and by their content when they have
+        no id, so a client sending the same rows again adds nothing.
+
+        Args:
+            transactions: Transactions to append
+            persist: Called with the dataset and the added transactions
+                before the dataset lock is released, so that appends are
+                persisted in the order they were applied
+
+        Returns:
+            The transactions that were actually added
+        """
+        with self._lock:
+            added = []
+            for trans in transactions:
+                if trans.id is not None:
+                    if trans.id.bytes in self._transaction_ids:
+                        continue
+                    self._transaction_ids.add(trans.id.bytes)
+                else:
+                    key = transaction_content_key(trans)
+                    if key in self._content_keys:
+                        continue
+                    self._content_keys.add(key)
+                added.append(trans)
+
+            if not added:
+                return added
+
+            self.store = self.store.extend(added)
+
+            export = self.finance_info.export_info
+            if export and export.total_transactions is not None:
+                export.total_transactions += len(added)
+
+            previous_hash = self.content_hash
+            self.content_hash = _chain_hash(previous_hash, added)
+            # Aggregate and index only the new rows instead of rebuilding
+            advance_finance_analytics(previous_hash, self.content_hash, self.store)
+            advance_transaction_index(previous_hash, self.content_hash, self.store)
+            self.updated_at = datetime.now(timezone.utc)
+            if persist is not None:
+                persist(self, added)
+            return added
+
+
+# A raw JSON export, either in memory or as a binary file to read it from
+Payload = Union[str, bytes, BinaryIO]
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+class DatasetStore(ABC):
+    """
+    Base class for finance dataset storage backends.
+
+    A backend that does not implement every method cannot be instantiated.
+    """
+
+    # Whether put() persists the raw payload (and therefore needs it)
+    keeps_payload = False
+
+    @abstractmethod
+    def get(self, dataset_id: str) -> Optional[FinanceDataset]:
+        """Return the dataset, or None if it is unknown."""
+
+    @abstractmethod
+    def put(self, dataset: FinanceDataset, payload: Payload) -> None:
+        """Persist a new dataset together with the JSON export it was parsed from."""
+
+    @abstractmethod
+    def append(self, dataset: FinanceDataset, transactions: List[Transaction]) -> None:
+        """Persist transactions that were just appended to dataset."""
+
+    @abstractmethod
+    def delete(self, dataset_id: str) -> bool:
+        """Remove the dataset; return whether it existed."""
+
+
+class InMemoryDatasetStore(DatasetStore):
+    """Process-local store keeping the most recently used datasets in an LRU."""
+
+    def __init__(self, maxsize: int = 32):
+        self._cache = register_cache("datasets", LRUCache(maxsize=maxsize))
+
+    def get(self, dataset_id: str) -> Optional[FinanceDataset]:
+        return self._cache.get(dataset_id)
+
+    def put(self, dataset: FinanceDataset, payload: Optional[Payload] = None) -> None:
+        # The parsed dataset is kept as is, the raw payload is not needed
+        self._cache.set(dataset.dataset_id, dataset)
+
+    def append(self, dataset: FinanceDataset, transactions: List[Transaction]) -> None:
+        # The dataset object is shared, so the in-memory copy is already up to date
+        self._cache.set(dataset.dataset_id, dataset)
+
+    def delete(self, dataset_id: str) -> bool:
+        return self._cache.pop(dataset_id) is not None
+
+
+class SQLiteDatasetStore(DatasetStore):
+    """
+    On-disk store backed by SQLite.
+
+    The original upload is stored once and appended transactions are stored
+    as separate delta rows, so appends never rewrite the whole export. Exports
+    given as a file (streamed uploads) are stored in 1 MB chunks and parsed
+    back incrementally. The retrieval index is stored the same way, one
+    segment per upload or append, so it is never rebuilt when a dataset is
+    loaded back. Parsed datasets are kept in an in-memory LRU in front of the
+    database.
+    """
+
+    keeps_payload = True
+
+    def __init__(self, path: str, cache_size: int = 8):
+        self.path = path
+        self._memory = InMemoryDatasetStore(maxsize=cache_size)
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS datasets ("
+                "dataset_id TEXT PRIMARY KEY, content_hash TEXT NOT NULL, "
+                "payload TEXT NOT NULL, created_at TEXT NOT NULL, "
+                "updated_at TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS dataset_transactions ("
+                "dataset_id TEXT NOT NULL, seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "payload TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_dataset_transactions "
+                "ON dataset_transactions (dataset_id, seq)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS dataset_chunks ("
+                "dataset_id TEXT NOT NULL, seq INTEGER NOT NULL, "
+                "data BLOB NOT NULL, PRIMARY KEY (dataset_id, seq))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS dataset_index_segments ("
+                "dataset_id TEXT NOT NULL, start_row INTEGER NOT NULL, "
+                "end_row INTEGER NOT NULL, data BLOB NOT NULL, "
+                "PRIMARY KEY (dataset_id, start_row))"
+            )
+
+    def _read_chunks(self, dataset_id: str) -> Iterator[bytes]:
+        """Yield the stored chunks of an export one at a time."""
+        seq = -1
+        while True:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT seq, data FROM dataset_chunks "
+                    "WHERE dataset_id = ? AND seq > ? ORDER BY seq LIMIT 1",
+                    (dataset_id, seq),
+                ).fetchone()
+            if row is None:
+                return
+            seq, data = row
+            yield data
+
+    def _save_index(self, dataset_id: str, index: TransactionIndex) -> None:
+        """Persist the index segments that extend the stored ones."""
+        with self._lock, self._conn:
+            (end,) = self._conn.execute(
+                "SELECT COALESCE(MAX(end_row), 0) FROM dataset_index_segments "
+                "WHERE dataset_id = ?",
+                (dataset_id,),
+            ).fetchone()
+            for segment in index.segments:
+                # Segments rebuilt over rows that are already stored are skipped
+                if segment.start == end:
+                    self._conn.execute(
+                        "INSERT INTO dataset_index_segments "
+                        "(dataset_id, start_row, end_row, data) VALUES (?, ?, ?, ?)",
+                        (dataset_id, segment.start, segment.end, segment.to_bytes()),
+                    )
+                    end = segment.end
+
+    def get(self, dataset_id: str) -> Optional[FinanceDataset]:
+        dataset = self._memory.get(dataset_id)
+        if dataset is not None:
+            return dataset
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, payload, created_at, updated_at "
+                "FROM datasets WHERE dataset_id = ?",
+                (dataset_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            deltas = self._conn.execute(
+                "SELECT payload FROM dataset_transactions "
+                "WHERE dataset_id = ? ORDER BY seq",
+                (dataset_id,),
+            ).fetchall()
+            segments = self._conn.execute(
+                "SELECT data FROM dataset_index_segments "
+                "WHERE dataset_id = ? ORDER BY start_row",
+                (dataset_id,),
+            ).fetchall()
+
+        content_hash, payload, created_at, updated_at = row
+        if payload:
+            finance_info, store = ingest_finance_json(payload)
+        else:
+            finance_info, store = ingest_finance_chunks(self._read_chunks(dataset_id))
+        if deltas:
+            store = store.extend(
+                Transaction.model_validate_json(delta) for (delta,) in deltas
+            )
+            export = finance_info.export_info
+            if export and export.total_transactions is not None:
+                export.total_transactions += len(deltas)
+
+        dataset = FinanceDataset(
+            dataset_id=dataset_id,
+            finance_info=finance_info,
+            store=store,
+            content_hash=content_hash,
+            created_at=datetime.fromisoformat(created_at),
+            updated_at=datetime.fromisoformat(updated_at),
+        )
+        index = get_transaction_index(
+            store, content_hash, [IndexSegment.from_bytes(data) for (data,) in segments]
+        )
+        self._save_index(dataset_id, index)
+        self._memory.put(dataset)
+        return dataset
+
+    def put(self, dataset: FinanceDataset, payload: Payload) -> None:
+        chunked = not isinstance(payload, (str, bytes))
+        with self._lock, self._conn:
+            for table in (
+                "dataset_transactions",
+                "dataset_chunks",
+                "dataset_index_segments",
+            ):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE dataset_id = ?", (dataset.dataset_id,)
+                )
+            if chunked:
+                for seq, data in enumerate(iter(lambda: payload.read(_CHUNK_SIZE), b"")):
+                    self._conn.execute(
+                        "INSERT INTO dataset_chunks (dataset_id, seq, data) "
+                        "VALUES (?, ?, ?)",
+                        (dataset.dataset_id, seq, data),
+                    )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO datasets "
+                "(dataset_id, content_hash, payload, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    dataset.dataset_id,
+                    dataset.content_hash,
+                    "" if chunked else payload,
+                    dataset.created_at.isoformat(),
+                    dataset.updated_at.isoformat(),
+                ),
+            )
+        self._save_index(
+            dataset.dataset_id, get_transaction_index(dataset.store, dataset.content_hash)
+        )
+        self._memory.put(dataset)
+
+    def append(self, dataset: FinanceDataset, transactions: List[Transaction]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO dataset_transactions (dataset_id, payload) VALUES (?, ?)",
+                [
+                    (dataset.dataset_id, trans.model_dump_json(by_alias=True))
+                    for trans in transactions
+                ],
+            )
+            self._conn.execute(
+                "UPDATE datasets SET content_hash = ?, updated_at = ? "
+                "WHERE dataset_id = ?",
+                (
+                    dataset.content_hash,
+                    dataset.updated_at.isoformat(),
+                    dataset.dataset_id,
+                ),
+            )
+        self._save_index(
+            dataset.dataset_id, get_transaction_index(dataset.store, dataset.content_hash)
+        )
+        self._memory.put(dataset)
+
+    def delete(self, dataset_id: str) -> bool:
+        self._memory.delete(dataset_id)
+        with self._lock, self._conn:
+            for table in (
+                "dataset_transactions",
+                "dataset_chunks",
+                "dataset_index_segments",
+            ):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE dataset_id = ?", (dataset_id,)
+                )
+            cursor = self._conn.execute(
+                "DELETE FROM datasets WHERE dataset_id = ?", (dataset_id,)
+            )
+        return cursor.rowcount > 0
+
+
+_store: Optional[DatasetStore] = None
+_store_lock = Lock()
+
+
+def get_dataset_store() -> DatasetStore:
+    """
+    Return the process-wide dataset store.
+
+    The backend is selected with the DATASET_STORE environment variable
+    ("memory" by default, or "sqlite" together with DATASET_STORE_PATH).
+
+    Returns:
+        DatasetStore instance
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = os.getenv("DATASET_STORE", "memory").lower()
+                if backend == "sqlite":
+                    _store = SQLiteDatasetStore(
+                        os.getenv("DATASET_STORE_PATH", "datasets.sqlite3")
+                    )
+                elif backend == "memory":
+                    _store = InMemoryDatasetStore(
+                        maxsize=int(os.getenv("DATASET_STORE_SIZE", "32"))
+                    )
+                else:
+                    raise ValueError(f"Unsupported dataset store backend: {backend}")
+    return _store
+
+
+def create_dataset(
+    finance_info: FinanceInfo,
+    store: Optional[TransactionStore] = None,
+    payload: Optional[Payload] = None,
+    content_hash: Optional[str] = None,
+) -> FinanceDataset:
+    """
+    Parse-once entry point: wrap finance_info in a dataset and store it.
+
+    Args:
+        finance_info: FinanceInfo object containing user's financial data
+        store: Columnar store of the transactions, if already built (for
+            example by ingest_finance_json)
+        payload: Raw JSON export finance_info was parsed from, in memory or
+            as a binary file. Serialised from finance_info when neither it nor
+            content_hash is given. Only required by stores that keep it.
+        content_hash: compute_finance_hash of the export, so uploaded and
+            inline copies of the same data share their cached results.
+            Computed from finance_info when omitted, which then has to hold
+            the transactions.
+
+    Returns:
+        The stored FinanceDataset
+    """
+    if payload is None and content_hash is None:
+        payload = finance_info.model_dump_json(by_alias=True)
+    if content_hash is None:
+        content_hash = compute_finance_hash(finance_info)
+    dataset = FinanceDataset.create(finance_info, store=store, content_hash=content_hash)
+    get_dataset_store().put(dataset, payload)
+    return dataset
+
+
+def get_dataset(dataset_id: str) -> Optional[FinanceDataset]:
+    """Look up a stored dataset by id."""
+    return get_dataset_store().get(dataset_id)
+
+
+def append_transactions(
+    dataset: FinanceDataset, transactions: List[Transaction]
+) -> List[Transaction]:
+    """
+    Append new transactions to a stored dataset and persist the delta.
+
+    Args:
+        dataset: Dataset to update
+        transactions: New transactions sent by the client
+
+    Returns:
+        The transactions that were actually added (duplicates are skipped)
+    """
+    return dataset.append_transactions(transactions, persist=get_dataset_store().append)
+
+
+def delete_dataset(dataset_id: str) -> bool:
+    """Remove a dataset from the store. Returns True if it existed."""
+    return get_dataset_store().delete(dataset_id)
+
+
+def dataset_summary(dataset: FinanceDataset) -> DatasetInfo:
+    """Describe a stored dataset for API responses."""
+    info = dataset.finance_info
+    return DatasetInfo(
+        dataset_id=dataset.dataset_id,
+        content_hash=dataset.content_hash,
+        total_transactions=len(dataset.store),
+        total_accounts=len(info.accounts or []),
+        total_budgets=len(info.budgets or []),
+        created_at=dataset.created_at,
+        updated_at=dataset.updated_at,
+    )
@@ -0,0 +1,86 @@
+import os
+import re
+import zlib
+from threading import Lock
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.configs.model_config import EmbeddingModelName
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class LocalEmbeddingModel:
+    """
+    Local, dependency-free stand-in for an embedding model.
+
+    Texts are embedded by hashing their words and word bigrams into a fixed
+    number of signed buckets (the hashing trick) and L2-normalising the
+    result, so cosine similarity is a plain dot product. It captures lexical
+    overlap only, which is what near-duplicate questions share, and costs
+    microseconds per text with no network call or token usage.
+    """
+
+    def __init__(self, model_name: EmbeddingModelName, dim: int = 512):
+        """
+        Args:
+            model_name: Embedding model this instance stands in for
+            dim: Number of dimensions of the produced vectors
+        """
+        self.model_name = model_name
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = _TOKEN_RE.findall(text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts into unit-length vectors.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            float32 array of shape (len(texts), dim)
+        """
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                vectors[i, digest % self.dim] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+
+_models: Dict[EmbeddingModelName, LocalEmbeddingModel] = {}
+_models_lock = Lock()
+
+
+def get_embedding_model(
+    model_name: Optional[EmbeddingModelName] = None,
+) -> LocalEmbeddingModel:
+    """
+    Return the embedding model for the given name, created once per name.
+
+    Only the local stand-in is implemented; it is tagged with the requested
+    model name so callers and cache keys do not change once a hosted
+    embedding model is wired in.
+
+    Args:
+        model_name: Embedding model, defaults to the EMBEDDING_MODEL environment
+            variable (nomic-embed-text)
+
+    Returns:
+        The embedding model instance
+    """
+    if model_name is None:
+        model_name = EmbeddingModelName(os.getenv("EMBEDDING_MODEL", "nomic-embed-text"))
+    model = _models.get(model_name)
+    if model is None:
+        with _models_lock:
+            model = _models.setdefault(model_name, LocalEmbeddingModel(model_name))
+    return model
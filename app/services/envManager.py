@@ -1,11 +1,18 @@
 import os
+from functools import lru_cache
 
 from dotenv import load_dotenv
 
 
+@lru_cache(maxsize=None)
+def _load_env_file() -> None:
+    # Read the .env file once per process instead of on every lookup
+    load_dotenv()
+
+
 def get_env_variable(key):
     # Load environment variables from .env file
-    load_dotenv()
+    _load_env_file()
 
     # Get the value of the specified key
     value = os.getenv(key)
@@ -1,129 +1,267 @@
+from typing import Optional
+
+import numpy as np
+
 from app.model.finance_model import FinanceInfo
+from app.services.analytics_service import FinanceAnalytics
+from app.services.retrieval_service import TransactionIndex
+from app.services.transaction_service import TransactionStore
+from app.services.utility_service import estimate_tokens, extract_query_terms
+
+
+def format_amount(amount: float) -> str:
+    """Format an amount in Indian Rupees with thousands separators, sign first."""
+    if amount < 0:
+        return f"-₹{-amount:,.2f}"
+    return f"₹{amount:,.2f}"
+
+
+def _mask_account_number(number: Optional[str]) -> Optional[str]:
+    """Mask an account number down to its last four digits."""
+    if not number:
+        return None
+    return f"*{number[-4:]}"
 
 
-def flatten_finance_info(finance_info: FinanceInfo) -> str:
+def _truncate(text: str, limit: int) -> str:
+    """Collapse whitespace and cut text to at most limit characters."""
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+# Recurring payments and merchants listed in the finance summary
+_SUMMARY_RECURRING = 10
+_SUMMARY_MERCHANTS = 10
+
+
+def build_finance_summary(
+    finance_info: FinanceInfo,
+    store: Optional[TransactionStore] = None,
+    analytics: Optional[FinanceAnalytics] = None,
+) -> str:
     """
-    Flatten the FinanceInfo object into a readable paragraph text.
+    Build the aggregate section of the finance context.
+
+    Includes per-account balances, budget vs actual spending, totals per
+    transaction type, per month and per category, recurring payments and the
+    top merchants. Its size depends on the number of accounts, months and
+    categories, not on the number of rows.
 
     Args:
         finance_info: FinanceInfo object containing user's financial data
+        store: Columnar store of the transactions, built here when omitted
+        analytics: Pre-computed aggregates of the data, built here when omitted
 
     Returns:
-        Flattened finance information as text
+        Aggregate summary as text
     """
     parts = []
 
-    # Export info summary
     if finance_info.export_info:
         export = finance_info.export_info
         parts.append(
-            f"Financial data exported on {export.export_date} using app version {export.app_version}."
-        )
-        parts.append(
-            f"Data format: {export.data_format}. "
-            f"Total records: {export.total_transactions} transactions, "
-            f"{export.total_accounts} accounts, {export.total_budgets} budgets."
+            f"Financial data exported on {export.export_date} "
+            f"({export.total_transactions} transactions, "
+            f"{export.total_accounts} accounts, {export.total_budgets} budgets)."
         )
 
-    # Account details
     if finance_info.accounts:
-        parts.append(f"\n\nAccounts ({len(finance_info.accounts)} total):")
+        parts.append(f"\nAccounts ({len(finance_info.accounts)} total):")
+        net_worth = 0.0
         for acc in finance_info.accounts:
-            acc_info = f"- Account ID: {acc.id}"
-            if acc.account_name:
-                acc_info += f" | Name: {acc.account_name}"
-            if acc.account_number:
-                acc_info += f" | Number: {acc.account_number}"
+            acc_info = f"- {acc.account_name or 'Account'}"
             if acc.bank_name:
                 acc_info += f" | Bank: {acc.bank_name}"
+            masked = _mask_account_number(acc.account_number)
+            if masked:
+                acc_info += f" | Number: {masked}"
             if acc.account_type:
                 acc_info += f" | Type: {acc.account_type}"
             if acc.balance is not None:
-                acc_info += f" | Balance: ₹{acc.balance:.2f}"
+                acc_info += f" | Balance: {format_amount(acc.balance)}"
+                net_worth += acc.balance
             if acc.is_active is not None:
                 acc_info += f" | Status: {'Active' if acc.is_active else 'Inactive'}"
-            if acc.ifsc_code:
-                acc_info += f" | IFSC: {acc.ifsc_code}"
-            if acc.branch_name:
-                acc_info += f" | Branch: {acc.branch_name}"
-            if acc.description:
-                acc_info += f" | Description: {acc.description}"
-            if acc.created_at:
-                acc_info += f" | Created: {acc.created_at}"
-            if acc.updated_at:
-                acc_info += f" | Updated: {acc.updated_at}"
+            if acc.id:
+                acc_info += f" | Account ID: {acc.id}"
             parts.append(acc_info)
+        parts.append(f"Net worth across all accounts: {format_amount(net_worth)}")
+
+    # Aggregates maintained by the analytics engine
+    if analytics is None:
+        if store is None:
+            store = TransactionStore.from_finance_info(finance_info)
+        analytics = FinanceAnalytics(finance_info, store)
 
-    # Budget details
-    if finance_info.budgets:
-        parts.append(f"\n\nBudgets ({len(finance_info.budgets)} total):")
-        for budget in finance_info.budgets:
-            budget_info = f"- Budget ID: {budget.id} | Period: {budget.year}/{budget.month:02d} | Amount: ₹{budget.amount}"
-            if budget.created_at:
-                budget_info += f" | Created: {budget.created_at}"
-            if budget.updated_at:
-                budget_info += f" | Updated: {budget.updated_at}"
-            parts.append(budget_info)
-
-    # Transaction details
-    if finance_info.transactions:
-        parts.append(f"\n\nTransactions ({len(finance_info.transactions)} total):")
-
-        # Summarize by transaction type
-        credits = [
-            t for t in finance_info.transactions if t.type and t.type.value == "credit"
-        ]
-        debits = [
-            t for t in finance_info.transactions if t.type and t.type.value == "debit"
-        ]
-        transfers = [
-            t
-            for t in finance_info.transactions
-            if t.type and t.type.value == "transfer"
-        ]
-
-        if credits:
-            total_credits = sum(t.amount or 0 for t in credits)
+    budgets = analytics.budget_status()
+    if budgets:
+        parts.append(f"\nBudgets vs actual spending ({len(budgets)} total):")
+        for status in budgets:
+            label = "Remaining" if status.remaining >= 0 else "Over budget by"
             parts.append(
-                f"  Credit transactions: {len(credits)} totaling ₹{total_credits:.2f}"
+                f"- {status.period} | Budget: {format_amount(status.budget)}"
+                f" | Spent (debits): {format_amount(status.spent)}"
+                f" | {label}: {format_amount(abs(status.remaining))}"
             )
 
-        if debits:
-            total_debits = sum(t.amount or 0 for t in debits)
+    if analytics.rows:
+        parts.append(f"\nTransactions ({analytics.rows} total):")
+        for type_name, (count, total) in analytics.type_totals().items():
             parts.append(
-                f"  Debit transactions: {len(debits)} totaling ₹{total_debits:.2f}"
+                f"- {type_name.capitalize()} transactions: {count} "
+                f"totaling {format_amount(total)}"
             )
 
-        if transfers:
-            total_transfers = sum(t.amount or 0 for t in transfers)
+    months = analytics.cash_flow("month")
+    if months:
+        parts.append("\nMonthly totals (credit | debit | transfer | net of credit - debit):")
+        for month in reversed(months):
             parts.append(
-                f"  Transfer transactions: {len(transfers)} totaling ₹{total_transfers:.2f}"
+                f"- {month.period} | {format_amount(month.credit)} | "
+                f"{format_amount(month.debit)} | {format_amount(month.transfer)} | "
+                f"{format_amount(month.net)}"
             )
 
-        # Show all transactions with complete details
-        parts.append("\n  All Transactions Details:")
-        for trans in finance_info.transactions:
-            trans_info = f"  - Transaction ID: {trans.id}"
-            if trans.date:
-                trans_info += f" | Date: {trans.date}"
-            if trans.type:
-                trans_info += f" | Type: {trans.type.value}"
-            if trans.title:
-                trans_info += f" | Title: {trans.title}"
-            if trans.amount is not None:
-                trans_info += f" | Amount: ₹{trans.amount:.2f}"
-            if trans.category:
-                trans_info += f" | Category: {trans.category.value}"
-            if trans.account_id:
-                trans_info += f" | Account ID: {trans.account_id}"
-            if trans.location:
-                trans_info += f" | Location: {trans.location}"
-            if trans.description:
-                trans_info += f" | Description: {trans.description}"
-            if trans.sms_content:
-                trans_info += f" | SMS: {trans.sms_content}"
-            if trans.photos:
-                trans_info += f" | Photos: {len(trans.photos)} attached"
-            parts.append(trans_info)
+    categories = analytics.categories()
+    if categories:
+        parts.append("\nCategory totals:")
+        for item in categories:
+            parts.append(
+                f"- {item.category} ({item.type}): {item.count} transactions "
+                f"totaling {format_amount(item.total)}"
+            )
+
+    recurring = analytics.recurring()
+    if recurring:
+        parts.append("\nRecurring payments (detected from regular debits):")
+        for payment in recurring[:_SUMMARY_RECURRING]:
+            amount = "fixed" if payment.fixed_amount else "average"
+            parts.append(
+                f"- {payment.merchant} | {payment.frequency}, {payment.occurrences} "
+                f"payments | {amount} {format_amount(payment.average_amount)} | "
+                f"about {format_amount(payment.monthly_cost)} per month | "
+                f"next expected {payment.next_expected_date.isoformat()}"
+            )
+
+    merchants = analytics.merchants("debit", _SUMMARY_MERCHANTS)
+    if merchants:
+        parts.append("\nTop merchants by spending (debits):")
+        for item in merchants:
+            parts.append(
+                f"- {item.merchant}: {item.count} transactions "
+                f"totaling {format_amount(item.total)}"
+            )
 
     return "\n".join(parts)
+
+
+def format_transaction_row(store: TransactionStore, row: int) -> str:
+    """
+    Format a single transaction as a compact prompt line.
+
+    UUIDs are omitted, and the merchant, account, UPI reference, balance and
+    bank parsed from bank alerts replace the raw SMS and description; other
+    texts are included truncated, to keep the per-row token cost small.
+
+    Args:
+        store: Columnar store holding the transaction
+        row: Row index of the transaction in store
+
+    Returns:
+        One line of text describing the transaction
+    """
+    date = store.dates[row]
+    fields = [
+        "undated" if np.isnat(date) else str(date.astype("datetime64[m]")).replace("T", " ")
+    ]
+    type_name = store.types.labels[store.type_codes[row]]
+    if type_name:
+        fields.append(type_name)
+    fields.append(format_amount(float(store.amounts[row])))
+    merchant = store.merchants.labels[store.merchant_codes[row]]
+    title = store.titles.labels[store.title_codes[row]]
+    if merchant and merchant != "Unknown":
+        fields.append(_truncate(merchant, 60))
+    elif title:
+        fields.append(_truncate(title, 60))
+    category = store.categories.labels[store.category_codes[row]]
+    if category:
+        fields.append(f"category: {category}")
+    if store.locations[row]:
+        fields.append(f"location: {_truncate(store.locations[row], 60)}")
+    parsed = store.messages[row]
+    if parsed.account:
+        fields.append(f"a/c {parsed.account}")
+    if parsed.upi_ref:
+        fields.append(f"ref {parsed.upi_ref}")
+    if parsed.balance is not None:
+        fields.append(f"balance after: {format_amount(parsed.balance)}")
+    if parsed.bank:
+        fields.append(parsed.bank)
+    if parsed.account is None and parsed.upi_ref is None:
+        # Not a bank alert (e.g. a refund notice): the text carries the meaning
+        if store.descriptions[row]:
+            fields.append(f"desc: {_truncate(store.descriptions[row], 80)}")
+        if store.sms_contents[row]:
+            fields.append(f"SMS: {_truncate(store.sms_contents[row], 160)}")
+    return "- " + " | ".join(fields)
+
+
+def build_transaction_sample(
+    store: TransactionStore,
+    token_budget: int,
+    query: Optional[str] = None,
+    max_rows: Optional[int] = None,
+    index: Optional[TransactionIndex] = None,
+) -> str:
+    """
+    Format the transactions most relevant to a query within a token budget.
+
+    Rows are retrieved from the dataset's index, ranked by relevance to the
+    query (most recent first when there is no query match), and added until
+    the budget or max_rows is reached. Only the retrieved rows are formatted,
+    so the cost does not grow with the number of transactions. The output is
+    deterministic for a given dataset, budget and query.
+
+    Args:
+        store: Columnar store of the transactions
+        token_budget: Maximum number of tokens for the sample
+        query: The user's question, used to rank transactions
+        max_rows: Maximum number of transaction rows to include
+        index: Retrieval index of store, built here when omitted
+
+    Returns:
+        A header line followed by one line per transaction, or "" when no
+        row fits
+    """
+    total = len(store)
+    if not total:
+        return ""
+
+    remaining = token_budget
+    query_terms = extract_query_terms(query) if query else []
+
+    if index is None:
+        index = TransactionIndex(store)
+
+    rows = []
+    ranked = index.search(query_terms, total if max_rows is None else max_rows)
+    for row_index in ranked.tolist():
+        row = format_transaction_row(store, row_index)
+        cost = estimate_tokens(row) + 1
+        if cost > remaining:
+            break
+        rows.append(row)
+        remaining -= cost
+
+    if not rows:
+        return ""
+
+    if len(rows) == total:
+        header = f"Transaction details (all {len(rows)}):"
+    else:
+        header = (
+            f"Transaction details ({len(rows)} of {total}, "
+            "most relevant to the question first; the summary totals cover all):"
+        )
+    return "\n".join([header, *rows])
@@ -0,0 +1,294 @@
+import asyncio
+import json
+import os
+import uuid
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+)
+
+from app.services.cache_service import LRUCache, register_cache
+
+
+# Generations stay resumable for this many seconds after they were started
+GENERATION_BUFFER_TTL = float(os.getenv("GENERATION_BUFFER_TTL", "300"))
+
+# Interval in seconds between heartbeats sent to idle SSE clients
+SSE_HEARTBEAT_INTERVAL = float(os.getenv("SSE_HEARTBEAT_INTERVAL", "15"))
+
+# Reconnection delay in milliseconds suggested to SSE clients
+_SSE_RETRY_MS = 1000
+
+_generations = register_cache(
+    "generations",
+    LRUCache(
+        maxsize=int(os.getenv("GENERATION_BUFFER_SIZE", "256")),
+        ttl=GENERATION_BUFFER_TTL,
+    ),
+)
+
+
+class Generation:
+    """
+    An agent response that is produced independently of the client connection.
+
+    Frames are produced by a background task and buffered in order, so any
+    number of clients can follow the generation and a client that lost its
+    connection can resume after the last frame it received instead of
+    starting a new model run.
+    """
+
+    def __init__(self, generation_id: str):
+        """
+        Args:
+            generation_id: Identifier clients use to resume the generation
+        """
+        self.generation_id = generation_id
+        self.frames: List[str] = []
+        self.done = False
+        self.error: Optional[str] = None
+        self.exception: Optional[Exception] = None
+        # Why the run was refused before it started, if it was
+        self.rejection: Optional[BaseException] = None
+        # Requests currently reading the generation through coalesce()
+        self.subscribers = 0
+        self._changed = asyncio.Condition()
+        self._started = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, frames: AsyncIterator[str]) -> None:
+        """Consume frames in a background task that outlives the request."""
+        self._task = asyncio.create_task(self._produce(frames))
+        self._started.set()
+
+    def reject(self, error: BaseException) -> None:
+        """End a generation whose run was refused before it started."""
+        self.rejection = error
+        self.error = str(error)
+        self.done = True
+        self._started.set()
+
+    async def wait_started(self) -> None:
+        """Wait until the run has started or was rejected."""
+        await self._started.wait()
+
+    def cancel(self) -> None:
+        """Stop producing frames; followers see the generation end."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    async def _produce(self, frames: AsyncIterator[str]) -> None:
+        try:
+            async for frame in frames:
+                async with self._changed:
+                    self.frames.append(frame.rstrip("\n"))
+                    self._changed.notify_all()
+        except Exception as e:
+            self.error = str(e)
+            self.exception = e
+        except asyncio.CancelledError:
+            self.error = "Generation cancelled"
+        finally:
+            async with self._changed:
+                self.done = True
+                self._changed.notify_all()
+
+    async def follow(
+        self, after: int = -1, heartbeat: Optional[float] = None
+    ) -> AsyncIterator[Optional[Tuple[int, str]]]:
+        """
+        Yield buffered and future frames following the given sequence number.
+
+        Args:
+            after: Sequence number of the last frame the client has, -1 for none
+            heartbeat: Seconds of inactivity after which None is yielded so the
+                caller can keep the connection alive
+
+        Yields:
+            (seq, frame) tuples in order, or None when no frame arrived within
+            the heartbeat interval
+        """
+        seq = after + 1
+        while True:
+            async with self._changed:
+                if seq >= len(self.frames) and not self.done:
+                    try:
+                        await asyncio.wait_for(self._changed.wait(), heartbeat)
+                    except asyncio.TimeoutError:
+                        pass
+                pending = self.frames[seq:]
+                finished = self.done
+
+            if not pending and not finished:
+                yield None
+            for frame in pending:
+                yield seq, frame
+                seq += 1
+            if finished:
+                return
+
+
+def start_generation(frames: AsyncIterator[str]) -> Generation:
+    """
+    Start producing frames in the background and buffer them for resumption.
+
+    Args:
+        frames: Newline-delimited JSON frames of the agent response
+
+    Returns:
+        The buffered Generation
+    """
+    generation = Generation(uuid.uuid4().hex)
+    generation.start(frames)
+    _generations.set(generation.generation_id, generation)
+    return generation
+
+
+def get_generation(generation_id: str) -> Optional[Generation]:
+    """Return a buffered generation, or None if it is unknown or expired."""
+    return _generations.get(generation_id)
+
+
+# Generations of identical requests currently running, by request key
+_in_flight: Dict[Hashable, Generation] = {}
+
+_coalescing = {"runs": 0, "coalesced": 0, "cancelled": 0}
+
+
+async def coalesce(
+    key: Hashable,
+    start: Callable[[Any], AsyncIterator[str]],
+    admit: Optional[Callable[[], Awaitable[Any]]] = None,
+) -> AsyncIterator[str]:
+    """
+    Run identical concurrent requests once and fan the frames out to each.
+
+    The first request for a key starts the generation; requests with the
+    same key arriving while it runs attach to it and receive every frame
+    from the first one, so double submits and shared accounts asking the
+    same question cost a single model run. When the last subscriber
+    disconnects before the end, the run is cancelled.
+
+    Only the request starting the run awaits admit, before the run starts;
+    requests attaching meanwhile wait for the same decision, so duplicates
+    never take a slot of their own and a rejection reaches each of them
+    before any frame is sent.
+
+    Args:
+        key: Identity of the request; equal keys must produce equal frames
+        start: Starts the frames of a new run, given what admit returned
+            (None without admit)
+        admit: Admits a new run, raising if it is refused
+
+    Returns:
+        Frames of the shared generation, newline terminated
+
+    Raises:
+        Exception: The rejection raised by admit, to every waiting request
+    """
+    while True:
+        generation = _in_flight.get(key)
+        if generation is None or generation.done:
+            generation = Generation(uuid.uuid4().hex)
+            _in_flight[key] = generation
+            try:
+                admitted = await admit() if admit is not None else None
+            except BaseException as e:
+                generation.reject(e)
+                if _in_flight.get(key) is generation:
+                    del _in_flight[key]
+                raise
+            generation.start(start(admitted))
+            _coalescing["runs"] += 1
+            break
+        await generation.wait_started()
+        if generation.rejection is None:
+            _coalescing["coalesced"] += 1
+            break
+        if isinstance(generation.rejection, Exception):
+            raise generation.rejection
+        # The request that was to start the run went away before it was
+        # admitted; try again, possibly starting the run here
+
+    generation.subscribers += 1
+    return _subscribe(key, generation)
+
+
+async def _subscribe(key: Hashable, generation: Generation) -> AsyncIterator[str]:
+    """Follow a coalesced generation and cancel it when its last subscriber leaves."""
+    try:
+        async for item in generation.follow():
+            if item is not None:
+                yield item[1] + "\n"
+    finally:
+        generation.subscribers -= 1
+        if generation.subscribers == 0:
+            if _in_flight.get(key) is generation:
+                del _in_flight[key]
+            if not generation.done:
+                generation.cancel()
+                _coalescing["cancelled"] += 1
+    if generation.exception is not None:
+        raise generation.exception
+
+
+def get_coalescing_stats() -> Dict[str, Any]:
+    """Return how many model runs were started, shared and cancelled."""
+    return {"in_flight": len(_in_flight), **_coalescing}
+
+
+def parse_event_id(event_id: Optional[str]) -> Tuple[Optional[str], int]:
+    """
+    Split an SSE event id of the form "<generation_id>:<seq>".
+
+    Args:
+        event_id: Value of the Last-Event-ID header
+
+    Returns:
+        Tuple of (generation_id, seq); (None, -1) when the id is missing or malformed
+    """
+    if not event_id:
+        return None, -1
+    generation_id, _, seq = event_id.strip().rpartition(":")
+    if not generation_id or not seq.isdigit():
+        return None, -1
+    return generation_id, int(seq)
+
+
+async def stream_sse(
+    generation: Generation,
+    after: int = -1,
+    heartbeat: float = SSE_HEARTBEAT_INTERVAL,
+) -> AsyncIterator[str]:
+    """
+    Format a generation as Server-Sent Events.
+
+    Every frame becomes an event whose id is "<generation_id>:<seq>", so a
+    reconnecting EventSource sends it back as Last-Event-ID. Idle periods
+    produce comment heartbeats that keep proxies from closing the connection,
+    and the stream ends with an "error" event if the agent run failed.
+
+    Args:
+        generation: The generation to stream
+        after: Sequence number of the last event the client received
+        heartbeat: Seconds between heartbeats while no frame is produced
+
+    Yields:
+        SSE formatted event strings
+    """
+    yield f"retry: {_SSE_RETRY_MS}\n\n"
+    async for item in generation.follow(after, heartbeat):
+        if item is None:
+            yield ": heartbeat\n\n"
+            continue
+        seq, frame = item
+        yield f"id: {generation.generation_id}:{seq}\ndata: {frame}\n\n"
+    if generation.error is not None:
+        yield f"event: error\ndata: {json.dumps({'error': generation.error})}\n\n"
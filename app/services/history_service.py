@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import os
+from typing import List, Optional, Set, Tuple
+
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelRequest, UserPromptPart
+
+from app.configs.model_config import LLMModelName, get_history_token_budget
+from app.model.agent_model import ChatMessage
+from app.services.cache_service import LRUCache, register_cache
+from app.services.llm_service import get_llm_model_config
+from app.services.utility_service import convert_chat_history_to_messages, estimate_tokens
+
+
+# Number of most recent user turns (with their answers) kept verbatim
+HISTORY_RECENT_TURNS = int(os.getenv("HISTORY_RECENT_TURNS", "4"))
+
+# Cheap model used to fold older turns into the rolling summary
+_SUMMARY_MODEL = LLMModelName(os.getenv("HISTORY_SUMMARY_MODEL", "gpt-4o-mini-2024-07-18"))
+
+_SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a conversation between a user and their "
+    "personal finance assistant. Merge the new messages into the previous "
+    "summary. Keep every figure, date, account, merchant, decision and open "
+    "question the user may refer back to; drop greetings and repetition. "
+    "Answer with the updated summary only, in at most 200 words."
+)
+
+# Conversation id, or digest of the messages covered when there is no id
+# -> (messages covered, digest of those messages, summary)
+_summary_cache = register_cache(
+    "history_summary",
+    LRUCache(
+        maxsize=int(os.getenv("HISTORY_SUMMARY_CACHE_SIZE", "1024")),
+        ttl=float(os.getenv("HISTORY_SUMMARY_TTL", "86400")),
+    ),
+)
+
+_summary_agent: Optional[Agent] = None
+_pending: Set[str] = set()
+_tasks: Set[asyncio.Task] = set()
+
+
+def _get_summary_agent() -> Agent:
+    global _summary_agent
+    if _summary_agent is None:
+        _summary_agent = Agent(
+            model=get_llm_model_config(_SUMMARY_MODEL),
+            output_type=str,
+            instructions=_SUMMARY_INSTRUCTIONS,
+        )
+    return _summary_agent
+
+
+def _digest(messages: List[ChatMessage]) -> str:
+    digest = hashlib.sha256()
+    for message in messages:
+        digest.update(message.role.encode("utf-8") + b"\0")
+        digest.update(message.content.encode("utf-8") + b"\0")
+    return digest.hexdigest()
+
+
+def _conversation_key(
+    older: List[ChatMessage], conversation_id: Optional[str]
+) -> str:
+    """
+    Cache key of the summary of older.
+
+    Without a conversation id the summary is keyed by the exact messages it
+    covers, so unrelated chats that open the same way never share one.
+    """
+    if conversation_id:
+        return f"id:{conversation_id}"
+    return f"prefix:{_digest(older)}"
+
+
+def _cached_summary(
+    older: List[ChatMessage], conversation_id: Optional[str]
+) -> Tuple[int, Optional[str]]:
+    """
+    Return the cached summary of the longest prefix of older.
+
+    Returns:
+        Tuple of (number of messages covered, summary); (0, None) when no
+        summary covers a prefix of older
+    """
+    if conversation_id:
+        cached = _summary_cache.get(_conversation_key(older, conversation_id))
+        if cached is not None:
+            covered, digest, summary = cached
+            if covered <= len(older) and _digest(older[:covered]) == digest:
+                return covered, summary
+        return 0, None
+
+    # Same digests as _digest() of every prefix, in one pass
+    digest = hashlib.sha256()
+    keys = []
+    for message in older:
+        digest.update(message.role.encode("utf-8") + b"\0")
+        digest.update(message.content.encode("utf-8") + b"\0")
+        keys.append(f"prefix:{digest.hexdigest()}")
+    for covered in range(len(keys), 0, -1):
+        if keys[covered - 1] in _summary_cache:
+            cached = _summary_cache.get(keys[covered - 1])
+            if cached is not None:
+                return covered, cached[2]
+    return 0, None
+
+
+def _window_start(chat_history: List[ChatMessage], token_budget: int) -> int:
+    """
+    Index of the first message kept verbatim.
+
+    The window starts at the HISTORY_RECENT_TURNS-th most recent user message
+    and is then shortened from the front until it fits the token budget.
+    """
+    start = len(chat_history)
+    turns = 0
+    while start > 0 and turns < HISTORY_RECENT_TURNS:
+        start -= 1
+        if chat_history[start].role.lower() in ("user", "human"):
+            turns += 1
+
+    tokens = sum(estimate_tokens(m.content) for m in chat_history[start:])
+    while start < len(chat_history) and tokens > token_budget:
+        tokens -= estimate_tokens(chat_history[start].content)
+        start += 1
+    return start
+
+
+def _format_transcript(messages: List[ChatMessage]) -> str:
+    return "\n".join(f"{m.role}: {m.content}" for m in messages)
+
+
+async def _refresh_summary(
+    key: str,
+    older: List[ChatMessage],
+    covered: int,
+    summary: Optional[str],
+) -> None:
+    """Fold the messages after the covered prefix into the cached summary."""
+    try:
+        prompt = (
+            f"Previous summary:\n{summary or '(none)'}\n\n"
+            f"New messages:\n{_format_transcript(older[covered:])}"
+        )
+        result = await _get_summary_agent().run(prompt)
+        _summary_cache.set(key, (len(older), _digest(older), result.output))
+    except Exception:
+        # The summary is an optimisation; the next turn simply tries again
+        pass
+    finally:
+        _pending.discard(key)
+
+
+def _schedule_refresh(
+    key: str, older: List[ChatMessage], covered: int, summary: Optional[str]
+) -> None:
+    if key in _pending:
+        return
+    _pending.add(key)
+    task = asyncio.get_running_loop().create_task(
+        _refresh_summary(key, list(older), covered, summary)
+    )
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def compact_history(
+    chat_history: List[ChatMessage],
+    model: LLMModelName,
+    conversation_id: Optional[str] = None,
+) -> list:
+    """
+    Build a bounded message history for the next agent run.
+
+    The most recent HISTORY_RECENT_TURNS turns are kept verbatim within the
+    model's history token budget. Older messages are represented by a rolling
+    summary cached per conversation. Summaries are refreshed by a cheap model
+    in the background and never block the answer: until a refresh lands, the
+    last cached summary is used, so a turn costs about the same whether it is
+    the 5th or the 50th of the conversation.
+
+    Args:
+        chat_history: Previous conversation history sent by the client
+        model: Model that will answer, used for the token budget
+        conversation_id: Client supplied conversation id, if any
+
+    Returns:
+        List of ModelMessage objects for PydanticAI
+    """
+    if not chat_history:
+        return []
+    start = _window_start(chat_history, get_history_token_budget(model))
+    messages = convert_chat_history_to_messages(chat_history[start:])
+    if start == 0:
+        return messages
+
+    older = chat_history[:start]
+    covered, summary = _cached_summary(older, conversation_id)
+    if covered < start:
+        _schedule_refresh(
+            _conversation_key(older, conversation_id), older, covered, summary
+        )
+
+    if summary is None:
+        return messages
+    # Client turns are user content (see convert_chat_history_to_messages), and
+    # so is a summary of them
+    summary_part = UserPromptPart(f"[summary of earlier conversation] {summary}")
+    if messages and isinstance(messages[0], ModelRequest):
+        messages[0].parts.insert(0, summary_part)
+        return messages
+    return [ModelRequest(parts=[summary_part]), *messages]
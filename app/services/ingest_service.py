@@ -0,0 +1,620 @@
+import asyncio
+import hashlib
+import os
+import re
+from typing import (
+    Any,
+    AsyncIterable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+import ijson
+import numpy as np
+from ijson.common import ObjectBuilder
+from pydantic import TypeAdapter, ValidationError
+from pydantic_core import from_json, to_json
+
+from app.model.finance_model import Category, FinanceInfo, Transaction, TypeEnum
+from app.services.transaction_service import TransactionStore, TransactionStoreBuilder
+
+
+_UUID = r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+# Naive ISO 8601 timestamps, the format the mobile app exports
+_DATETIME = r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d{1,6})?"
+
+# Whole columns are checked at once, joined with newlines
+_UUID_COLUMN_RE = re.compile(f"{_UUID}(?:\n{_UUID})*")
+_DATETIME_COLUMN_RE = re.compile(f"{_DATETIME}(?:\n{_DATETIME})*")
+
+_NIL_UUID = "00000000-0000-0000-0000-000000000000"
+_NONE_TYPE = type(None)
+_TEXT_TYPES = frozenset({str, _NONE_TYPE})
+_NUMBER_TYPES = frozenset({int, float, _NONE_TYPE})
+_LIST_TYPES = frozenset({list, _NONE_TYPE})
+_TYPES = frozenset([None, *(member.value for member in TypeEnum)])
+_CATEGORIES = frozenset([None, *(member.value for member in Category)])
+
+
+class _SlowPath(Exception):
+    """A value is outside the canonical form handled by the fast path."""
+
+
+def _column(rows: List[Dict[str, Any]], alias: str, name: Optional[str] = None) -> List[Any]:
+    if name is None:
+        return [row.get(alias) for row in rows]
+    # Aliases win over field names, as with populate_by_name on the models
+    return [row[alias] if alias in row else row.get(name) for row in rows]
+
+
+def _check_types(values: List[Any], allowed: frozenset) -> None:
+    if not set(map(type, values)) <= allowed:
+        raise _SlowPath
+
+
+def _check_format(values: List[Optional[str]], pattern: re.Pattern) -> None:
+    present = [value for value in values if value is not None]
+    if present and not pattern.fullmatch("\n".join(present)):
+        raise _SlowPath
+
+
+def _uuid_column(values: List[Any]) -> np.ndarray:
+    """Convert a column of UUID strings to an S16 array of raw bytes."""
+    _check_types(values, _TEXT_TYPES)
+    hex_ids = [_NIL_UUID if value is None else value for value in values]
+    _check_format(hex_ids, _UUID_COLUMN_RE)
+    raw = bytes.fromhex("".join(hex_ids).replace("-", ""))
+    return np.frombuffer(raw, dtype="S16").copy()
+
+
+def _canonical_date(value: Optional[str]) -> Optional[str]:
+    """Format a checked ISO timestamp the way the Transaction model dumps it."""
+    if value is None or len(value) == 19:
+        return value
+    fraction = value[20:]
+    if not fraction.strip("0"):
+        return value[:19]
+    return value[:20] + fraction.ljust(6, "0")
+
+
+class TransactionsDigest:
+    """
+    SHA-256 of the canonical JSON array of the transactions, fed batch by batch.
+
+    Fast-path rows are serialised from their checked columns exactly as the
+    Transaction model would dump them, without building the models, so the
+    digest matches the one compute_finance_hash derives for the same data
+    sent inline.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget every row added so far."""
+        self._digest = hashlib.sha256(b"[")
+        self._empty = True
+
+    def _update(self, array_json: bytes) -> None:
+        items = array_json[1:-1]
+        if not items:
+            return
+        if not self._empty:
+            self._digest.update(b",")
+        self._digest.update(items)
+        self._empty = False
+
+    def add_columns(self, columns: Dict[str, List[Any]]) -> None:
+        """Add rows given as canonical columns, keyed by alias in field order."""
+        keys = list(columns)
+        self._update(to_json([dict(zip(keys, row)) for row in zip(*columns.values())]))
+
+    def add_transactions(self, transactions: List[Transaction]) -> None:
+        """Add validated transactions."""
+        self._update(_TRANSACTIONS.dump_json(transactions, by_alias=True))
+
+    def hexdigest(self) -> str:
+        digest = self._digest.copy()
+        digest.update(b"]")
+        return digest.hexdigest()
+
+
+def _build_store(
+    rows: List[Any],
+    base: Optional[TransactionStore] = None,
+    digest: Optional[TransactionsDigest] = None,
+) -> TransactionStore:
+    """
+    Build the columnar store straight from decoded JSON transaction rows.
+
+    Every column is checked in bulk and converted with NumPy, without a
+    Python-level loop over the fields of each row. When base is given the new
+    store shares its vocabularies, so the two can be concatenated. The rows
+    are added to digest, if given, once they are known to be canonical.
+
+    Raises:
+        _SlowPath: If any value is not in its canonical form
+    """
+    _check_types(rows, frozenset({dict}))
+
+    raw_ids = _column(rows, "id")
+    ids = _uuid_column(raw_ids)
+
+    dates = _column(rows, "date")
+    _check_types(dates, _TEXT_TYPES)
+    _check_format(dates, _DATETIME_COLUMN_RE)
+
+    amounts = _column(rows, "amount")
+    _check_types(amounts, _NUMBER_TYPES)
+
+    types = _column(rows, "type")
+    categories = _column(rows, "category")
+    if not (set(types) <= _TYPES and set(categories) <= _CATEGORIES):
+        raise _SlowPath
+
+    account_ids = _column(rows, "accountId", "account_id")
+    _check_types(account_ids, _TEXT_TYPES)
+    _check_format(account_ids, _UUID_COLUMN_RE)
+
+    photos = _column(rows, "photos")
+    _check_types(photos, _LIST_TYPES)
+    texts = [
+        _column(rows, "title"),
+        _column(rows, "location"),
+        _column(rows, "description"),
+        _column(rows, "smsContent", "sms_content"),
+    ]
+    for column in texts:
+        _check_types(column, _TEXT_TYPES)
+    titles, locations, descriptions, sms_contents = texts
+
+    try:
+        date_array = np.array(dates, dtype="datetime64[us]")
+    except ValueError:
+        # Well-formed but impossible dates such as 2025-02-30
+        raise _SlowPath
+
+    store = TransactionStore.from_columns(
+        ids=ids,
+        dates=date_array,
+        amounts=np.array(
+            [0.0 if amount is None else amount for amount in amounts],
+            dtype=np.float64,
+        ),
+        types=types,
+        titles=titles,
+        categories=categories,
+        account_ids=account_ids,
+        locations=locations,
+        descriptions=descriptions,
+        sms_contents=sms_contents,
+        base=base,
+    )
+    if digest is not None:
+        digest.add_columns(
+            {
+                "id": raw_ids,
+                "date": [_canonical_date(date) for date in dates],
+                "type": types,
+                "title": titles,
+                "description": descriptions,
+                "amount": [None if amount is None else float(amount) for amount in amounts],
+                "category": categories,
+                "location": locations,
+                "photos": photos,
+                "smsContent": sms_contents,
+                "accountId": account_ids,
+            }
+        )
+    return store
+
+
+def ingest_finance_json(
+    payload: Union[str, bytes], digest: Optional[TransactionsDigest] = None
+) -> Tuple[FinanceInfo, TransactionStore]:
+    """
+    Parse a finance export without building a Transaction model per row.
+
+    The JSON is decoded once with pydantic-core and the transaction rows are
+    checked and written directly into a TransactionStore, while the small
+    sections (export info, accounts, budgets) go through the regular models.
+    The fast path only accepts values in their canonical form (lowercase
+    hyphenated UUIDs, naive ISO timestamps, JSON numbers, known enum values).
+    Anything else, including invalid input, is handed to
+    FinanceInfo.model_validate_json, so lax conversions behave exactly as
+    before and errors are the same ValidationError with the same messages.
+
+    Args:
+        payload: Raw JSON body of a FinanceInfo export
+        digest: Receives the transactions, for compute_finance_hash
+
+    Returns:
+        Tuple of (FinanceInfo without its transactions, TransactionStore)
+
+    Raises:
+        pydantic.ValidationError: If the payload is not a valid FinanceInfo
+    """
+    try:
+        document = from_json(payload, cache_strings="keys")
+        if type(document) is not dict:
+            raise _SlowPath
+        document = dict(document)
+        rows = document.pop("transactions", None)
+        if rows is not None and type(rows) is not list:
+            raise _SlowPath
+        store = _build_store(rows or [], digest=digest)
+        finance_info = FinanceInfo.model_validate(document)
+    except Exception:
+        # Slow path: the full model validation is the source of truth
+        finance_info = FinanceInfo.model_validate_json(payload)
+        store = TransactionStore.from_finance_info(finance_info)
+        if digest is not None:
+            digest.reset()
+            digest.add_transactions(finance_info.transactions or [])
+        finance_info = finance_info.model_copy(update={"transactions": None})
+    return finance_info, store
+
+
+STREAM_BATCH_SIZE = int(os.getenv("INGEST_STREAM_BATCH_SIZE", "1000"))
+STREAM_READ_SIZE = 64 * 1024
+# Body chunks buffered between the request and the parser thread
+STREAM_QUEUE_SIZE = int(os.getenv("INGEST_STREAM_QUEUE_SIZE", "16"))
+
+_TRANSACTIONS = TypeAdapter(List[Transaction])
+_ROW_PREFIX = "transactions.item"
+_FIELD_PREFIX_LENGTH = len(_ROW_PREFIX) + 1
+_CONTAINER_STARTS = frozenset({"start_map", "start_array"})
+_CONTAINER_ENDS = frozenset({"end_map", "end_array"})
+# Field order of FinanceInfo, used to report errors in the same order
+_SECTION_ORDER = {
+    "exportInfo": 0,
+    "export_info": 0,
+    "transactions": 1,
+    "accounts": 2,
+    "budgets": 3,
+}
+
+
+def _error_details(error: Dict[str, Any], loc: Optional[Tuple] = None) -> Dict[str, Any]:
+    """Turn an entry of ValidationError.errors() back into InitErrorDetails."""
+    details = {
+        "type": error["type"],
+        "loc": error["loc"] if loc is None else loc,
+        "input": error["input"],
+    }
+    if "ctx" in error:
+        details["ctx"] = error["ctx"]
+    return details
+
+
+def _section_rank(error: Dict[str, Any]) -> int:
+    loc = error["loc"]
+    return _SECTION_ORDER.get(loc[0], len(_SECTION_ORDER)) if loc else -1
+
+
+def _json_error(error: Exception) -> ValidationError:
+    """The ValidationError pydantic raises for malformed JSON."""
+    return ValidationError.from_exception_data(
+        FinanceInfo.__name__,
+        [{"type": "json_invalid", "loc": (), "input": "", "ctx": {"error": str(error).splitlines()[0]}}],
+        input_type="json",
+    )
+
+
+class FinanceStreamParser:
+    """
+    Incremental parser for a FinanceInfo JSON export.
+
+    Consumes the ijson events of the document. Transaction rows are collected
+    in small batches that are validated and written to a TransactionStore as
+    soon as a batch is full, while the other sections (export info, accounts,
+    budgets) are kept as plain values and validated at the end. Peak memory
+    therefore depends on the batch and read sizes, not on the export size.
+
+    Validation errors of every batch are collected and raised together by
+    finish(), with the same locations and messages as a full validation
+    (only the description of malformed JSON comes from ijson instead).
+    """
+
+    def __init__(
+        self,
+        batch_size: int = STREAM_BATCH_SIZE,
+        digest: Optional[TransactionsDigest] = None,
+    ):
+        """
+        Args:
+            batch_size: Number of transaction rows validated at a time
+            digest: Receives the transactions, for compute_finance_hash
+        """
+        self.batch_size = batch_size
+        self._digest = digest
+        self._sections: Dict[str, Any] = {}
+        self._document: Any = None
+        self._batch: List[Any] = []
+        self._row_count = 0
+        self._row: Optional[Dict[str, Any]] = None
+        self._builder: Optional[ObjectBuilder] = None
+        self._depth = 0
+        self._target: Tuple[str, Optional[str]] = ("", None)
+        self._stores: List[TransactionStore] = []
+        self._errors: List[Dict[str, Any]] = []
+
+    def event(self, prefix: str, event: str, value: Any) -> None:
+        """Consume one (prefix, event, value) tuple produced by ijson.parse."""
+        builder = self._builder
+        if builder is not None:
+            # Inside a nested value: let ijson's builder assemble it
+            builder.event(event, value)
+            if event in _CONTAINER_STARTS:
+                self._depth += 1
+            elif event in _CONTAINER_ENDS:
+                self._depth -= 1
+                if not self._depth:
+                    self._builder = None
+                    self._set_value(builder.value)
+            return
+        if event == "map_key":
+            return
+
+        row = self._row
+        if row is not None and prefix != _ROW_PREFIX:
+            key = prefix[_FIELD_PREFIX_LENGTH:]
+            if event in _CONTAINER_STARTS:
+                self._start_value(("field", key), event)
+            else:
+                row[key] = value
+        elif prefix == _ROW_PREFIX:
+            if event == "start_map":
+                self._row = {}
+            elif event == "end_map":
+                self._row = None
+                self._add_row(row)
+            elif event in _CONTAINER_STARTS:
+                self._start_value(("row", None), event)
+            else:
+                self._add_row(value)
+        elif prefix == "transactions":
+            if event == "start_map":
+                self._start_value(("section", prefix), event)
+            elif event not in ("start_array", "end_array"):
+                self._sections[prefix] = value
+        elif prefix == "":
+            if event == "start_array":
+                self._start_value(("document", None), event)
+            elif event not in ("start_map", "end_map"):
+                self._document = value
+                self._sections = None
+        elif event in _CONTAINER_STARTS:
+            self._start_value(("section", prefix), event)
+        else:
+            self._sections[prefix] = value
+
+    def _start_value(self, target: Tuple[str, Optional[str]], event: str) -> None:
+        self._builder = ObjectBuilder()
+        self._builder.event(event, None)
+        self._depth = 1
+        self._target = target
+
+    def _set_value(self, value: Any) -> None:
+        kind, key = self._target
+        if kind == "field":
+            self._row[key] = value
+        elif kind == "row":
+            self._add_row(value)
+        elif kind == "section":
+            self._sections[key] = value
+        else:
+            self._document = value
+            self._sections = None
+
+    def _add_row(self, row: Any) -> None:
+        self._batch.append(row)
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        rows, self._batch = self._batch, []
+        if not rows:
+            return
+        offset = self._row_count
+        self._row_count += len(rows)
+        base = self._stores[-1] if self._stores else None
+        try:
+            store = _build_store(rows, base, self._digest)
+        except Exception:
+            # Slow path for this batch only
+            try:
+                # JSON mode, so lax conversions and messages match the full path
+                transactions = _TRANSACTIONS.validate_json(to_json(rows))
+            except ValidationError as e:
+                self._errors.extend(
+                    _error_details(
+                        error, ("transactions", offset + error["loc"][0], *error["loc"][1:])
+                    )
+                    for error in e.errors()
+                )
+                return
+            if self._digest is not None:
+                self._digest.add_transactions(transactions)
+            builder = TransactionStoreBuilder(base=base)
+            for trans in transactions:
+                builder.add_transaction(trans)
+            store = builder.build()
+        self._stores.append(store)
+
+    def finish(self) -> Tuple[FinanceInfo, TransactionStore]:
+        """
+        Validate what is left and return the parsed export.
+
+        Returns:
+            Tuple of (FinanceInfo without its transactions, TransactionStore)
+
+        Raises:
+            pydantic.ValidationError: If the export is not a valid FinanceInfo
+        """
+        if self._sections is None:
+            # The document is not a JSON object at all
+            FinanceInfo.model_validate_json(to_json(self._document))
+
+        self._flush()
+        errors = self._errors
+        finance_info = None
+        try:
+            finance_info = FinanceInfo.model_validate_json(to_json(self._sections))
+        except ValidationError as e:
+            errors.extend(_error_details(error) for error in e.errors())
+        if errors:
+            errors.sort(key=_section_rank)
+            raise ValidationError.from_exception_data(
+                FinanceInfo.__name__, errors, input_type="json"
+            )
+
+        if not self._stores:
+            return finance_info, TransactionStore.empty()
+        return finance_info, self._stores[0].concat(*self._stores[1:])
+
+
+class _ChunkReader:
+    """
+    File-like adapter over a chunk iterator, as ijson expects.
+
+    read(size) returns exactly size bytes until the end of the stream, since
+    ijson's C backend mis-parses short reads.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer = bytearray()
+
+    def read(self, size: int) -> bytes:
+        while len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+class _StreamAborted(Exception):
+    """The upload ended before the parser thread saw the end of the body."""
+
+
+# Queued after the last chunk, and in place of chunks when the upload fails
+_END = b""
+_ABORT = None
+
+
+def _queued_chunks(
+    queue: "asyncio.Queue[Optional[bytes]]",
+    loop: asyncio.AbstractEventLoop,
+    on_chunk: Optional[Callable[[bytes], None]],
+) -> Iterable[bytes]:
+    """Yield the chunks put on queue by the event loop, from a worker thread."""
+    while True:
+        chunk = asyncio.run_coroutine_threadsafe(queue.get(), loop).result()
+        if chunk is _ABORT:
+            raise _StreamAborted
+        if chunk == _END:
+            return
+        if on_chunk is not None:
+            on_chunk(chunk)
+        yield chunk
+
+
+async def ingest_finance_stream(
+    chunks: AsyncIterable[bytes],
+    on_chunk: Optional[Callable[[bytes], None]] = None,
+    batch_size: int = STREAM_BATCH_SIZE,
+    digest: Optional[TransactionsDigest] = None,
+) -> Tuple[FinanceInfo, TransactionStore]:
+    """
+    Parse a finance export incrementally from an async stream of bytes.
+
+    Never holds the whole document: the event loop only reads the body and
+    hands its chunks over a bounded queue to a worker thread, which parses
+    them with ijson and writes the transaction rows to the store in batches
+    of batch_size. Parsing therefore never blocks the event loop, and a slow
+    parser slows down reading instead of buffering the body.
+
+    Args:
+        chunks: Async iterator over the raw JSON body, e.g. request.stream()
+        on_chunk: Optional callback receiving every raw chunk, e.g. to spool
+            the export to disk without keeping it in memory; called from the
+            worker thread
+        batch_size: Number of transaction rows validated at a time
+        digest: Receives the transactions, for compute_finance_hash
+
+    Returns:
+        Tuple of (FinanceInfo without its transactions, TransactionStore)
+
+    Raises:
+        pydantic.ValidationError: If the body is not a valid FinanceInfo
+    """
+    loop = asyncio.get_running_loop()
+    queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+
+    async def feed() -> None:
+        async for chunk in chunks:
+            if chunk:
+                await queue.put(chunk)
+        await queue.put(_END)
+
+    parsing = asyncio.ensure_future(
+        asyncio.to_thread(
+            ingest_finance_chunks,
+            _queued_chunks(queue, loop, on_chunk),
+            batch_size,
+            digest,
+        )
+    )
+    feeding = asyncio.ensure_future(feed())
+    try:
+        # The parser stops early on malformed JSON; reading errors end the feed
+        await asyncio.wait({parsing, feeding}, return_when=asyncio.FIRST_COMPLETED)
+        if feeding.done() and feeding.exception() is not None:
+            feeding.result()
+        return await parsing
+    finally:
+        feeding.cancel()
+        if not parsing.done():
+            # Unblock the worker thread: drop what it has not read yet
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(_ABORT)
+
+
+def ingest_finance_chunks(
+    chunks: Iterable[bytes],
+    batch_size: int = STREAM_BATCH_SIZE,
+    digest: Optional[TransactionsDigest] = None,
+) -> Tuple[FinanceInfo, TransactionStore]:
+    """
+    Synchronous counterpart of ingest_finance_stream, e.g. for stored exports.
+
+    Args:
+        chunks: Iterator over the raw JSON export
+        batch_size: Number of transaction rows validated at a time
+        digest: Receives the transactions, for compute_finance_hash
+
+    Returns:
+        Tuple of (FinanceInfo without its transactions, TransactionStore)
+
+    Raises:
+        pydantic.ValidationError: If the export is not a valid FinanceInfo
+    """
+    parser = FinanceStreamParser(batch_size, digest)
+    try:
+        for prefix, event, value in ijson.parse(
+            _ChunkReader(chunks), use_float=True, buf_size=STREAM_READ_SIZE
+        ):
+            parser.event(prefix, event, value)
+    except ijson.JSONError as e:
+        raise _json_error(e)
+    return parser.finish()
@@ -0,0 +1,309 @@
+import calendar
+import re
+from datetime import date, datetime, time
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from app.model.finance_model import FinanceInfo
+from app.services.finance_service import format_amount, format_transaction_row
+from app.services.transaction_service import TransactionStore
+
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Words that carry no meaning for intent matching
+_FILLER = frozenset(
+    "what s whats is are was were show me tell give list my the a please check "
+    "can could you i do did have right now today of in across all".split()
+)
+
+_BALANCE_WORDS = frozenset(
+    "balance balances net worth total current overall account accounts money "
+    "how much".split()
+)
+
+_BUDGET_WORDS = frozenset(
+    "budget spend spent spending vs versus against compared compare to with this "
+    "last month monthly how much am over under within doing left remaining status "
+    "and on so far".split()
+)
+
+_RECENT_WORDS = frozenset(
+    "last latest recent most transactions transaction".split()
+)
+
+_MONTHS = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+_MONTHS.update(
+    {name.lower(): number for number, name in enumerate(calendar.month_abbr) if name}
+)
+
+_NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "fifteen": 15, "twenty": 20,
+}
+
+_TRANSACTION_TYPES = {
+    "debit": "debit", "debits": "debit",
+    "credit": "credit", "credits": "credit",
+    "transfer": "transfer", "transfers": "transfer",
+}
+
+# Upper bound on the rows listed by the recent transactions intent
+_MAX_RECENT = 50
+
+
+class IntentMatch:
+    """A recognised intent with the parameters extracted from the query."""
+
+    def __init__(self, name: str, params: Dict[str, Any]):
+        self.name = name
+        self.params = params
+
+
+def _words(query: str) -> List[str]:
+    return [word for word in _WORD_RE.findall(query.lower()) if word not in _FILLER]
+
+
+def _only(words: List[str], allowed: Set[str]) -> bool:
+    return all(word in allowed for word in words)
+
+
+def _match_balance(words: List[str]) -> Optional[IntentMatch]:
+    if not words or not _only(words, _BALANCE_WORDS):
+        return None
+    if "balance" in words or "balances" in words or "worth" in words:
+        return IntentMatch("balance", {})
+    if words[-1] == "money":
+        return IntentMatch("balance", {})
+    return None
+
+
+def _match_budget(words: List[str]) -> Optional[IntentMatch]:
+    if not ({"budget", "spend", "spent", "spending"} & set(words)):
+        return None
+    month = year = None
+    relative = 0
+    rest = []
+    for word in words:
+        if word in _MONTHS:
+            month = _MONTHS[word]
+        elif word.isdigit() and len(word) == 4:
+            year = int(word)
+        else:
+            rest.append(word)
+    if not _only(rest, _BUDGET_WORDS):
+        return None
+    if month is None:
+        if "month" not in rest and "budget" not in rest:
+            # "how much did I spend" without a period is left to the model
+            return None
+        if "last" in rest:
+            relative = -1
+    return IntentMatch("budget", {"month": month, "year": year, "relative": relative})
+
+
+def _match_recent(words: List[str]) -> Optional[IntentMatch]:
+    if not ({"last", "latest", "recent"} & set(words)):
+        return None
+    # "my last transaction" asks for one, "my last transactions" for a few
+    limit = 1 if "transaction" in words else 5
+    type_name = None
+    has_subject = False
+    for word in words:
+        if word in _RECENT_WORDS:
+            has_subject = has_subject or word.startswith("transaction")
+        elif word.isdigit() and len(word) <= 3:
+            limit = int(word)
+        elif word in _NUMBER_WORDS:
+            limit = _NUMBER_WORDS[word]
+        elif word in _TRANSACTION_TYPES:
+            type_name = _TRANSACTION_TYPES[word]
+            has_subject = True
+        else:
+            return None
+    if not has_subject or limit < 1:
+        return None
+    return IntentMatch("recent", {"limit": min(limit, _MAX_RECENT), "type": type_name})
+
+
+_MATCHERS: List[Callable[[List[str]], Optional[IntentMatch]]] = [
+    _match_balance,
+    _match_budget,
+    _match_recent,
+]
+
+
+def classify_intent(user_query: str) -> Optional[IntentMatch]:
+    """
+    Recognise questions that can be answered exactly without the model.
+
+    The rules are deliberately strict: after dropping filler words, every
+    remaining word of the query must belong to the intent's vocabulary, so
+    anything more specific (a merchant, a date, "why") goes to the model.
+
+    Args:
+        user_query: The user's question
+
+    Returns:
+        The matched intent, or None when the model should answer
+    """
+    words = _words(user_query)
+    for matcher in _MATCHERS:
+        match = matcher(words)
+        if match is not None:
+            return match
+    return None
+
+
+def _reference_date(finance_info: FinanceInfo) -> date:
+    """Date "this month" refers to: the export date, or today without one."""
+    export = finance_info.export_info
+    if export and export.export_date:
+        return export.export_date.date()
+    return date.today()
+
+
+def _answer_balance(
+    finance_info: FinanceInfo, store: TransactionStore, params: Dict[str, Any]
+) -> Optional[str]:
+    accounts = [acc for acc in finance_info.accounts or [] if acc.balance is not None]
+    if not accounts:
+        return None
+    total = sum(acc.balance for acc in accounts)
+    lines = [
+        f"Your total balance (net worth) across {len(accounts)} "
+        f"account{'s' if len(accounts) != 1 else ''} is **{format_amount(total)}**.",
+        "",
+    ]
+    for acc in accounts:
+        name = acc.account_name or "Account"
+        bank = f" ({acc.bank_name})" if acc.bank_name else ""
+        lines.append(f"- {name}{bank}: {format_amount(acc.balance)}")
+    return "\n".join(lines)
+
+
+def _answer_budget(
+    finance_info: FinanceInfo, store: TransactionStore, params: Dict[str, Any]
+) -> Optional[str]:
+    reference = _reference_date(finance_info)
+    year, month = reference.year, reference.month
+    if params["month"] is not None:
+        month = params["month"]
+        year = params["year"] or (year if month <= reference.month else year - 1)
+    elif params["relative"]:
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+
+    last_day = calendar.monthrange(year, month)[1]
+    rows = store.filter(
+        datetime(year, month, 1),
+        datetime.combine(date(year, month, last_day), time.max),
+        "debit",
+    )
+    spent = store.total(rows)
+    period = f"{calendar.month_name[month]} {year}"
+    answer = (
+        f"In {period} you spent **{format_amount(spent)}** "
+        f"across {len(rows)} debit transactions"
+    )
+
+    budget = next(
+        (
+            b
+            for b in finance_info.budgets or []
+            if b.year == year and b.month == month and b.amount is not None
+        ),
+        None,
+    )
+    if budget is None:
+        return answer + ". There is no budget set for that month."
+    remaining = budget.amount - spent
+    used = f" ({100 * spent / budget.amount:.1f}% used)" if budget.amount else ""
+    if remaining >= 0:
+        status = f"so you have {format_amount(remaining)} left{used}."
+    else:
+        status = f"so you are over budget by {format_amount(-remaining)}{used}."
+    return f"{answer}, against a budget of {format_amount(budget.amount)}, {status}"
+
+
+def _answer_recent(
+    finance_info: FinanceInfo, store: TransactionStore, params: Dict[str, Any]
+) -> Optional[str]:
+    rows = store.most_recent(store.filter(type=params["type"]), params["limit"])
+    kind = f"{params['type']} transactions" if params["type"] else "transactions"
+    if not len(rows):
+        return f"You have no {kind} recorded."
+    if len(rows) == 1:
+        lines = [f"Your last {kind[:-1]}:", ""]
+    else:
+        lines = [f"Your last {len(rows)} {kind}:", ""]
+    # Same line as the model sees for the row, numbered instead of bulleted
+    for number, row in enumerate(rows.tolist(), start=1):
+        lines.append(f"{number}. {format_transaction_row(store, row)[2:]}")
+    return "\n".join(lines)
+
+
+_ANSWERERS: Dict[
+    str, Callable[[FinanceInfo, TransactionStore, Dict[str, Any]], Optional[str]]
+] = {
+    "balance": _answer_balance,
+    "budget": _answer_budget,
+    "recent": _answer_recent,
+}
+
+
+class IntentRouterStats:
+    """Thread-safe counters of how many queries the intent router answered."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.queries = 0
+        self.hits: Dict[str, int] = {name: 0 for name in _ANSWERERS}
+
+    def record(self, intent: Optional[str]) -> None:
+        with self._lock:
+            self.queries += 1
+            if intent is not None:
+                self.hits[intent] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total_hits = sum(self.hits.values())
+            return {
+                "queries": self.queries,
+                "hits": total_hits,
+                "fallbacks": self.queries - total_hits,
+                "hit_rate": round(total_hits / self.queries, 4) if self.queries else 0.0,
+                "by_intent": dict(self.hits),
+            }
+
+
+_router_stats = IntentRouterStats()
+
+
+def answer_intent(
+    user_query: str,
+    finance_info: FinanceInfo,
+    get_store: Callable[[], TransactionStore],
+) -> Optional[str]:
+    """
+    Answer the query exactly from the finance data when its intent is known.
+
+    Args:
+        user_query: The user's question
+        finance_info: The user's financial information
+        get_store: Returns the columnar store; only called on a match
+
+    Returns:
+        The answer text, or None when the query should go to the model
+    """
+    match = classify_intent(user_query)
+    answer = None
+    if match is not None:
+        answer = _ANSWERERS[match.name](finance_info, get_store(), match.params)
+    _router_stats.record(match.name if answer is not None else None)
+    return answer
+
+
+def get_intent_stats() -> Dict[str, Any]:
+    """Return the intent router's query, hit and fallback counters."""
+    return _router_stats.stats()
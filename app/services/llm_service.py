@@ -1,5 +1,10 @@
 # Configure the OpenAI model
+import importlib.util
 import os
+from threading import RLock
+from typing import Dict
+
+import httpx
 from pydantic_ai import ModelSettings
 from pydantic_ai.models.openai import OpenAIChatModel
 from pydantic_ai.providers.openai import OpenAIProvider
@@ -8,6 +13,79 @@ from pydantic_ai.providers.google import GoogleProvider
 
 from app.configs.model_config import LLMModelName
 from app.services.envManager import get_env_variable
+from app.services.prompt_cache_service import GEMINI_CONTEXT_CACHE, GeminiContextCacheModel
+
+
+# Connection pool of the HTTP client shared by all models of a provider
+_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20"))
+_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "60"))
+_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "600"))
+_HTTP_CONNECT_TIMEOUT = float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "5"))
+
+# HTTP/2 multiplexes concurrent streams over one connection; it needs the
+# optional h2 package (pip install "httpx[http2]")
+_HTTP2 = (
+    os.getenv("LLM_HTTP2", "true").lower() != "false"
+    and importlib.util.find_spec("h2") is not None
+)
+
+_http_clients: Dict[str, httpx.AsyncClient] = {}
+_providers: Dict[str, object] = {}
+# Re-entrant: a provider factory creates its HTTP client while holding it
+_lock = RLock()
+
+# OpenAI reasoning models, which only accept the default sampling settings
+_REASONING_MODELS = {LLMModelName.GPT_5, LLMModelName.GPT_5_MINI}
+
+
+def get_http_client(provider: str) -> httpx.AsyncClient:
+    """
+    Return the pooled keep-alive HTTP client of a provider, created once.
+
+    Args:
+        provider: Provider name, e.g. "openai" or "google"
+
+    Returns:
+        Shared httpx.AsyncClient
+    """
+    client = _http_clients.get(provider)
+    if client is None:
+        with _lock:
+            client = _http_clients.get(provider)
+            if client is None:
+                client = httpx.AsyncClient(
+                    http2=_HTTP2,
+                    limits=httpx.Limits(
+                        max_connections=_HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=_HTTP_MAX_KEEPALIVE,
+                        keepalive_expiry=_HTTP_KEEPALIVE_EXPIRY,
+                    ),
+                    timeout=httpx.Timeout(_HTTP_TIMEOUT, connect=_HTTP_CONNECT_TIMEOUT),
+                )
+                _http_clients[provider] = client
+    return client
+
+
+async def close_http_clients() -> None:
+    """Close the pooled HTTP clients, e.g. on application shutdown."""
+    with _lock:
+        clients = list(_http_clients.values())
+        _http_clients.clear()
+        _providers.clear()
+    for client in clients:
+        await client.aclose()
+
+
+def _get_provider(name: str, factory):
+    """Return the provider instance for name, created once with factory."""
+    provider = _providers.get(name)
+    if provider is None:
+        with _lock:
+            provider = _providers.get(name)
+            if provider is None:
+                provider = _providers[name] = factory()
+    return provider
 
 
 def openai_model(llm: LLMModelName) -> OpenAIChatModel:
@@ -30,10 +108,15 @@ def openai_model(llm: LLMModelName) -> OpenAIChatModel:
             "Please set it before using OpenAI models."
         )
 
+    provider = _get_provider(
+        "openai",
+        lambda: OpenAIProvider(api_key=api_key, http_client=get_http_client("openai")),
+    )
     return OpenAIChatModel(
         llm.value,
-        provider=OpenAIProvider(api_key=api_key),
-        settings=ModelSettings(temperature=0.7),
+        provider=provider,
+        # Reasoning models reject sampling parameters such as temperature
+        settings=None if llm in _REASONING_MODELS else ModelSettings(temperature=0.7),
     )
 
 
@@ -57,13 +140,52 @@ def google_model(llm: LLMModelName) -> GoogleModel:
             "Please set it before using Google Gemini models."
         )
 
+    provider = _get_provider(
+        "google",
+        lambda: GoogleProvider(api_key=api_key, http_client=get_http_client("google")),
+    )
     return GoogleModel(
         llm.value,
-        provider=GoogleProvider(api_key=api_key),
+        provider=provider,
         settings=ModelSettings(temperature=0.7),
     )
 
 
+_OPENAI_MODELS = {
+    LLMModelName.GPT_4_TURBO,
+    LLMModelName.GPT_3S5_TURBO,
+    LLMModelName.GPT_4O,
+    LLMModelName.GPT_4O_MINI,
+    LLMModelName.GPT_5,
+    LLMModelName.GPT_5_MINI,
+}
+
+_GOOGLE_MODELS = {
+    LLMModelName.GEMINI_2_5_PRO,
+    LLMModelName.GEMINI_2_5_FLASH,
+    LLMModelName.GEMINI_2_5_FLASH_LITE,
+    LLMModelName.GEMINI_2_0_FLASH,
+    LLMModelName.GEMINI_2_0_FLASH_LITE,
+}
+
+
+def get_model_provider(model_name: LLMModelName) -> str:
+    """
+    Returns the provider serving the given model.
+
+    Args:
+        model_name: The LLM model name from LLMModelName enum
+
+    Returns:
+        "openai", "google" or "unknown"
+    """
+    if model_name in _OPENAI_MODELS:
+        return "openai"
+    if model_name in _GOOGLE_MODELS:
+        return "google"
+    return "unknown"
+
+
 def get_llm_model_config(model_name: LLMModelName):
     """
     Returns the LLM model configuration for the given model name.
@@ -72,27 +194,18 @@ def get_llm_model_config(model_name: LLMModelName):
         model_name: The LLM model name from LLMModelName enum
 
     Returns:
-        Model configuration object (OpenAIChatModel or GoogleModel)
+        Model configuration object (OpenAIChatModel, or GoogleModel wrapped in
+        GeminiContextCacheModel)
 
     Raises:
         ValueError: If model name is unsupported or required API key is missing
     """
-    if model_name in {
-        LLMModelName.GPT_4_TURBO,
-        LLMModelName.GPT_3S5_TURBO,
-        LLMModelName.GPT_4O,
-        LLMModelName.GPT_4O_MINI,
-        LLMModelName.GPT_5,
-        LLMModelName.GPT_5_MINI,
-    }:
+    provider = get_model_provider(model_name)
+    if provider == "openai":
         return openai_model(model_name)
-    elif model_name in {
-        LLMModelName.GEMINI_2_5_PRO,
-        LLMModelName.GEMINI_2_5_FLASH,
-        LLMModelName.GEMINI_2_5_FLASH_LITE,
-        LLMModelName.GEMINI_2_0_FLASH,
-        LLMModelName.GEMINI_2_0_FLASH_LITE,
-    }:
-        return google_model(model_name)
+    elif provider == "google":
+        model = google_model(model_name)
+        # Large repeated instructions are served from Gemini cached content
+        return GeminiContextCacheModel(model) if GEMINI_CONTEXT_CACHE else model
     else:
         raise ValueError(f"Unsupported model name: {model_name}")
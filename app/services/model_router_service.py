@@ -0,0 +1,243 @@
+import os
+import re
+from collections import deque
+from threading import Lock
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.configs.model_config import (
+    MODEL_COSTS_PER_1M,
+    LLMModelName,
+    get_context_token_budget,
+)
+from app.services.envManager import get_env_variable
+
+
+# Tiers from cheapest/fastest to strongest
+TIERS = ("fast", "standard", "strong")
+
+# The fast tier defaults to the cheapest model of the catalogue. It is served
+# by Google, so without a GOOGLE_API_KEY there is no cheaper model than the
+# standard tier's and the fast tier is left out.
+_DEFAULT_TIER_MODELS = {
+    "fast": LLMModelName.GEMINI_2_0_FLASH_LITE,
+    "standard": LLMModelName.GPT_4O_MINI,
+    "strong": LLMModelName.GPT_5_MINI,
+}
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+# Greetings and acknowledgements the base prompt answers conversationally
+_SMALL_TALK = frozenset(
+    "hi hii hello hey heya yo hola thanks thank thx ty you ok okay k got it sure "
+    "cool great awesome nice perfect fine good morning evening afternoon night bye "
+    "goodbye see later cheers alright right yes yeah yep no nope sounds how are "
+    "doing what's up sup".split()
+)
+
+# Word stems that ask for reasoning over the data rather than a lookup
+_ANALYSIS_STEMS = (
+    "analy", "compar", "trend", "forecast", "predict", "project", "why", "plan",
+    "optimi", "recommend", "suggest", "advice", "advise", "pattern", "breakdown",
+    "insight", "explain", "strateg", "reduce", "improve", "saving", "afford",
+    "should",
+)
+
+# Queries longer than this many words are treated as analysis
+_LONG_QUERY_WORDS = 30
+
+# Latency samples kept per model for the SLO check
+_LATENCY_WINDOW = 200
+
+
+class ModelRoute:
+    """The model chosen for a request, with its tier and the reason."""
+
+    def __init__(self, tier: str, model: LLMModelName, reason: str):
+        self.tier = tier
+        self.model = model
+        self.reason = reason
+
+
+class ModelRouter:
+    """
+    Pick a model tier per request from the query, the context size and SLOs.
+
+    Small talk goes to the fast tier, questions that ask for analysis, long
+    questions and long conversations over large datasets to the strong tier,
+    everything else to the standard tier. A tier whose observed p95 time to
+    first token exceeds its latency SLO, or whose estimated request cost
+    exceeds the cost SLO, is downgraded to the next cheaper tier. The fast
+    and strong tiers are optional; requests for a missing tier go to the
+    standard tier.
+    """
+
+    def __init__(
+        self,
+        tier_models: Dict[str, LLMModelName],
+        latency_slos: Optional[Dict[str, float]] = None,
+        max_request_cost: Optional[float] = None,
+        large_dataset_rows: int = 5000,
+    ):
+        """
+        Args:
+            tier_models: Model serving each tier; must include "standard"
+            latency_slos: Target p95 time to first token in seconds per tier
+            max_request_cost: Maximum estimated input cost of a request in USD
+            large_dataset_rows: Datasets with more rows than this count as large
+        """
+        self.tier_models = tier_models
+        self.tiers = [tier for tier in TIERS if tier in tier_models]
+        self.latency_slos = latency_slos or {}
+        self.max_request_cost = max_request_cost
+        self.large_dataset_rows = large_dataset_rows
+        self._lock = Lock()
+        self._latencies: Dict[LLMModelName, Deque[float]] = {}
+        self._decisions: Dict[str, int] = {}
+
+    def models(self) -> List[LLMModelName]:
+        """Distinct models used by the tiers, in tier order."""
+        return list(dict.fromkeys(self.tier_models[tier] for tier in self.tiers))
+
+    def default_model(self) -> LLMModelName:
+        """Model of the standard tier."""
+        return self.tier_models["standard"]
+
+    def _classify(
+        self, user_query: str, history_messages: int, row_count: int
+    ) -> Tuple[str, str]:
+        words = _WORD_RE.findall(user_query.lower())
+        if words and len(words) <= 6 and all(word in _SMALL_TALK for word in words):
+            return "fast", "small_talk"
+        if any(word.startswith(_ANALYSIS_STEMS) for word in words):
+            return "strong", "analysis"
+        if len(words) > _LONG_QUERY_WORDS:
+            return "strong", "long_query"
+        if row_count > self.large_dataset_rows and history_messages >= 8:
+            return "strong", "large_context"
+        return "standard", "default"
+
+    def p95(self, model: LLMModelName) -> Optional[float]:
+        """Observed p95 time to first token of model, None with too few samples."""
+        with self._lock:
+            return self._p95(model)
+
+    def _p95(self, model: LLMModelName) -> Optional[float]:
+        samples = self._latencies.get(model)
+        if not samples or len(samples) < 10:
+            return None
+        return float(np.percentile(samples, 95))
+
+    def _estimated_cost(self, model: LLMModelName) -> float:
+        input_price = MODEL_COSTS_PER_1M.get(model, (0.0, 0.0))[0]
+        return get_context_token_budget(model) * input_price / 1e6
+
+    def route(
+        self, user_query: str, history_messages: int = 0, row_count: int = 0
+    ) -> ModelRoute:
+        """
+        Choose the model for a request.
+
+        Args:
+            user_query: The user's question
+            history_messages: Number of previous chat messages
+            row_count: Number of transactions in the user's dataset
+
+        Returns:
+            The chosen ModelRoute
+        """
+        tier, reason = self._classify(user_query, history_messages, row_count)
+        if tier not in self.tier_models:
+            tier = "standard"
+        with self._lock:
+            while tier != self.tiers[0]:
+                model = self.tier_models[tier]
+                slo = self.latency_slos.get(tier)
+                p95 = self._p95(model)
+                if slo is not None and p95 is not None and p95 > slo:
+                    reason += "+latency_slo"
+                elif (
+                    self.max_request_cost is not None
+                    and self._estimated_cost(model) > self.max_request_cost
+                ):
+                    reason += "+cost_slo"
+                else:
+                    break
+                tier = self.tiers[self.tiers.index(tier) - 1]
+            key = f"{tier}:{self.tier_models[tier].value}:{reason}"
+            self._decisions[key] = self._decisions.get(key, 0) + 1
+        return ModelRoute(tier, self.tier_models[tier], reason)
+
+    def record_latency(self, model: LLMModelName, seconds: float) -> None:
+        """Record the time to first token of a run on model."""
+        with self._lock:
+            samples = self._latencies.setdefault(model, deque(maxlen=_LATENCY_WINDOW))
+            samples.append(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return routing decisions and latency percentiles for monitoring.
+
+        Returns:
+            Dictionary with the tier configuration, decision counts keyed by
+            "tier:model:reason" and p50/p95 time to first token per model
+        """
+        with self._lock:
+            latency = {
+                model.value: {
+                    "samples": len(samples),
+                    "p50": round(float(np.percentile(samples, 50)), 4),
+                    "p95": round(float(np.percentile(samples, 95)), 4),
+                }
+                for model, samples in self._latencies.items()
+                if samples
+            }
+            return {
+                "tiers": {tier: model.value for tier, model in self.tier_models.items()},
+                "latency_slos": dict(self.latency_slos),
+                "max_request_cost": self.max_request_cost,
+                "decisions": dict(self._decisions),
+                "time_to_first_token": latency,
+            }
+
+
+def _tier_model(tier: str) -> Optional[LLMModelName]:
+    """Model of a tier, or None when the tier is left out."""
+    value = os.getenv(f"MODEL_ROUTE_{tier.upper()}")
+    if value and value.lower() == "none" and tier != "standard":
+        return None
+    if value:
+        return LLMModelName(value)
+    if tier == "fast":
+        try:
+            get_env_variable("GOOGLE_API_KEY")
+        except KeyError:
+            return None
+    return _DEFAULT_TIER_MODELS[tier]
+
+
+def _latency_slos() -> Dict[str, float]:
+    slos = {}
+    for tier in TIERS:
+        value = os.getenv(f"MODEL_ROUTE_LATENCY_SLO_{tier.upper()}")
+        if value:
+            slos[tier] = float(value)
+    return slos
+
+
+_max_cost = os.getenv("MODEL_ROUTE_MAX_REQUEST_COST")
+
+_router = ModelRouter(
+    tier_models={
+        tier: model for tier in TIERS if (model := _tier_model(tier)) is not None
+    },
+    latency_slos=_latency_slos(),
+    max_request_cost=float(_max_cost) if _max_cost else None,
+    large_dataset_rows=int(os.getenv("MODEL_ROUTE_LARGE_DATASET_ROWS", "5000")),
+)
+
+
+def get_model_router() -> ModelRouter:
+    """Return the process-wide model router."""
+    return _router
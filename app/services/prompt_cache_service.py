@@ -0,0 +1,257 @@
+import asyncio
+import hashlib
+import json
+import os
+import warnings
+from contextlib import asynccontextmanager
+from threading import Lock
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from pydantic_ai.messages import ModelMessage, ModelResponse
+from pydantic_ai.models import ModelRequestParameters, StreamedResponse
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+from pydantic_ai.usage import RunUsage
+
+from app.services.cache_service import LRUCache, register_cache
+from app.services.utility_service import estimate_tokens
+
+
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "true").lower() != "false"
+
+# Instructions shorter than this many tokens are not worth an explicit cache
+# (Gemini also refuses caches below its per-model minimum)
+GEMINI_CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "4096"))
+
+# Lifetime in seconds of a Gemini cached content resource
+GEMINI_CONTEXT_CACHE_TTL = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "900"))
+
+# Cached content names by digest of model, system instruction and tools. Entries
+# expire before the resource does, so an expired cache is never referenced.
+_gemini_caches = register_cache(
+    "gemini_context",
+    LRUCache(
+        maxsize=int(os.getenv("GEMINI_CONTEXT_CACHE_SIZE", "256")),
+        ttl=GEMINI_CONTEXT_CACHE_TTL * 0.9,
+    ),
+)
+
+# The cached content holds exactly the instructions and tools that are
+# stripped from the request, so the provider's warning about it is expected
+warnings.filterwarnings(
+    "ignore", message="`google_cached_content` is set", category=UserWarning
+)
+
+_pending: Set[str] = set()
+_tasks: Set[asyncio.Task] = set()
+_gemini_counters_lock = Lock()
+_gemini_counters = {"hits": 0, "creations": 0, "errors": 0}
+
+
+def _count_gemini(name: str) -> None:
+    with _gemini_counters_lock:
+        _gemini_counters[name] += 1
+
+
+def prompt_cache_settings(cache_key: str) -> ModelSettings:
+    """
+    Model settings that help the provider reuse the cached prompt prefix.
+
+    OpenAI routes requests with the same prompt_cache_key to the same cache;
+    other providers ignore the setting.
+
+    Args:
+        cache_key: Key shared by requests with the same prefix, such as the
+            finance content hash
+
+    Returns:
+        Settings to pass to the agent run
+    """
+    return {"openai_prompt_cache_key": cache_key}
+
+
+class GeminiContextCacheModel(WrapperModel):
+    """
+    Gemini model that serves large, repeated instructions from cached content.
+
+    The system instruction (static prompt and the user's finance summary) and
+    the tool declarations of a request are hashed. When a cached content
+    resource with that digest exists, the request references it instead of
+    resending them; otherwise one is created in the background for the next
+    turns. Requests never wait for a cache to be created.
+
+    Mapping the request relies on GoogleModel internals, and referencing the
+    cache relies on GoogleModel leaving the system instruction and tools out
+    of requests with google_cached_content, which pydantic-ai does from the
+    1.107.7 floor in pyproject.toml. If the internals change the request is
+    sent uncached.
+    """
+
+    async def _with_cached_content(
+        self,
+        messages: list[ModelMessage],
+        model_settings: Optional[ModelSettings],
+        model_request_parameters: ModelRequestParameters,
+    ) -> Optional[ModelSettings]:
+        """Return the settings, pointing at cached content when it is available."""
+        model = self.wrapped
+        try:
+            settings, params = model.prepare_request(
+                model_settings, model_request_parameters
+            )
+            tools, tool_config, _ = model._get_tool_config(params, settings or {})
+            system_instruction, _ = await model._map_messages(messages, params)
+        except Exception:
+            # Relies on provider internals; without them requests go uncached
+            return model_settings
+        if system_instruction is None:
+            return model_settings
+        payload = json.dumps(
+            [model.model_name, system_instruction, tools, tool_config],
+            sort_keys=True,
+            default=str,
+        )
+        if estimate_tokens(payload) < GEMINI_CONTEXT_CACHE_MIN_TOKENS:
+            return model_settings
+
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        name = _gemini_caches.get(digest)
+        if name is None:
+            self._schedule_create(digest, system_instruction, tools, tool_config)
+            return model_settings
+        _count_gemini("hits")
+        return {**(model_settings or {}), "google_cached_content": name}
+
+    def _schedule_create(self, digest: str, system_instruction, tools, tool_config) -> None:
+        if digest in _pending:
+            return
+        _pending.add(digest)
+        task = asyncio.get_running_loop().create_task(
+            self._create(digest, system_instruction, tools, tool_config)
+        )
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+
+    async def _create(self, digest: str, system_instruction, tools, tool_config) -> None:
+        try:
+            config: Dict[str, Any] = {
+                "system_instruction": system_instruction,
+                "ttl": f"{GEMINI_CONTEXT_CACHE_TTL}s",
+            }
+            if tools:
+                config["tools"] = tools
+            if tool_config:
+                config["tool_config"] = tool_config
+            cache = await self.wrapped.client.aio.caches.create(
+                model=self.wrapped.model_name, config=config
+            )
+            _gemini_caches.set(digest, cache.name)
+            _count_gemini("creations")
+        except Exception:
+            # Caching is an optimisation; requests keep sending the full prompt
+            _count_gemini("errors")
+        finally:
+            _pending.discard(digest)
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: Optional[ModelSettings],
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        model_settings = await self._with_cached_content(
+            messages, model_settings, model_request_parameters
+        )
+        return await self.wrapped.request(
+            messages, model_settings, model_request_parameters
+        )
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: list[ModelMessage],
+        model_settings: Optional[ModelSettings],
+        model_request_parameters: ModelRequestParameters,
+        run_context=None,
+    ) -> AsyncIterator[StreamedResponse]:
+        model_settings = await self._with_cached_content(
+            messages, model_settings, model_request_parameters
+        )
+        async with self.wrapped.request_stream(
+            messages, model_settings, model_request_parameters, run_context
+        ) as response_stream:
+            yield response_stream
+
+
+class PromptCacheStats:
+    """Thread-safe totals of cached and uncached input tokens per model."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._models: Dict[str, Dict[str, int]] = {}
+
+    def record(self, model_name: str, usage: RunUsage) -> Dict[str, Any]:
+        """
+        Add the usage of one agent run.
+
+        Args:
+            model_name: Model that served the run
+            usage: Usage reported by the run
+
+        Returns:
+            The per-request report: input, cached and uncached input tokens
+        """
+        cached = usage.cache_read_tokens or 0
+        report = {
+            "model": model_name,
+            "input_tokens": usage.input_tokens,
+            "cached_tokens": cached,
+            "uncached_tokens": max(usage.input_tokens - cached, 0),
+            "output_tokens": usage.output_tokens,
+        }
+        with self._lock:
+            totals = self._models.setdefault(
+                model_name,
+                {"runs": 0, "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0},
+            )
+            totals["runs"] += 1
+            totals["input_tokens"] += usage.input_tokens
+            totals["cached_tokens"] += cached
+            totals["output_tokens"] += usage.output_tokens
+        return report
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                model_name: {
+                    **totals,
+                    "cached_ratio": (
+                        round(totals["cached_tokens"] / totals["input_tokens"], 4)
+                        if totals["input_tokens"]
+                        else 0.0
+                    ),
+                }
+                for model_name, totals in self._models.items()
+            }
+
+
+_usage_stats = PromptCacheStats()
+
+
+def record_usage(model_name: str, usage: RunUsage) -> Dict[str, Any]:
+    """Record the token usage of an agent run and return its per-request report."""
+    return _usage_stats.record(model_name, usage)
+
+
+def get_prompt_cache_stats() -> Dict[str, Any]:
+    """Return cached vs uncached input tokens per model and Gemini cache counters."""
+    with _gemini_counters_lock:
+        counters = dict(_gemini_counters)
+    return {
+        "models": _usage_stats.stats(),
+        "gemini_context_cache": {
+            "enabled": GEMINI_CONTEXT_CACHE,
+            "pending": len(_pending),
+            **counters,
+        },
+    }
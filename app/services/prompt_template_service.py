@@ -0,0 +1,193 @@
+import hashlib
+import os
+from collections import deque
+from threading import Lock
+from typing import Any, Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.configs.prompt import PROMPT_SECTIONS, PROMPT_TEMPLATES
+from app.services.model_router_service import TIERS
+from app.services.utility_service import estimate_tokens
+
+
+# Template used for the finance agent
+PROMPT_TEMPLATE = os.getenv("PROMPT_TEMPLATE", "finance")
+
+# Versions served; with several, each dataset is assigned one by hash (A/B)
+PROMPT_TEMPLATE_VERSIONS = [
+    version.strip()
+    for version in os.getenv("PROMPT_TEMPLATE_VERSIONS", "v2").split(",")
+    if version.strip()
+]
+
+# Latency samples kept per compiled prompt
+_LATENCY_WINDOW = 200
+
+
+class CompiledPrompt:
+    """A template version rendered for one model tier, with its token count."""
+
+    def __init__(self, template: str, version: str, tier: str, sections: List[str]):
+        """
+        Args:
+            template: Template name
+            version: Template version
+            tier: Model tier the sections were selected for
+            sections: Names of the included sections, in order
+        """
+        self.template = template
+        self.version = version
+        self.tier = tier
+        self.sections = sections
+        self.text = "\n\n".join(PROMPT_SECTIONS[name] for name in sections) + "\n\n"
+        self.tokens = estimate_tokens(self.text)
+        self.key = f"{template}:{version}:{tier}"
+
+
+def compile_template(
+    template: str,
+    version: str,
+    sections: Sequence[Tuple[str, Optional[Set[str]]]],
+) -> Dict[str, CompiledPrompt]:
+    """
+    Render a template version once per model tier.
+
+    Args:
+        template: Template name
+        version: Template version
+        sections: Ordered (section name, tiers) pairs; tiers limits the
+            section to those tiers, None includes it everywhere
+
+    Returns:
+        CompiledPrompt per tier
+
+    Raises:
+        KeyError: If the template references an unknown section
+    """
+    compiled = {}
+    for tier in TIERS:
+        names = []
+        for name, tiers in sections:
+            if name not in PROMPT_SECTIONS:
+                raise KeyError(f"Unknown prompt section {name!r} in {template}:{version}")
+            if tiers is None or tier in tiers:
+                names.append(name)
+        compiled[tier] = CompiledPrompt(template, version, tier, names)
+    return compiled
+
+
+class PromptRegistry:
+    """
+    Every template version compiled once, with per-prompt usage and latency.
+
+    Requests pick a version among the served ones by a stable hash of a key
+    such as the finance content hash, so a dataset always gets the same
+    prompt (and keeps its provider prompt cache) while traffic is split for
+    A/B comparison of token counts and time to first token.
+    """
+
+    def __init__(
+        self,
+        templates: Dict[str, Dict[str, Sequence[Tuple[str, Optional[Set[str]]]]]],
+        template: str,
+        versions: List[str],
+    ):
+        """
+        Args:
+            templates: Template name -> version -> ordered sections
+            template: Template served to requests
+            versions: Versions of that template served to requests
+
+        Raises:
+            KeyError: If a served template version does not exist
+        """
+        self._compiled: Dict[Tuple[str, str], Dict[str, CompiledPrompt]] = {
+            (name, version): compile_template(name, version, sections)
+            for name, template_versions in templates.items()
+            for version, sections in template_versions.items()
+        }
+        for version in versions:
+            if (template, version) not in self._compiled:
+                raise KeyError(f"Unknown prompt template {template}:{version}")
+        self.template = template
+        self.versions = versions
+        self._lock = Lock()
+        self._requests: Dict[str, int] = {}
+        self._latencies: Dict[str, Deque[float]] = {}
+
+    def get(self, template: str, version: str, tier: str) -> CompiledPrompt:
+        """Return a compiled prompt by template, version and tier."""
+        return self._compiled[(template, version)][tier]
+
+    def select(self, tier: str, key: Optional[str] = None) -> CompiledPrompt:
+        """
+        Choose the prompt for a request.
+
+        Args:
+            tier: Model tier of the request
+            key: Stable key assigning the request to a version; the first
+                served version is used without one
+
+        Returns:
+            The compiled prompt
+        """
+        version = self.versions[0]
+        if key and len(self.versions) > 1:
+            bucket = int(hashlib.sha256(key.encode("utf-8")).hexdigest()[:8], 16)
+            version = self.versions[bucket % len(self.versions)]
+        return self.get(self.template, version, tier)
+
+    def record_request(self, prompt: CompiledPrompt) -> None:
+        """Count a model run that used prompt."""
+        with self._lock:
+            self._requests[prompt.key] = self._requests.get(prompt.key, 0) + 1
+
+    def record_latency(self, prompt: CompiledPrompt, seconds: float) -> None:
+        """Record the time to first token of a run that used prompt."""
+        with self._lock:
+            samples = self._latencies.setdefault(prompt.key, deque(maxlen=_LATENCY_WINDOW))
+            samples.append(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return every compiled prompt with its size, usage and latency.
+
+        Returns:
+            Dictionary with the served template and versions, and per
+            "template:version:tier" the sections, token count, number of runs
+            and p50/p95 time to first token
+        """
+        with self._lock:
+            prompts = {}
+            for compiled in self._compiled.values():
+                for prompt in compiled.values():
+                    samples = self._latencies.get(prompt.key)
+                    prompts[prompt.key] = {
+                        "sections": list(prompt.sections),
+                        "tokens": prompt.tokens,
+                        "requests": self._requests.get(prompt.key, 0),
+                        "time_to_first_token": (
+                            {
+                                "samples": len(samples),
+                                "p50": round(float(np.percentile(samples, 50)), 4),
+                                "p95": round(float(np.percentile(samples, 95)), 4),
+                            }
+                            if samples
+                            else None
+                        ),
+                    }
+            return {
+                "template": self.template,
+                "versions": list(self.versions),
+                "prompts": prompts,
+            }
+
+
+# Compiled once, when the app starts
+_registry = PromptRegistry(PROMPT_TEMPLATES, PROMPT_TEMPLATE, PROMPT_TEMPLATE_VERSIONS)
+
+
+def get_prompt_registry() -> PromptRegistry:
+    """Return the process-wide prompt registry."""
+    return _registry
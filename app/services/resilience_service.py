@@ -0,0 +1,328 @@
+import asyncio
+import os
+import time
+from threading import Lock
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from app.configs.model_config import LLMModelName
+
+
+# Consecutive failures after which a provider is skipped
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+
+# Seconds a tripped provider is skipped before one trial request is let through
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+
+# Models tried, in order, when the routed model is slow or failing
+FALLBACK_MODELS = [
+    LLMModelName(name.strip())
+    for name in os.getenv("MODEL_FALLBACKS", "gemini-2.0-flash").split(",")
+    if name.strip()
+]
+
+HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() != "false"
+
+# Fixed hedge delay in seconds; by default the routed model's observed p95
+# time to first token is used, or _DEFAULT_HEDGE_DELAY until enough samples exist
+_HEDGE_DELAY = os.getenv("LLM_HEDGE_DELAY")
+_DEFAULT_HEDGE_DELAY = 3.0
+_MIN_HEDGE_DELAY = 0.25
+
+
+def get_hedge_delay(observed_p95: Optional[float]) -> Optional[float]:
+    """
+    Return the seconds to wait for a first token before sending a hedge.
+
+    Args:
+        observed_p95: p95 time to first token of the primary model, if known
+
+    Returns:
+        The delay, or None when hedging is disabled
+    """
+    if not HEDGE_ENABLED:
+        return None
+    if _HEDGE_DELAY:
+        return float(_HEDGE_DELAY)
+    if observed_p95 is None:
+        return _DEFAULT_HEDGE_DELAY
+    return max(observed_p95, _MIN_HEDGE_DELAY)
+
+
+class CircuitOpenError(Exception):
+    """Raised when every candidate is skipped because its circuit is open."""
+
+
+class EmptyStreamError(Exception):
+    """Raised for a candidate whose stream ended without producing a frame."""
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker.
+
+    After failure_threshold consecutive failures the circuit opens and the
+    provider is skipped. Once reset_timeout has passed a single trial request
+    is allowed (half-open); its success closes the circuit again, its failure
+    re-opens it.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+    ):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds before an open circuit allows a trial request
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = Lock()
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self.successes = 0
+        self.total_failures = 0
+        self.rejections = 0
+
+    @property
+    def state(self) -> str:
+        """closed, open or half_open."""
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Return whether a request may be sent to the provider now."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.rejections += 1
+            return False
+
+    def release(self) -> None:
+        """Give back a trial slot whose request was cancelled before finishing."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+            self.successes += 1
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self.total_failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "successes": self.successes,
+                "failures": self.total_failures,
+                "rejections": self.rejections,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = Lock()
+
+_counters_lock = Lock()
+_counters = {"runs": 0, "hedges": 0, "fallback_wins": 0, "failovers": 0}
+
+
+def get_circuit_breaker(provider: str) -> CircuitBreaker:
+    """Return the circuit breaker of a provider, created on first use."""
+    breaker = _breakers.get(provider)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(provider, CircuitBreaker())
+    return breaker
+
+
+def _count(name: str) -> None:
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def get_resilience_stats() -> Dict[str, Any]:
+    """Return hedging/failover counters and the state of every circuit."""
+    with _counters_lock:
+        counters = dict(_counters)
+    return {
+        **counters,
+        "circuits": {name: breaker.stats() for name, breaker in _breakers.items()},
+    }
+
+
+class StreamCandidate:
+    """A way to produce the response stream, from one provider and model."""
+
+    def __init__(
+        self,
+        provider: str,
+        name: str,
+        start: Callable[[], AsyncIterator[str]],
+    ):
+        """
+        Args:
+            provider: Provider name, selects the circuit breaker
+            name: Model name, for reporting
+            start: Starts a new stream of frames
+        """
+        self.provider = provider
+        self.name = name
+        self.start = start
+
+
+_FRAME, _END, _ERROR = "frame", "end", "error"
+
+
+class _StreamRunner:
+    """
+    Consume one candidate's stream in a dedicated task.
+
+    Agent runs hold cancel scopes that must be exited by the task that
+    entered them, so each stream lives entirely in its own task and hands
+    its frames over through a queue.
+    """
+
+    def __init__(self, candidate: StreamCandidate):
+        self.candidate = candidate
+        self.queue: "asyncio.Queue[tuple]" = asyncio.Queue()
+        self.first: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.task = asyncio.ensure_future(self._pump())
+
+    async def _put(self, item: tuple) -> None:
+        if not self.first.done():
+            self.first.set_result(item[0])
+        await self.queue.put(item)
+
+    async def _pump(self) -> None:
+        try:
+            async for frame in self.candidate.start():
+                await self._put((_FRAME, frame))
+            if not self.first.done():
+                # An empty answer is a failure, not a winner of the hedge
+                raise EmptyStreamError(f"{self.candidate.name} produced no response")
+            await self._put((_END, None))
+        except Exception as e:
+            await self._put((_ERROR, e))
+
+    async def cancel(self) -> None:
+        self.task.cancel()
+        try:
+            await self.task
+        except BaseException:
+            pass
+
+
+async def hedged_stream(
+    candidates: List[StreamCandidate],
+    hedge_delay: Optional[float],
+    on_winner: Optional[Callable[[StreamCandidate], None]] = None,
+) -> AsyncIterator[str]:
+    """
+    Stream from the first candidate that produces a frame.
+
+    The first candidate is started right away. If it has not produced its
+    first frame after hedge_delay seconds the next candidate is started as a
+    hedge, and whichever yields first wins; the others are cancelled. A
+    candidate that fails, or ends without any frame, before its first frame is
+    recorded on its provider's circuit breaker and the next candidate is
+    started immediately. Candidates
+    whose circuit is open are skipped. Once a winner has streamed a frame its
+    errors propagate, since output cannot be switched mid-answer.
+
+    Args:
+        candidates: Streams to try, in order of preference
+        hedge_delay: Seconds to wait for a first frame before hedging;
+            None disables hedging (failover still applies)
+        on_winner: Called with the winning candidate
+
+    Yields:
+        Frames of the winning stream
+    """
+    _count("runs")
+    pending = list(candidates)
+    running: List[_StreamRunner] = []
+    last_error: Optional[BaseException] = None
+
+    def launch() -> bool:
+        while pending:
+            candidate = pending.pop(0)
+            if get_circuit_breaker(candidate.provider).allow():
+                running.append(_StreamRunner(candidate))
+                return True
+        return False
+
+    if not launch():
+        raise CircuitOpenError("Every model provider is currently unavailable")
+
+    winner: Optional[_StreamRunner] = None
+    try:
+        while running and winner is None:
+            can_hedge = hedge_delay is not None and pending and len(running) == 1
+            done, _ = await asyncio.wait(
+                [runner.first for runner in running],
+                timeout=hedge_delay if can_hedge else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                if launch():
+                    _count("hedges")
+                continue
+            for runner in list(running):
+                if not runner.first.done():
+                    continue
+                running.remove(runner)
+                if runner.first.result() != _ERROR:
+                    winner = runner
+                    break
+                last_error = (await runner.queue.get())[1]
+                get_circuit_breaker(runner.candidate.provider).record_failure()
+            if winner is None and not running and launch():
+                _count("failovers")
+    finally:
+        # Cancel the losers (or everything, if the caller went away)
+        for runner in running:
+            await runner.cancel()
+            get_circuit_breaker(runner.candidate.provider).release()
+
+    if winner is None:
+        raise last_error or CircuitOpenError("No model produced a response")
+
+    if winner.candidate is not candidates[0]:
+        _count("fallback_wins")
+    if on_winner is not None:
+        on_winner(winner.candidate)
+    breaker = get_circuit_breaker(winner.candidate.provider)
+    try:
+        while True:
+            kind, value = await winner.queue.get()
+            if kind == _FRAME:
+                yield value
+            elif kind == _ERROR:
+                breaker.record_failure()
+                raise value
+            else:
+                break
+    finally:
+        await winner.cancel()
+        breaker.release()
+    breaker.record_success()
@@ -0,0 +1,163 @@
+import hashlib
+import os
+import re
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.model.agent_model import ChatMessage
+from app.services.cache_service import LRUCache, register_cache
+from app.services.embedding_service import get_embedding_model
+
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() != "false"
+
+# The similarity tier is opt-in: a lexical embedding can match questions that
+# differ in a word that matters, so it is guarded by a high threshold
+SEMANTIC_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_SEMANTIC", "false").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.9"))
+
+# Number of most recent chat messages that are part of the cache key
+_HISTORY_MESSAGES = int(os.getenv("RESPONSE_CACHE_HISTORY_MESSAGES", "4"))
+
+# Similar questions remembered per dataset and conversation state
+_SEMANTIC_ENTRIES = 32
+
+_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "900"))
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+# Words dropped before embedding so phrasing differences do not dilute the
+# words that carry the meaning. Time and quantity words ("this", "last",
+# "much", "many") are deliberately kept.
+_FILLER = frozenset(
+    "a an the is are was were be what whats s my me i do did does please can "
+    "could would you tell show give of to for on in at about".split()
+)
+
+_exact_cache = register_cache(
+    "response_exact",
+    LRUCache(maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")), ttl=_TTL),
+)
+
+# (model, finance hash, history fingerprint) -> list of (vector, numbers, text)
+_semantic_cache = register_cache(
+    "response_semantic",
+    LRUCache(maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")), ttl=_TTL),
+)
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase a query and reduce it to its words, dropping punctuation."""
+    return " ".join(_WORD_RE.findall(query.lower()))
+
+
+def history_fingerprint(
+    chat_history: List[ChatMessage], last: Optional[int] = None
+) -> str:
+    """
+    Fingerprint the most recent chat messages.
+
+    A follow-up question only matches a cached answer given after the same
+    recent conversation.
+
+    Args:
+        chat_history: Previous conversation history
+        last: Number of recent messages covered;
+            RESPONSE_CACHE_HISTORY_MESSAGES when omitted
+
+    Returns:
+        Hex digest of the last messages
+    """
+    last = _HISTORY_MESSAGES if last is None else last
+    digest = hashlib.sha256()
+    recent = chat_history[-last:] if last else []
+    for message in recent:
+        digest.update(message.role.encode("utf-8") + b"\0")
+        digest.update(message.content.encode("utf-8") + b"\0")
+    return digest.hexdigest()
+
+
+def _semantic_text(normalized_query: str) -> str:
+    return " ".join(w for w in normalized_query.split() if w not in _FILLER)
+
+
+def _numbers(normalized_query: str) -> Tuple[str, ...]:
+    return tuple(sorted(_NUMBER_RE.findall(normalized_query)))
+
+
+def lookup_response(
+    model: str,
+    finance_hash: str,
+    user_query: str,
+    chat_history: List[ChatMessage],
+) -> Optional[str]:
+    """
+    Return a cached answer for the question, if there is one.
+
+    The exact tier matches the normalised question. The optional similarity
+    tier compares embeddings of questions asked against the same data and
+    conversation state, and only matches when every number in the question
+    (amounts, counts, years) is the same.
+
+    Args:
+        model: Name of the model answering the question
+        finance_hash: Content hash of the user's finance data
+        user_query: The user's question
+        chat_history: Previous conversation history
+
+    Returns:
+        The cached response text, or None on a miss
+    """
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    normalized = normalize_query(user_query)
+    partition = (model, finance_hash, history_fingerprint(chat_history))
+    cached = _exact_cache.get((*partition, normalized))
+    if cached is not None or not SEMANTIC_CACHE_ENABLED:
+        return cached
+
+    entries = _semantic_cache.get(partition)
+    if not entries:
+        return None
+    numbers = _numbers(normalized)
+    vector = get_embedding_model().embed([_semantic_text(normalized)])[0]
+    similarities = np.stack([entry[0] for entry in entries]) @ vector
+    for index in np.argsort(-similarities):
+        if similarities[index] < SEMANTIC_CACHE_THRESHOLD:
+            break
+        if entries[index][1] == numbers:
+            return entries[index][2]
+    return None
+
+
+def store_response(
+    model: str,
+    finance_hash: str,
+    user_query: str,
+    chat_history: List[ChatMessage],
+    response_text: str,
+) -> None:
+    """
+    Cache a complete answer for later lookups.
+
+    Args:
+        model: Name of the model that answered the question
+        finance_hash: Content hash of the user's finance data
+        user_query: The user's question
+        chat_history: Previous conversation history
+        response_text: The validated response text
+    """
+    if not RESPONSE_CACHE_ENABLED or not response_text:
+        return
+    normalized = normalize_query(user_query)
+    partition = (model, finance_hash, history_fingerprint(chat_history))
+    _exact_cache.set((*partition, normalized), response_text)
+    if not SEMANTIC_CACHE_ENABLED:
+        return
+
+    vector = get_embedding_model().embed([_semantic_text(normalized)])[0]
+    entries = list(_semantic_cache.get(partition) or [])
+    entries.append((vector, _numbers(normalized), response_text))
+    _semantic_cache.set(partition, entries[-_SEMANTIC_ENTRIES:])
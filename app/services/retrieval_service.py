@@ -0,0 +1,479 @@
+import io
+import itertools
+import math
+import os
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from threading import Lock
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.configs.model_config import EmbeddingModelName
+from app.services.cache_service import LRUCache, register_cache
+from app.services.embedding_service import get_embedding_model
+from app.services.transaction_service import TransactionStore
+
+
+# Also rank transactions by embedding similarity, fused with BM25 (off by default)
+RETRIEVAL_DENSE = os.getenv("RETRIEVAL_DENSE", "false").lower() == "true"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Separates the rows of an encoded batch; never part of UTF-8 text
+_SEPARATOR = b"\xff"
+
+# Maps the bytes of a batch to themselves when they can be part of a token
+# ([a-z0-9]) or are the row separator, and to a space otherwise, so that
+# bytes.split() tokenises a whole batch like _TOKEN_RE at C speed
+_TOKEN_BYTES = bytes(
+    byte if chr(byte) in "0123456789abcdefghijklmnopqrstuvwxyz\xff" else ord(" ")
+    for byte in range(256)
+)
+
+# BM25 term frequency saturation and document length normalisation
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+# Reciprocal rank fusion constant for combining the BM25 and dense rankings
+_RRF_K = 60
+
+# Indexed terms a query term that is not indexed itself may expand to by prefix
+_MAX_EXPANSIONS = 8
+
+
+def _row_texts(store: TransactionStore, start: int, end: Optional[int] = None) -> List[str]:
+    """Lowercase searchable text of the rows of store from start to end."""
+    types = store.types.labels
+    categories = store.categories.labels
+    titles = store.titles.labels
+    merchants = store.merchants.labels
+    texts = []
+    for title, merchant, description, sms, location, type_code, category, amount in zip(
+        store.title_codes[start:end].tolist(),
+        store.merchant_codes[start:end].tolist(),
+        store.descriptions[start:end],
+        store.sms_contents[start:end],
+        store.locations[start:end],
+        store.type_codes[start:end].tolist(),
+        store.category_codes[start:end].tolist(),
+        store.amounts[start:end].tolist(),
+    ):
+        title = titles[title] or ""
+        merchant = merchants[merchant]
+        texts.append(
+            f"{title} {merchant if merchant != title else ''} {description or ''} "
+            f"{sms or ''} {location or ''} {types[type_code] or ''} "
+            f"{categories[category] or ''} "
+            f"{int(amount) if math.isfinite(amount) else ''}".lower()
+        )
+    return texts
+
+
+def _query_tokens(query_terms: Sequence[str]) -> List[str]:
+    """Split query terms into the tokens the index is built from."""
+    tokens = []
+    for term in query_terms:
+        for token in _TOKEN_RE.findall(term.lower()):
+            if len(token) > 2 and token not in tokens:
+                tokens.append(token)
+    return tokens
+
+
+class IndexSegment:
+    """
+    Postings of a contiguous range of rows, in compressed sparse row form.
+
+    The rows containing terms[i] are rows[offsets[i]:offsets[i + 1]], in
+    increasing order, with their term frequencies at the same positions of
+    frequencies. Indexing appended rows creates a new segment instead of
+    changing existing ones, so only new segments need to be persisted.
+    """
+
+    def __init__(
+        self,
+        start: int,
+        terms: List[str],
+        offsets: np.ndarray,
+        rows: np.ndarray,
+        frequencies: np.ndarray,
+        lengths: np.ndarray,
+        vectors: Optional[np.ndarray] = None,
+        embedding_model: Optional[str] = None,
+    ):
+        """
+        Args:
+            start: First row covered by the segment
+            terms: Indexed terms
+            offsets: Start of each term's postings, plus the total at the end
+            rows: Row indexes into the store, grouped by term
+            frequencies: Occurrences of the term in each of those rows
+            lengths: Number of tokens of every covered row
+            vectors: Embedding of every covered row, when dense retrieval is on
+            embedding_model: Name of the model that produced vectors
+        """
+        self.start = start
+        self.terms = terms
+        self.offsets = offsets
+        self.rows = rows
+        self.frequencies = frequencies
+        self.lengths = lengths
+        self.vectors = vectors
+        self.embedding_model = embedding_model
+
+    @property
+    def end(self) -> int:
+        """Row after the last one covered by the segment."""
+        return self.start + len(self.lengths)
+
+    @classmethod
+    def build(
+        cls,
+        store: TransactionStore,
+        start: int,
+        embedding_model: Optional[EmbeddingModelName] = None,
+    ) -> "IndexSegment":
+        """
+        Index the rows of store from start onwards.
+
+        Args:
+            store: Columnar store of the transactions
+            start: First row to index
+            embedding_model: Embedding model for dense retrieval, if enabled
+
+        Returns:
+            IndexSegment covering rows start to len(store)
+        """
+        texts = _row_texts(store, start)
+        count = len(texts)
+
+        # Tokenise the whole range at once; separator tokens mark row ends
+        blob = (b" " + _SEPARATOR + b" ").join(text.encode("utf-8") for text in texts)
+        blob = blob.translate(_TOKEN_BYTES)
+        term_ids: Dict[bytes, int] = defaultdict(itertools.count().__next__)
+        separator = term_ids[_SEPARATOR]
+        ids = np.fromiter(map(term_ids.__getitem__, blob.split()), dtype=np.int64)
+        is_separator = ids == separator
+        token_rows = np.cumsum(is_separator)[~is_separator]
+        ids = ids[~is_separator] - 1
+        lengths = np.bincount(token_rows, minlength=count).astype(np.int32)
+        del term_ids[_SEPARATOR]
+
+        # One key per (term, row) pair; sorting groups the postings by term
+        keys, frequencies = np.unique(ids * max(count, 1) + token_rows, return_counts=True)
+        term_of = keys // max(count, 1)
+        offsets = np.searchsorted(term_of, np.arange(len(term_ids) + 1))
+
+        vectors = None
+        if embedding_model is not None:
+            vectors = get_embedding_model(embedding_model).embed(texts)
+        return cls(
+            start=start,
+            terms=[term.decode("ascii") for term in term_ids],
+            offsets=offsets.astype(np.int64),
+            rows=(keys % max(count, 1) + start).astype(np.int32),
+            frequencies=np.minimum(frequencies, np.iinfo(np.uint16).max).astype(np.uint16),
+            lengths=lengths,
+            vectors=vectors,
+            embedding_model=embedding_model.value if embedding_model else None,
+        )
+
+    def to_bytes(self) -> bytes:
+        """Serialise the segment, for storing it next to its dataset."""
+        arrays = {
+            "start": np.array(self.start, dtype=np.int64),
+            "terms": np.frombuffer("\n".join(self.terms).encode("utf-8"), dtype=np.uint8),
+            "offsets": self.offsets,
+            "rows": self.rows,
+            "frequencies": self.frequencies,
+            "lengths": self.lengths,
+        }
+        if self.vectors is not None:
+            arrays["vectors"] = self.vectors
+            arrays["embedding_model"] = np.array(self.embedding_model)
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "IndexSegment":
+        """Load a segment serialised with to_bytes."""
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            terms = arrays["terms"].tobytes().decode("utf-8")
+            return cls(
+                start=int(arrays["start"]),
+                terms=terms.split("\n") if terms else [],
+                offsets=arrays["offsets"],
+                rows=arrays["rows"],
+                frequencies=arrays["frequencies"],
+                lengths=arrays["lengths"],
+                vectors=arrays["vectors"] if "vectors" in arrays else None,
+                embedding_model=(
+                    str(arrays["embedding_model"]) if "embedding_model" in arrays else None
+                ),
+            )
+
+
+class TransactionIndex:
+    """
+    Full-text (BM25) and optional dense retrieval index over a dataset's rows.
+
+    Covers the title, merchant, description, SMS, location, type, category
+    and whole amount of every transaction. The index is made of segments:
+    appended transactions are indexed as a new segment, so the existing rows
+    are never tokenised again, and loading persisted segments only maps each
+    term to where its postings are. A query only touches the postings of its
+    terms, which keeps lookups under a millisecond at 100k rows.
+    """
+
+    def __init__(
+        self,
+        store: TransactionStore,
+        segments: Sequence[IndexSegment] = (),
+        dense: bool = RETRIEVAL_DENSE,
+    ):
+        """
+        Args:
+            store: Columnar store of the transactions
+            segments: Previously built segments covering the first rows of
+                store, in order; the remaining rows are indexed here
+            dense: Whether to also rank rows by embedding similarity
+        """
+        self.embedding_model = get_embedding_model().model_name if dense else None
+        self.segments: List[IndexSegment] = []
+        self._lock = Lock()
+        # Position of each term in every segment (in parallel with segments)
+        self._positions: List[Dict[str, int]] = []
+        # Rows of a term with the BM25 term frequency component of each,
+        # gathered from the segments on first use
+        self._weights: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        # Sorted terms, for prefix lookups; built on first use
+        self._terms: Optional[List[str]] = None
+        self._lengths = np.empty(0, dtype=np.int32)
+        self._norms = np.empty(0, dtype=np.float64)
+        self._recency = np.empty(0, dtype=np.int64)
+        self._newest = np.empty(0, dtype=np.int64)
+        self._vectors: Optional[np.ndarray] = None
+        for segment in segments:
+            if self.embedding_model is not None and (
+                segment.vectors is None
+                or segment.embedding_model != self.embedding_model.value
+            ):
+                texts = _row_texts(store, segment.start, segment.end)
+                segment.vectors = get_embedding_model(self.embedding_model).embed(texts)
+                segment.embedding_model = self.embedding_model.value
+            self._add(segment)
+        self.update(store)
+
+    @property
+    def rows(self) -> int:
+        """Number of indexed rows."""
+        return len(self._lengths)
+
+    def _add(self, segment: IndexSegment) -> None:
+        """Add a segment; its postings are only referenced, not copied."""
+        self._positions.append(dict(zip(segment.terms, range(len(segment.terms)))))
+        self._terms = None
+        self._lengths = np.concatenate([self._lengths, segment.lengths])
+        if self.embedding_model is not None:
+            self._vectors = (
+                segment.vectors
+                if self._vectors is None
+                else np.concatenate([self._vectors, segment.vectors])
+            )
+        self.segments.append(segment)
+
+    def update(self, store: TransactionStore) -> List[IndexSegment]:
+        """
+        Index the rows appended to store since the last update.
+
+        Args:
+            store: The store the index was built from, with new rows at the end
+
+        Returns:
+            The new segments (empty when there were no new rows)
+        """
+        with self._lock:
+            segments = []
+            if len(store) > self.rows:
+                segments.append(IndexSegment.build(store, self.rows, self.embedding_model))
+                self._add(segments[-1])
+            if len(self._norms) == self.rows:
+                return segments
+
+            average = max(float(self._lengths.mean()), 1.0)
+            self._norms = _BM25_K1 * (1 - _BM25_B + _BM25_B * self._lengths / average)
+            self._weights = {}
+            # Oldest first; NaT is the smallest int64 so undated rows rank lowest
+            count = self.rows
+            by_date = np.lexsort((np.arange(count), store.dates[:count].view(np.int64)))
+            self._recency = np.empty(count, dtype=np.int64)
+            self._recency[by_date] = np.arange(count)
+            self._newest = by_date[::-1]
+            return segments
+
+    def copy(self) -> "TransactionIndex":
+        """
+        Return an independent copy that can be updated without changing self.
+
+        Segments and their postings are immutable and shared; update() only
+        appends to the segment lists and replaces the row arrays, so copying
+        the lists is enough.
+        """
+        clone = TransactionIndex.__new__(TransactionIndex)
+        with self._lock:
+            clone.__dict__.update(self.__dict__)
+            clone._lock = Lock()
+            clone.segments = list(self.segments)
+            clone._positions = list(self._positions)
+            clone._weights = dict(self._weights)
+        return clone
+
+    def _expand(self, token: str) -> List[str]:
+        """The indexed terms matching a query token, exactly or else by prefix."""
+        if any(token in positions for positions in self._positions):
+            return [token]
+        if self._terms is None:
+            self._terms = sorted(set().union(*self._positions))
+        terms = []
+        position = bisect_left(self._terms, token)
+        while (
+            position < len(self._terms)
+            and len(terms) < _MAX_EXPANSIONS
+            and self._terms[position].startswith(token)
+        ):
+            terms.append(self._terms[position])
+            position += 1
+        return terms
+
+    def _term_weights(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows containing term and the BM25 term frequency component of each."""
+        cached = self._weights.get(term)
+        if cached is None:
+            rows, frequencies = [], []
+            for segment, positions in zip(self.segments, self._positions):
+                i = positions.get(term)
+                if i is not None:
+                    begin, end = segment.offsets[i], segment.offsets[i + 1]
+                    rows.append(segment.rows[begin:end])
+                    frequencies.append(segment.frequencies[begin:end])
+            rows = np.concatenate(rows)
+            tf = np.concatenate(frequencies).astype(np.float64)
+            cached = rows, tf * (_BM25_K1 + 1) / (tf + self._norms[rows])
+            self._weights[term] = cached
+        return cached
+
+    def _top(self, scores: np.ndarray, limit: int) -> np.ndarray:
+        """Rows with a positive score, highest first and then most recent first."""
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            values = scores[candidates]
+            cut = len(candidates) - limit
+            threshold = np.partition(values, cut)[cut]
+            # Rows tied at the threshold (often many identical texts) are cut
+            # down to the most recent ones before sorting
+            tied = candidates[values == threshold]
+            needed = limit - int((values > threshold).sum())
+            if len(tied) > needed:
+                tied = tied[np.argpartition(-self._recency[tied], needed - 1)[:needed]]
+            candidates = np.concatenate([candidates[values > threshold], tied])
+        order = np.lexsort((self._recency[candidates], scores[candidates]))[::-1]
+        return candidates[order[:limit]]
+
+    def search(self, query_terms: Sequence[str], limit: int) -> np.ndarray:
+        """
+        Return the rows most relevant to a query.
+
+        Rows are ranked by BM25 score, fused with the embedding similarity
+        ranking when dense retrieval is on; ties and the remaining slots go to
+        the most recent rows. The ranking is fully deterministic.
+
+        Args:
+            query_terms: Terms extracted from the user query
+            limit: Maximum number of rows to return
+
+        Returns:
+            Row indexes into the store, most relevant first
+        """
+        with self._lock:
+            count = self.rows
+            if not count or limit <= 0:
+                return np.empty(0, dtype=np.int64)
+            tokens = _query_tokens(query_terms)
+            ranked = np.empty(0, dtype=np.int64)
+            if tokens:
+                scores = np.zeros(count, dtype=np.float64)
+                for token in tokens:
+                    for term in self._expand(token):
+                        rows, weights = self._term_weights(term)
+                        idf = math.log(1 + (count - len(rows) + 0.5) / (len(rows) + 0.5))
+                        scores[rows] += idf * weights
+                ranked = self._top(scores, limit)
+
+                if self._vectors is not None:
+                    query_vector = get_embedding_model(self.embedding_model).embed(
+                        [" ".join(tokens)]
+                    )[0]
+                    similar = self._top(self._vectors @ query_vector, limit)
+                    fused = np.zeros(count, dtype=np.float64)
+                    fused[ranked] += 1.0 / (_RRF_K + 1 + np.arange(len(ranked)))
+                    fused[similar] += 1.0 / (_RRF_K + 1 + np.arange(len(similar)))
+                    ranked = self._top(fused, limit)
+
+            if len(ranked) < limit:
+                recent = self._newest[: limit + len(ranked)]
+                recent = recent[~np.isin(recent, ranked)][: limit - len(ranked)]
+                ranked = np.concatenate([ranked, recent])
+            return ranked.astype(np.int64)
+
+
+_index_cache = register_cache(
+    "transaction_index",
+    LRUCache(maxsize=int(os.getenv("RETRIEVAL_CACHE_SIZE", "32"))),
+)
+
+
+def get_transaction_index(
+    store: TransactionStore,
+    finance_hash: str,
+    segments: Sequence[IndexSegment] = (),
+) -> TransactionIndex:
+    """
+    Return the retrieval index of a dataset, built once per content hash.
+
+    Args:
+        store: Columnar store of the transactions
+        finance_hash: Content hash of the finance data
+        segments: Persisted segments to build the index from, if any
+
+    Returns:
+        TransactionIndex instance
+    """
+    index = _index_cache.get(finance_hash)
+    if index is None:
+        index = TransactionIndex(store, segments)
+        _index_cache.set(finance_hash, index)
+    return index
+
+
+def advance_transaction_index(
+    previous_hash: str, content_hash: str, store: TransactionStore
+) -> None:
+    """
+    Move the index of a dataset to its new content hash after an append.
+
+    Only the appended rows are indexed, into a copy: other datasets with the
+    previous content share its cached index, which stays unchanged. Nothing
+    happens when the index of the previous content was never built.
+
+    Args:
+        previous_hash: Content hash before the append
+        content_hash: Content hash after the append
+        store: The store with the appended rows at the end
+    """
+    previous = _index_cache.get(previous_hash)
+    if previous is not None:
+        index = previous.copy()
+        index.update(store)
+        _index_cache.set(content_hash, index)
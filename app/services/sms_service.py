@@ -0,0 +1,232 @@
+import os
+import re
+from bisect import bisect_right
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from app.services.cache_service import LRUCache, register_cache
+
+
+class MessageFields(NamedTuple):
+    """Structured fields extracted from a transaction's SMS and description."""
+
+    merchant: Optional[str]
+    upi_ref: Optional[str]
+    account: Optional[str]
+    balance: Optional[float]
+    bank: Optional[str]
+
+
+_EMPTY = MessageFields(None, None, None, None, None)
+
+# Joins the texts of a batch; no pattern below can match across it
+_SEPARATOR = "\x00"
+
+# The patterns below start with a literal, which lets the regex engine skip
+# ahead to candidate positions; those scanning the lowercased batch are
+# written in lowercase, and the word boundary before a match is checked by
+# _scan rather than with a leading \b, which would disable that skip
+
+# Payee of a debit ("... to Swiggy. UPI:...") and payer VPA of a credit,
+# matched in the lowercased batch
+_MERCHANT_PATTERNS = [
+    re.compile(r"to ([a-z0-9 &.'-]+?)\.\s"),
+    re.compile(r"vpa ([\w.-]+)@"),
+]
+
+# Merchants named in notifications, matched case-sensitively after the above
+_NAMED_MERCHANT_PATTERNS = [
+    re.compile(r"Dear ([A-Za-z0-9&'-]+(?: [A-Za-z0-9&'-]+){0,2}) customer\b"),
+    re.compile(r"for ([A-Z][A-Za-z0-9&'-]*) order\b"),
+]
+
+# "UPI:589061111461", "UPI Ref no 504778163065", "Ref: 807631716690"
+_UPI_REF_PATTERN = re.compile(
+    r"(?:upi(?:[ ]?ref(?:erence)?)?|ref)(?:[ ]?no)?[ ]?[.:#-]?[ ]?(\d{9,16})\b"
+)
+
+# "A/c *7252", "a/c XXX5557252", "A/c no. XX7252", "Transaction (7252)"
+_ACCOUNT_PATTERN = re.compile(
+    r"(?:a/c|acct|account)[ ]?(?:no\.?[ ]?)?[*x]*\d*?(\d{4})\b"
+    r"|transaction \((\d{4})\)"
+)
+
+# "Total Bal : Rs. 58,117.30 CR", "Avl Bal INR 1,234.00", "Bal: Rs.500 DR"
+_BALANCE_PATTERN = re.compile(
+    r"bal(?:ance)?[ ]?(?:is[ ]?)?[:-]?[ ]?(?:rs\.?|inr|₹)[ ]?"
+    r"(\d[\d,]*(?:\.\d+)?)(?:[ ]?(cr|dr)\b)?"
+)
+
+# Issuing banks; matched last in the text, where banks sign their messages,
+# with or without spaces ("IndianBank") and never inside a VPA ("x@axisbank")
+_BANKS = [
+    "Axis Bank",
+    "Bank of Baroda",
+    "Canara Bank",
+    "Federal Bank",
+    "HDFC Bank",
+    "ICICI Bank",
+    "IDFC FIRST Bank",
+    "Indian Bank",
+    "IndusInd Bank",
+    "Kotak Mahindra Bank",
+    "Punjab National Bank",
+    "SBI",
+    "State Bank of India",
+    "Union Bank of India",
+    "Yes Bank",
+]
+_BANK_ALIASES = {"kotak": "Kotak Mahindra Bank", "pnb": "Punjab National Bank"}
+_BANK_NAMES = {
+    **{name.lower().replace(" ", ""): name for name in _BANKS},
+    "statebankofindia": "SBI",
+    **_BANK_ALIASES,
+}
+_BANK_PATTERN = re.compile(
+    "("
+    + "|".join(
+        re.escape(name.lower()).replace(r"\ ", "[ ]?")
+        for name in sorted([*_BANKS, *_BANK_ALIASES], key=len, reverse=True)
+    )
+    + r")\b"
+)
+
+# Hash of the parsed text and its fields by transaction id; an entry is only
+# reused while the text is unchanged
+_parse_cache = register_cache(
+    "sms_parse",
+    LRUCache(maxsize=int(os.getenv("SMS_PARSE_CACHE_SIZE", "100000"))),
+)
+
+
+def _scan(pattern: re.Pattern, text: str, starts: List[int], last: bool = False):
+    """
+    Map each text of a batch to its first (or last) match of pattern.
+
+    A match is skipped, and the search resumes one character later, when it
+    starts inside a word or a VPA.
+    """
+    matches: Dict[int, re.Match] = {}
+    search = pattern.search
+    position = 0
+    while True:
+        match = search(text, position)
+        if match is None:
+            return matches
+        start = match.start()
+        if start and (text[start - 1].isalnum() or text[start - 1] in "_@"):
+            position = start + 1
+            continue
+        index = bisect_right(starts, start) - 1
+        if last or index not in matches:
+            matches[index] = match
+        position = max(match.end(), start + 1)
+
+
+def _lower(text: str) -> str:
+    """Lowercase text without changing the offset of any character."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(char if len(char.lower()) != 1 else char.lower() for char in text)
+
+
+def parse_messages(texts: Sequence[Optional[str]]) -> List[MessageFields]:
+    """
+    Extract merchant, UPI reference, account, balance and bank from many texts.
+
+    The texts are joined into one string, lowercased once, and every compiled
+    pattern scans it in a single pass, so the regex engine runs a handful of
+    times per batch rather than several times per text. Matches are mapped
+    back to their text by offset, and values are read from the original text.
+
+    Args:
+        texts: SMS and description text per transaction (None when empty)
+
+    Returns:
+        MessageFields per text, in order; fields not found are None
+    """
+    starts = []
+    position = 0
+    for text in texts:
+        starts.append(position)
+        position += len(text or "") + 1
+    blob = _SEPARATOR.join(text or "" for text in texts)
+    lowered = _lower(blob)
+
+    merchants: Dict[int, str] = {}
+    for patterns, scanned in (
+        (_MERCHANT_PATTERNS, lowered),
+        (_NAMED_MERCHANT_PATTERNS, blob),
+    ):
+        for pattern in patterns:
+            for index, match in _scan(pattern, scanned, starts).items():
+                if index not in merchants:
+                    merchants[index] = " ".join(blob[slice(*match.span(1))].split())
+    refs = _scan(_UPI_REF_PATTERN, lowered, starts)
+    accounts = _scan(_ACCOUNT_PATTERN, lowered, starts)
+    balances = _scan(_BALANCE_PATTERN, lowered, starts)
+    banks = _scan(_BANK_PATTERN, lowered, starts, last=True)
+
+    results = []
+    for index in range(len(starts)):
+        account = accounts.get(index)
+        balance = balances.get(index)
+        bank = banks.get(index)
+        amount = None
+        if balance is not None:
+            amount = float(balance.group(1).replace(",", ""))
+            if balance.group(2) == "dr":
+                amount = -amount
+        fields = MessageFields(
+            merchants.get(index),
+            refs[index].group(1) if index in refs else None,
+            "*" + (account.group(1) or account.group(2)) if account else None,
+            amount,
+            _BANK_NAMES[bank.group(1).replace(" ", "")] if bank else None,
+        )
+        results.append(_EMPTY if fields == _EMPTY else fields)
+    return results
+
+
+def parse_transaction_messages(
+    ids: Sequence[bytes],
+    sms_contents: Sequence[Optional[str]],
+    descriptions: Sequence[Optional[str]],
+) -> List[MessageFields]:
+    """
+    Parse the SMS and description of many transactions, cached per id.
+
+    Transactions seen before with the same text are served from the cache;
+    the rest are parsed together in one parse_messages batch.
+
+    Args:
+        ids: Raw transaction ids (empty bytes for missing ids)
+        sms_contents: Original SMS text per transaction
+        descriptions: Description per transaction
+
+    Returns:
+        MessageFields per transaction, in order
+    """
+    texts = [
+        f"{sms}\n{description}" if sms and description else sms or description
+        for sms, description in zip(sms_contents, descriptions)
+    ]
+    results: List[Optional[MessageFields]] = [None] * len(texts)
+    missing = []
+    for index, (raw_id, text) in enumerate(zip(ids, texts)):
+        if not text:
+            results[index] = _EMPTY
+            continue
+        cached = _parse_cache.get(raw_id) if raw_id else None
+        if cached is not None and cached[0] == hash(text):
+            results[index] = cached[1]
+        else:
+            missing.append(index)
+
+    if missing:
+        parsed = parse_messages([texts[index] for index in missing])
+        for index, fields in zip(missing, parsed):
+            results[index] = fields
+            if ids[index]:
+                _parse_cache.set(ids[index], (hash(texts[index]), fields))
+    return results
@@ -0,0 +1,346 @@
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from opentelemetry import trace
+from opentelemetry.trace import Span, SpanKind, Status, StatusCode
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Where spans go: "none" (no-op), "console", "otlp" (OTEL_EXPORTER_OTLP_* env)
+# or "logfire" (LOGFIRE_TOKEN env, sent only when a token is set)
+TRACES_EXPORTER = os.getenv("OTEL_TRACES_EXPORTER", "none").lower()
+
+# Service name reported on every span
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "your-finance-bro")
+
+# Latency histogram buckets in seconds, from a cache hit to a long answer
+_LATENCY_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+_tracer = trace.get_tracer("app.services.telemetry_service")
+
+_http_duration = Histogram(
+    "finance_bro_http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response",
+    ["method", "handler", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+_http_first_byte = Histogram(
+    "finance_bro_http_time_to_first_byte_seconds",
+    "Time from receiving a request to sending the first byte of its body",
+    ["method", "handler"],
+    buckets=_LATENCY_BUCKETS,
+)
+_http_bytes = Counter(
+    "finance_bro_http_response_bytes",
+    "Response body bytes sent",
+    ["method", "handler"],
+)
+_stage_duration = Histogram(
+    "finance_bro_stage_duration_seconds",
+    "Time spent in each stage of a chat request",
+    ["stage"],
+    buckets=_LATENCY_BUCKETS,
+)
+_first_token = Histogram(
+    "finance_bro_time_to_first_token_seconds",
+    "Time from starting a model run to its first frame",
+    ["model"],
+    buckets=_LATENCY_BUCKETS,
+)
+_stream_duration = Histogram(
+    "finance_bro_stream_duration_seconds",
+    "Time from the first to the last frame of a model run",
+    ["model"],
+    buckets=_LATENCY_BUCKETS,
+)
+_tokens = Counter(
+    "finance_bro_tokens",
+    "Tokens of finished model runs; prompt tokens include the cached ones",
+    ["model", "kind"],
+)
+
+# Tracer provider installed by configure_telemetry, flushed on shutdown
+_provider = None
+
+
+def configure_telemetry() -> None:
+    """
+    Install the span exporter selected by OTEL_TRACES_EXPORTER.
+
+    With "none" the OpenTelemetry API stays a no-op and spans cost next to
+    nothing; the Prometheus metrics are recorded either way. Any other
+    exporter also instruments pydantic-ai, so model requests and tool calls
+    show up under the chat spans.
+
+    Raises:
+        ValueError: If the exporter is unknown
+    """
+    global _provider
+    if TRACES_EXPORTER == "none":
+        return
+    from pydantic_ai import Agent
+
+    if TRACES_EXPORTER == "logfire":
+        import logfire
+
+        logfire.configure(service_name=SERVICE_NAME, send_to_logfire="if-token-present")
+        logfire.instrument_pydantic_ai()
+        return
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+    if TRACES_EXPORTER == "console":
+        exporter = ConsoleSpanExporter()
+    elif TRACES_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+
+        exporter = OTLPSpanExporter()
+    else:
+        raise ValueError(f"Unknown OTEL_TRACES_EXPORTER: {TRACES_EXPORTER}")
+
+    _provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+    Agent.instrument_all()
+
+
+def shutdown_telemetry() -> None:
+    """Export the spans still buffered by the tracer provider."""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+@contextmanager
+def stage(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Time a stage of a chat request as a span and in the stage histogram.
+
+    Args:
+        name: Stage name, such as "prompt" or "history"
+        **attributes: Span attributes
+
+    Yields:
+        The stage's span, current while the block runs
+    """
+    started = time.perf_counter()
+    with _tracer.start_as_current_span(f"chat.{name}", attributes=attributes) as span:
+        try:
+            yield span
+        finally:
+            _stage_duration.labels(name).observe(time.perf_counter() - started)
+
+
+def record_stage(
+    name: str, start_ns: int, end_ns: Optional[int] = None, **attributes: Any
+) -> None:
+    """
+    Record a stage that has already finished, or that spans generator yields.
+
+    Spans cannot stay current across the yields of a streamed response, so
+    such stages are timed by the caller and recorded here afterwards.
+
+    Args:
+        name: Stage name
+        start_ns: Start of the stage, from time.time_ns()
+        end_ns: End of the stage; now when omitted
+        **attributes: Span attributes
+    """
+    end_ns = end_ns or time.time_ns()
+    span = _tracer.start_span(f"chat.{name}", start_time=start_ns, attributes=attributes)
+    span.end(end_time=end_ns)
+    _stage_duration.labels(name).observe((end_ns - start_ns) / 1e9)
+
+
+def record_first_token(model: str, start_ns: int, end_ns: int) -> None:
+    """Record the time to the first frame of a model run."""
+    record_stage("first_token", start_ns, end_ns, model=model)
+    _first_token.labels(model).observe((end_ns - start_ns) / 1e9)
+
+
+def record_stream(model: str, start_ns: int, frames: int, sent: int) -> None:
+    """
+    Record the streaming of a model run, from its first frame to the last.
+
+    Args:
+        model: Name of the model that answered
+        start_ns: Time of the first frame, from time.time_ns()
+        frames: Frames streamed
+        sent: Bytes of the frames
+    """
+    end_ns = time.time_ns()
+    record_stage("stream", start_ns, end_ns, model=model, frames=frames, bytes=sent)
+    _stream_duration.labels(model).observe((end_ns - start_ns) / 1e9)
+
+
+def record_tokens(
+    model: str, input_tokens: int, output_tokens: int, cached_tokens: int
+) -> None:
+    """Count the tokens of a finished model run and attach them to the current span."""
+    _tokens.labels(model, "prompt").inc(input_tokens)
+    _tokens.labels(model, "completion").inc(output_tokens)
+    _tokens.labels(model, "cached").inc(cached_tokens)
+    trace.get_current_span().add_event(
+        "usage",
+        {
+            "model": model,
+            "prompt_tokens": input_tokens,
+            "completion_tokens": output_tokens,
+            "cached_tokens": cached_tokens,
+        },
+    )
+
+
+def request_start_ns(scope: Dict[str, Any]) -> Optional[int]:
+    """When TelemetryMiddleware received the request of an ASGI scope, if it did."""
+    return scope.get("telemetry.start_ns")
+
+
+class TelemetryMiddleware:
+    """
+    ASGI middleware timing every HTTP request.
+
+    Records duration, time to first byte and body bytes per endpoint, and
+    opens the server span the chat stages nest under unless one is already
+    open (FastAPI's native telemetry or the OpenTelemetry ASGI middleware).
+    It wraps send() instead of the response, so streamed responses are
+    passed through unbuffered.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_ns = time.time_ns()
+        scope["telemetry.start_ns"] = start_ns
+        method = scope["method"]
+        status = 500
+        first_byte: Optional[int] = None
+        sent = 0
+
+        async def send_timed(message) -> None:
+            nonlocal status, first_byte, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                if body and first_byte is None:
+                    first_byte = time.time_ns()
+                sent += len(body)
+            await send(message)
+
+        parent = trace.get_current_span()
+        owned = not parent.get_span_context().is_valid
+        span_context = (
+            _tracer.start_as_current_span(
+                method, kind=SpanKind.SERVER, start_time=start_ns
+            )
+            if owned
+            else nullcontext(parent)
+        )
+        with span_context as span:
+            try:
+                await self.app(scope, receive, send_timed)
+            finally:
+                # Endpoint names are known once the router has run, and unlike
+                # route paths they do not depend on how routers are included
+                handler = getattr(scope.get("route"), "name", None) or "unmatched"
+                if owned:
+                    span.update_name(f"{method} {handler}")
+                    span.set_attributes(
+                        {
+                            "http.request.method": method,
+                            "url.path": scope["path"],
+                            "http.response.status_code": status,
+                        }
+                    )
+                    if status >= 500:
+                        span.set_status(Status(StatusCode.ERROR))
+                span.set_attribute("http.response.body.size", sent)
+                end_ns = time.time_ns()
+                _http_duration.labels(method, handler, str(status)).observe(
+                    (end_ns - start_ns) / 1e9
+                )
+                if first_byte is not None:
+                    _http_first_byte.labels(method, handler).observe(
+                        (first_byte - start_ns) / 1e9
+                    )
+                _http_bytes.labels(method, handler).inc(sent)
+
+
+class _ServiceCollector:
+    """Exports the counters of the caches and the admission controller."""
+
+    def collect(self):
+        from app.services.admission_service import get_admission_controller
+        from app.services.cache_service import get_cache_stats
+
+        families = {
+            "hits": CounterMetricFamily(
+                "finance_bro_cache_hits", "Cache hits", labels=["cache"]
+            ),
+            "misses": CounterMetricFamily(
+                "finance_bro_cache_misses", "Cache misses", labels=["cache"]
+            ),
+            "evictions": CounterMetricFamily(
+                "finance_bro_cache_evictions", "Cache evictions", labels=["cache"]
+            ),
+            "size": GaugeMetricFamily(
+                "finance_bro_cache_entries", "Entries in the cache", labels=["cache"]
+            ),
+        }
+        for name, stats in get_cache_stats().items():
+            for key, family in families.items():
+                family.add_metric([name], stats[key])
+        yield from families.values()
+
+        stats = get_admission_controller().stats()
+        yield GaugeMetricFamily(
+            "finance_bro_admission_active", "Model runs in flight", value=stats["active"]
+        )
+        yield GaugeMetricFamily(
+            "finance_bro_admission_queued",
+            "Model runs waiting for a slot",
+            value=stats["queued"],
+        )
+        outcomes = CounterMetricFamily(
+            "finance_bro_admission_requests",
+            "Admission outcomes; waited counts the admitted runs that were queued first",
+            labels=["outcome"],
+        )
+        for outcome in (
+            "admitted",
+            "waited",
+            "rejected_user_concurrency",
+            "rejected_user_tokens",
+            "shed_tokens",
+            "shed_queue_full",
+            "shed_deadline",
+        ):
+            outcomes.add_metric([outcome], stats[outcome])
+        yield outcomes
+
+
+REGISTRY.register(_ServiceCollector())
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Return the Prometheus text exposition of every metric and its content type."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
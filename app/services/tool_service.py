@@ -0,0 +1,262 @@
+from datetime import date, datetime, time
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic_ai import Agent, RunContext
+
+from app.model.analytics_model import (
+    AccountBalanceHistory,
+    BudgetStatus,
+    CashFlowPeriod,
+    RecurringPayment,
+)
+
+
+TransactionType = Literal["credit", "debit", "transfer"]
+GroupBy = Literal["month", "week", "day", "type", "category", "account", "merchant"]
+Metric = Literal["sum", "count", "avg"]
+Period = Literal["month", "week"]
+
+
+def _start_of(day: Optional[date]) -> Optional[datetime]:
+    return datetime.combine(day, time.min) if day else None
+
+
+def _end_of(day: Optional[date]) -> Optional[datetime]:
+    return datetime.combine(day, time.max) if day else None
+
+
+def register_finance_tools(agent: Agent) -> None:
+    """
+    Register the finance query tools on the agent.
+
+    The tools compute exact answers over the columnar TransactionStore in
+    FinanceDeps, or read the pre-computed FinanceAnalytics next to it, so the
+    model does not have to add up rows from the prompt.
+
+    Args:
+        agent: The finance agent (with FinanceDeps as its deps type)
+    """
+
+    @agent.tool
+    def filter_transactions(
+        ctx: RunContext,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        type: Optional[TransactionType] = None,
+        account_id: Optional[str] = None,
+        category: Optional[str] = None,
+        merchant: Optional[str] = None,
+        search: Optional[str] = None,
+        upi_ref: Optional[str] = None,
+        limit: int = 20,
+    ) -> Dict[str, Any]:
+        """
+        Find transactions matching the given filters.
+
+        Args:
+            start_date: First day to include (inclusive)
+            end_date: Last day to include (inclusive)
+            type: credit, debit or transfer
+            account_id: Only transactions of this account id
+            category: Only transactions of this category (e.g. other, transfer)
+            merchant: Part of the merchant or payee name (case-insensitive)
+            search: Text to look for in title, description or SMS (case-insensitive)
+            upi_ref: UPI reference number of the transaction
+            limit: Maximum number of transactions to return, newest first
+
+        Returns:
+            Match count, total amount and the newest matching transactions
+        """
+        store = ctx.deps.store
+        rows = store.filter(
+            _start_of(start_date),
+            _end_of(end_date),
+            type,
+            account_id,
+            category,
+            merchant,
+            search,
+            upi_ref,
+        )
+        return {
+            "count": len(rows),
+            "total_amount": store.total(rows),
+            "transactions": [store.row(i) for i in store.most_recent(rows, limit)],
+        }
+
+    @agent.tool
+    def aggregate_transactions(
+        ctx: RunContext,
+        group_by: GroupBy,
+        metric: Metric = "sum",
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        type: Optional[TransactionType] = None,
+        account_id: Optional[str] = None,
+        category: Optional[str] = None,
+        merchant: Optional[str] = None,
+    ) -> Dict[str, float]:
+        """
+        Group matching transactions and aggregate their amounts.
+
+        Months are labelled YYYY-MM, days YYYY-MM-DD and weeks by the date of
+        their Monday.
+
+        Args:
+            group_by: month, week, day, type, category, account or merchant
+            metric: sum, count or avg of the transaction amounts
+            start_date: First day to include (inclusive)
+            end_date: Last day to include (inclusive)
+            type: credit, debit or transfer
+            account_id: Only transactions of this account id
+            category: Only transactions of this category
+            merchant: Part of the merchant or payee name (case-insensitive)
+
+        Returns:
+            Mapping of group label to aggregated value
+        """
+        store = ctx.deps.store
+        rows = store.filter(
+            _start_of(start_date),
+            _end_of(end_date),
+            type,
+            account_id,
+            category,
+            merchant,
+        )
+        return store.group_by(rows, group_by, metric)
+
+    @agent.tool
+    def top_merchants(
+        ctx: RunContext,
+        n: int = 5,
+        type: TransactionType = "debit",
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the merchants/payees with the highest total amount.
+
+        Args:
+            n: Number of merchants to return
+            type: Transaction type to rank, debit (spending) by default
+            start_date: First day to include (inclusive)
+            end_date: Last day to include (inclusive)
+
+        Returns:
+            Merchants with their total amount and transaction count
+        """
+        store = ctx.deps.store
+        rows = store.filter(_start_of(start_date), _end_of(end_date), type)
+        totals = store.group_by(rows, "merchant", "sum")
+        counts = store.group_by(rows, "merchant", "count")
+        ranked = sorted(totals, key=lambda name: (-totals[name], name))[:n]
+        return [
+            {"merchant": name, "total": totals[name], "count": counts[name]}
+            for name in ranked
+        ]
+
+    @agent.tool
+    def balance_at_date(
+        ctx: RunContext, on_date: date, account_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Estimate account balances at the end of a given day.
+
+        Works back from each account's current balance by undoing the
+        transactions recorded for that account after the date. Credits are
+        treated as incoming and debits and transfers as outgoing. Transactions
+        without an account id cannot be attributed and are ignored.
+
+        Args:
+            on_date: Day to compute the balance for
+            account_id: Only this account; all accounts when omitted
+
+        Returns:
+            Estimated balance per account
+        """
+        store = ctx.deps.store
+        cutoff = _end_of(on_date)
+        results = []
+        for account in ctx.deps.finance_info.accounts or []:
+            acc_id = str(account.id) if account.id else None
+            if account_id is not None and acc_id != account_id:
+                continue
+            if account.balance is None or acc_id is None:
+                continue
+            later_count, net_flow = store.net_flow_after(cutoff, acc_id)
+            balance = account.balance - net_flow
+            results.append(
+                {
+                    "account_id": acc_id,
+                    "account_name": account.account_name,
+                    "bank_name": account.bank_name,
+                    "balance": round(balance, 2),
+                    "transactions_after_date": later_count,
+                }
+            )
+        return results
+
+    @agent.tool
+    def budget_adherence(
+        ctx: RunContext, year: Optional[int] = None, month: Optional[int] = None
+    ) -> List[BudgetStatus]:
+        """
+        Compare monthly budgets with actual debit spending.
+
+        Args:
+            year: Only budgets of this year
+            month: Only budgets of this month (1-12)
+
+        Returns:
+            Budget, amount spent, remaining amount and percentage used per month
+        """
+        return ctx.deps.analytics.budget_status(year, month)
+
+    @agent.tool
+    def cash_flow(
+        ctx: RunContext, period: Period = "month", last: Optional[int] = None
+    ) -> List[CashFlowPeriod]:
+        """
+        Return income, spending and transfers per month or week.
+
+        Months are labelled YYYY-MM and weeks by the date of their Monday.
+
+        Args:
+            period: month or week
+            last: Only this many most recent periods; all when omitted
+
+        Returns:
+            Credit, debit and transfer totals, credit minus debit and the
+            number of transactions per period, oldest first
+        """
+        return ctx.deps.analytics.cash_flow(period, last)
+
+    @agent.tool
+    def monthly_balances(
+        ctx: RunContext, account_id: Optional[str] = None
+    ) -> List[AccountBalanceHistory]:
+        """
+        Return each account's balance at the end of every month with activity.
+
+        Works back from the current balance; transactions without an account
+        id are ignored.
+
+        Args:
+            account_id: Only this account; all accounts when omitted
+
+        Returns:
+            Net flow and closing balance per month, per account
+        """
+        return ctx.deps.analytics.running_balances(account_id)
+
+    @agent.tool
+    def recurring_payments(ctx: RunContext) -> List[RecurringPayment]:
+        """
+        Return payments that repeat at a regular interval, such as subscriptions.
+
+        Returns:
+            Merchant, frequency, average amount, estimated monthly cost and
+            next expected date of every recurring payment
+        """
+        return ctx.deps.analytics.recurring()
@@ -0,0 +1,734 @@
+import hashlib
+import os
+import sys
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.model.finance_model import FinanceInfo, Transaction
+from app.services.cache_service import LRUCache, register_cache
+from app.services.sms_service import MessageFields, parse_transaction_messages
+from app.services.telemetry_service import stage
+from app.services.utility_service import compute_finance_hash
+
+
+# Titles the exporting app uses for every payment; they say nothing about the payee
+_GENERIC_TITLES = frozenset({"payment", "money received", "transaction", ""})
+
+_EMPTY_ID = bytes(16)
+
+# Labels used for rows whose grouping value is missing
+_MISSING_LABELS = {
+    "type": "unknown",
+    "category": "uncategorized",
+    "account": "unassigned",
+    "merchant": "Unknown",
+}
+
+
+def _merchant_name(title: Optional[str], fields: MessageFields) -> str:
+    """Merchant/payee of a transaction: its title, else the one named in its SMS."""
+    if title and title.strip().lower() not in _GENERIC_TITLES:
+        return " ".join(title.split())
+    return fields.merchant or "Unknown"
+
+
+def _naive(date: Optional[datetime]) -> Optional[datetime]:
+    """Drop timezone info so exported dates compare with tool date arguments."""
+    return date.replace(tzinfo=None) if date and date.tzinfo else date
+
+
+def _content_key(
+    date: Optional[datetime],
+    type: Optional[str],
+    title: Optional[str],
+    amount: float,
+    category: Optional[str],
+    account_id: Optional[str],
+    location: Optional[str],
+    description: Optional[str],
+    sms_content: Optional[str],
+) -> bytes:
+    """Digest of the stored fields of a row, identifying rows that have no id."""
+    fields = (
+        date.isoformat() if date else None,
+        type,
+        title,
+        float(amount),
+        category,
+        account_id,
+        location,
+        description,
+        sms_content,
+    )
+    return hashlib.blake2b(repr(fields).encode("utf-8"), digest_size=16).digest()
+
+
+def transaction_content_key(trans: Transaction) -> bytes:
+    """
+    Content key of a transaction, matching TransactionStore.content_keys().
+
+    Used to recognise transactions without an id that are sent again.
+    """
+    return _content_key(
+        _naive(trans.date),
+        trans.type.value if trans.type else None,
+        trans.title,
+        trans.amount or 0.0,
+        trans.category.value if trans.category else None,
+        str(trans.account_id) if trans.account_id else None,
+        trans.location,
+        trans.description,
+        trans.sms_content,
+    )
+
+
+class Vocabulary:
+    """
+    Interns repeated string values and maps them to small integer codes.
+
+    Code 0 is reserved for missing (None) values.
+    """
+
+    def __init__(self):
+        self.labels: List[Optional[str]] = [None]
+        self._codes: Dict[Optional[str], int] = {None: 0}
+
+    def code(self, value: Optional[str]) -> int:
+        """Return the code of value, adding it to the vocabulary if needed."""
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.labels)
+            value = sys.intern(value)
+            self._codes[value] = code
+            self.labels.append(value)
+        return code
+
+    def codes(self, values: Sequence[Optional[str]], dtype: Any) -> np.ndarray:
+        """Return the codes of many values at once, adding new ones as needed."""
+        # dict.fromkeys keeps first-seen order, so codes match row-by-row code()
+        mapping = {value: self.code(value) for value in dict.fromkeys(values)}
+        return np.fromiter(map(mapping.__getitem__, values), dtype=dtype, count=len(values))
+
+    def lookup(self, value: Optional[str]) -> int:
+        """Return the code of value, or -1 when it is not in the vocabulary."""
+        return self._codes.get(value, -1)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+
+class TransactionStoreBuilder:
+    """
+    Accumulates transaction rows and turns them into a TransactionStore.
+
+    Rows are appended to plain Python lists and converted to NumPy arrays once
+    in build(), which is much cheaper than growing arrays row by row.
+    """
+
+    def __init__(self, base: Optional["TransactionStore"] = None):
+        """
+        Args:
+            base: Existing store whose vocabularies are extended, so that the
+                built rows can be concatenated to it
+        """
+        self.types = base.types if base else Vocabulary()
+        self.categories = base.categories if base else Vocabulary()
+        self.accounts = base.accounts if base else Vocabulary()
+        self.titles = base.titles if base else Vocabulary()
+        self._ids: List[bytes] = []
+        self._dates: List[Optional[datetime]] = []
+        self._amounts: List[float] = []
+        self._type_codes: List[int] = []
+        self._category_codes: List[int] = []
+        self._account_codes: List[int] = []
+        self._title_codes: List[int] = []
+        self._locations: List[Optional[str]] = []
+        self._descriptions: List[Optional[str]] = []
+        self._sms_contents: List[Optional[str]] = []
+
+    def add(
+        self,
+        id: Optional[uuid.UUID],
+        date: Optional[datetime],
+        type: Optional[str],
+        title: Optional[str],
+        amount: Optional[float],
+        category: Optional[str],
+        account_id: Optional[uuid.UUID],
+        location: Optional[str],
+        description: Optional[str],
+        sms_content: Optional[str],
+    ) -> None:
+        """Append one already validated transaction row."""
+        self._ids.append(id.bytes if id else _EMPTY_ID)
+        self._dates.append(_naive(date))
+        self._amounts.append(amount or 0.0)
+        self._type_codes.append(self.types.code(type))
+        self._category_codes.append(self.categories.code(category))
+        self._account_codes.append(
+            self.accounts.code(str(account_id) if account_id else None)
+        )
+        self._title_codes.append(self.titles.code(title))
+        self._locations.append(location)
+        self._descriptions.append(description)
+        self._sms_contents.append(sms_content)
+
+    def add_transaction(self, trans: Transaction) -> None:
+        """Append one Transaction model."""
+        self.add(
+            trans.id,
+            trans.date,
+            trans.type.value if trans.type else None,
+            trans.title,
+            trans.amount,
+            trans.category.value if trans.category else None,
+            trans.account_id,
+            trans.location,
+            trans.description,
+            trans.sms_content,
+        )
+
+    def __len__(self) -> int:
+        return len(self._amounts)
+
+    def build(self) -> "TransactionStore":
+        """Convert the accumulated rows into a columnar TransactionStore."""
+        store = TransactionStore()
+        store.ids = np.array(self._ids, dtype="S16")
+        store.dates = np.array(self._dates, dtype="datetime64[us]")
+        store.amounts = np.array(self._amounts, dtype=np.float64)
+        store.type_codes = np.array(self._type_codes, dtype=np.int8)
+        store.category_codes = np.array(self._category_codes, dtype=np.int16)
+        store.account_codes = np.array(self._account_codes, dtype=np.int32)
+        store.title_codes = np.array(self._title_codes, dtype=np.int32)
+        store.types = self.types
+        store.categories = self.categories
+        store.accounts = self.accounts
+        store.titles = self.titles
+        store.locations = self._locations
+        store.descriptions = self._descriptions
+        store.sms_contents = self._sms_contents
+        return store
+
+
+class TransactionStore:
+    """
+    Columnar, NumPy-backed representation of a user's transactions.
+
+    Amounts and dates are float64 and datetime64 arrays, type, category,
+    account, merchant and title are small integer codes into interned
+    vocabularies, and free text stays in plain lists. Built once per
+    FinanceInfo, in a single pass (merchant codes are derived lazily), and
+    shared by the prompt summariser and the agent tools through the
+    vectorised helpers below.
+    """
+
+    ids: np.ndarray
+    dates: np.ndarray
+    amounts: np.ndarray
+    type_codes: np.ndarray
+    category_codes: np.ndarray
+    account_codes: np.ndarray
+    title_codes: np.ndarray
+    types: Vocabulary
+    categories: Vocabulary
+    accounts: Vocabulary
+    titles: Vocabulary
+    locations: List[Optional[str]]
+    descriptions: List[Optional[str]]
+    sms_contents: List[Optional[str]]
+
+    _merchants: Optional[Vocabulary] = None
+    _merchant_codes: Optional[np.ndarray] = None
+    _messages: Optional[List[MessageFields]] = None
+
+    @property
+    def merchants(self) -> Vocabulary:
+        """Vocabulary of merchant/payee names, derived on first use."""
+        self._derive_messages()
+        return self._merchants
+
+    @property
+    def merchant_codes(self) -> np.ndarray:
+        """Merchant code of every row, derived on first use."""
+        self._derive_messages()
+        return self._merchant_codes
+
+    @property
+    def messages(self) -> List[MessageFields]:
+        """Fields parsed from the SMS and description of every row, on first use."""
+        self._derive_messages()
+        return self._messages
+
+    def _parse_messages(self) -> Tuple[List[str], List[MessageFields]]:
+        """Parse the texts of every row and name its merchant."""
+        fields = parse_transaction_messages(
+            self.ids.tolist(), self.sms_contents, self.descriptions
+        )
+        titles = [self.titles.labels[code] for code in self.title_codes.tolist()]
+        return list(map(_merchant_name, titles, fields)), fields
+
+    def _derive_messages(self) -> None:
+        # Parsing means scanning the SMS text of every row, which is the most
+        # expensive part of a build; only pay for it when a merchant filter
+        # or grouping or the parsed fields are actually requested
+        if self._merchant_codes is not None:
+            return
+        names, fields = self._parse_messages()
+        merchants = Vocabulary()
+        codes = merchants.codes(names, np.int32)
+        self._merchants, self._merchant_codes, self._messages = merchants, codes, fields
+
+    @classmethod
+    def from_finance_info(cls, finance_info: FinanceInfo) -> "TransactionStore":
+        """
+        Build a store from the transactions of a FinanceInfo object in one pass.
+
+        Args:
+            finance_info: FinanceInfo object containing user's financial data
+
+        Returns:
+            TransactionStore instance
+        """
+        builder = TransactionStoreBuilder()
+        for trans in finance_info.transactions or []:
+            builder.add_transaction(trans)
+        return builder.build()
+
+    @classmethod
+    def from_columns(
+        cls,
+        ids: np.ndarray,
+        dates: np.ndarray,
+        amounts: np.ndarray,
+        types: List[Optional[str]],
+        titles: List[Optional[str]],
+        categories: List[Optional[str]],
+        account_ids: List[Optional[str]],
+        locations: List[Optional[str]],
+        descriptions: List[Optional[str]],
+        sms_contents: List[Optional[str]],
+        base: Optional["TransactionStore"] = None,
+    ) -> "TransactionStore":
+        """
+        Build a store from already validated columns.
+
+        Args:
+            ids: S16 array of raw UUID bytes (all zero for missing ids)
+            dates: datetime64[us] array of naive timestamps
+            amounts: float64 array of amounts
+            types: Transaction type values
+            titles: Transaction titles
+            categories: Category values
+            account_ids: Account ids in canonical string form
+            locations: Locations
+            descriptions: Descriptions
+            sms_contents: Original SMS texts
+            base: Existing store whose vocabularies are extended, so that the
+                new store can be concatenated to it
+
+        Returns:
+            TransactionStore instance
+        """
+        store = cls()
+        store.ids = ids
+        store.dates = dates
+        store.amounts = amounts
+        store.types = base.types if base else Vocabulary()
+        store.categories = base.categories if base else Vocabulary()
+        store.accounts = base.accounts if base else Vocabulary()
+        store.titles = base.titles if base else Vocabulary()
+        store.type_codes = store.types.codes(types, np.int8)
+        store.category_codes = store.categories.codes(categories, np.int16)
+        store.account_codes = store.accounts.codes(account_ids, np.int32)
+        store.title_codes = store.titles.codes(titles, np.int32)
+        store.locations = locations
+        store.descriptions = descriptions
+        store.sms_contents = sms_contents
+        return store
+
+    @classmethod
+    def empty(cls) -> "TransactionStore":
+        """Return a store without any transactions."""
+        return TransactionStoreBuilder().build()
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    def concat(self, *others: "TransactionStore") -> "TransactionStore":
+        """
+        Return a new store with the rows of others appended after these rows.
+
+        Every other store must have been built on top of this one (with
+        TransactionStoreBuilder(base=...) or from_columns(base=...)) so that
+        they all share the same vocabularies.
+
+        Args:
+            others: Stores holding the new rows, in order
+
+        Returns:
+            Combined TransactionStore
+        """
+        parts = (self, *others)
+        store = TransactionStore()
+        for column in (
+            "ids",
+            "dates",
+            "amounts",
+            "type_codes",
+            "category_codes",
+            "account_codes",
+            "title_codes",
+        ):
+            setattr(
+                store, column, np.concatenate([getattr(part, column) for part in parts])
+            )
+        for column in ("locations", "descriptions", "sms_contents"):
+            setattr(
+                store, column, [value for part in parts for value in getattr(part, column)]
+            )
+        last = parts[-1]
+        store.types = last.types
+        store.categories = last.categories
+        store.accounts = last.accounts
+        store.titles = last.titles
+        if self._merchant_codes is not None:
+            # Keep the fields already parsed and only parse the new rows
+            parsed = [part._parse_messages() for part in others]
+            store._merchants = self._merchants
+            store._merchant_codes = np.concatenate(
+                [
+                    self._merchant_codes,
+                    *(self._merchants.codes(names, np.int32) for names, _ in parsed),
+                ]
+            )
+            store._messages = self._messages + [
+                item for _, fields in parsed for item in fields
+            ]
+        return store
+
+    def extend(self, transactions: Iterable[Transaction]) -> "TransactionStore":
+        """
+        Return a new store with the given transactions appended.
+
+        Args:
+            transactions: Transactions to append
+
+        Returns:
+            Combined TransactionStore
+        """
+        builder = TransactionStoreBuilder(base=self)
+        for trans in transactions:
+            builder.add_transaction(trans)
+        return self.concat(builder.build())
+
+    def id_set(self) -> Set[bytes]:
+        """Return the set of transaction ids (as 16 raw bytes) in the store."""
+        # NumPy strips trailing NUL bytes from S16 values, so pad them back
+        return {
+            raw_id.ljust(16, b"\0") for raw_id in self.ids.tolist() if raw_id
+        }
+
+    def content_keys(self) -> Set[bytes]:
+        """Return the content keys of the rows that have no transaction id."""
+        return {
+            _content_key(
+                self.date_of(row),
+                self.types.labels[self.type_codes[row]],
+                self.titles.labels[self.title_codes[row]],
+                self.amounts[row],
+                self.categories.labels[self.category_codes[row]],
+                self.accounts.labels[self.account_codes[row]],
+                self.locations[row],
+                self.descriptions[row],
+                self.sms_contents[row],
+            )
+            for row in np.flatnonzero(self.ids == b"").tolist()
+        }
+
+    def mask(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        type: Optional[str] = None,
+        account_id: Optional[str] = None,
+        category: Optional[str] = None,
+        merchant: Optional[str] = None,
+    ) -> np.ndarray:
+        """Boolean mask of the rows matching every given column condition."""
+        mask = np.ones(len(self), dtype=bool)
+        if start_date is not None:
+            mask &= self.dates >= np.datetime64(_naive(start_date), "us")
+        if end_date is not None:
+            mask &= self.dates <= np.datetime64(_naive(end_date), "us")
+        if type is not None:
+            mask &= self.type_codes == self.types.lookup(type)
+        if account_id is not None:
+            mask &= self.account_codes == self.accounts.lookup(account_id)
+        if category is not None:
+            mask &= self.category_codes == self.categories.lookup(category)
+        if merchant is not None:
+            needle = merchant.lower()
+            codes = [
+                code
+                for code, label in enumerate(self.merchants.labels)
+                if label and needle in label.lower()
+            ]
+            mask &= np.isin(self.merchant_codes, codes)
+        return mask
+
+    def filter(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        type: Optional[str] = None,
+        account_id: Optional[str] = None,
+        category: Optional[str] = None,
+        merchant: Optional[str] = None,
+        search: Optional[str] = None,
+        upi_ref: Optional[str] = None,
+    ) -> np.ndarray:
+        """
+        Return the row numbers matching every given condition.
+
+        Args:
+            start_date: Inclusive lower bound on the transaction date
+            end_date: Inclusive upper bound on the transaction date
+            type: Transaction type (credit, debit or transfer)
+            account_id: Account the transaction belongs to
+            category: Transaction category
+            merchant: Case-insensitive substring of the merchant/payee name
+            search: Case-insensitive substring of title, description or SMS
+            upi_ref: UPI reference number parsed from the SMS or description
+
+        Returns:
+            Matching row numbers in their original order
+        """
+        rows = np.flatnonzero(
+            self.mask(start_date, end_date, type, account_id, category, merchant)
+        )
+        if search is not None:
+            needle = search.lower()
+            title_hits = {
+                code
+                for code, label in enumerate(self.titles.labels)
+                if label and needle in label.lower()
+            }
+            rows = np.array(
+                [
+                    row
+                    for row in rows.tolist()
+                    if self.title_codes[row] in title_hits
+                    or needle in (self.descriptions[row] or "").lower()
+                    or needle in (self.sms_contents[row] or "").lower()
+                ],
+                dtype=np.int64,
+            )
+        if upi_ref is not None:
+            messages = self.messages
+            rows = np.array(
+                [row for row in rows.tolist() if messages[row].upi_ref == upi_ref],
+                dtype=np.int64,
+            )
+        return rows
+
+    def group_codes(
+        self, group_by: str, rows: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, List[str]]:
+        """
+        Return a group code per row together with the label of every code.
+
+        Args:
+            group_by: month, week, day, type, category, account or merchant
+            rows: Row numbers to group; all rows when omitted
+
+        Returns:
+            Tuple of (codes aligned with rows, labels indexed by code)
+        """
+        if rows is None:
+            rows = np.arange(len(self))
+
+        vocabularies = {
+            "type": (self.type_codes, self.types),
+            "category": (self.category_codes, self.categories),
+            "account": (self.account_codes, self.accounts),
+            "merchant": (self.merchant_codes, self.merchants),
+        }
+        if group_by in vocabularies:
+            codes, vocabulary = vocabularies[group_by]
+            missing = _MISSING_LABELS[group_by]
+            labels = [label or missing for label in vocabulary.labels]
+            return codes[rows].astype(np.int64), labels
+
+        if group_by == "month":
+            periods = self.dates[rows].astype("datetime64[M]")
+        elif group_by == "day":
+            periods = self.dates[rows].astype("datetime64[D]")
+        elif group_by == "week":
+            days = self.dates[rows].astype("datetime64[D]")
+            # 1970-01-01 was a Thursday; shift every day back to its Monday
+            weekday = (days.view(np.int64) + 3) % 7
+            periods = days - weekday.astype("timedelta64[D]")
+        else:
+            raise ValueError(f"Unsupported grouping: {group_by}")
+
+        unique, codes = np.unique(periods, return_inverse=True)
+        labels = ["undated" if np.isnat(value) else str(value) for value in unique]
+        return codes.astype(np.int64).reshape(-1), labels
+
+    def totals(
+        self, keys: Sequence[str], rows: Optional[np.ndarray] = None
+    ) -> Dict[Tuple[str, ...], Tuple[int, float]]:
+        """
+        Count and sum the amounts per combination of group keys.
+
+        Args:
+            keys: Groupings to combine, e.g. ["month", "type"]
+            rows: Row numbers to aggregate; all rows when omitted
+
+        Returns:
+            Mapping of label tuple to (count, total amount), sorted by labels
+        """
+        if rows is None:
+            rows = np.arange(len(self))
+        if not len(rows):
+            return {}
+
+        combined = np.zeros(len(rows), dtype=np.int64)
+        all_labels = []
+        for key in keys:
+            codes, labels = self.group_codes(key, rows)
+            combined = combined * len(labels) + codes
+            all_labels.append(labels)
+
+        unique, inverse = np.unique(combined, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        counts = np.bincount(inverse, minlength=len(unique))
+        sums = np.bincount(inverse, weights=self.amounts[rows], minlength=len(unique))
+
+        result = {}
+        for position, value in enumerate(unique.tolist()):
+            label_tuple = []
+            for labels in reversed(all_labels):
+                value, code = divmod(value, len(labels))
+                label_tuple.append(labels[code])
+            result[tuple(reversed(label_tuple))] = (
+                int(counts[position]),
+                float(sums[position]),
+            )
+        return dict(sorted(result.items()))
+
+    def group_by(
+        self, rows: np.ndarray, group_by: str, metric: str = "sum"
+    ) -> Dict[str, float]:
+        """
+        Aggregate the amounts of rows per group.
+
+        Args:
+            rows: Row numbers to aggregate
+            group_by: month, week, day, type, category, account or merchant
+            metric: sum, count or avg
+
+        Returns:
+            Mapping of group label to aggregated value, sorted by label
+        """
+        if metric not in ("sum", "count", "avg"):
+            raise ValueError(f"Unsupported metric: {metric}")
+
+        result = {}
+        for (label,), (count, total) in self.totals([group_by], rows).items():
+            if metric == "sum":
+                result[label] = round(total, 2)
+            elif metric == "count":
+                result[label] = count
+            else:
+                result[label] = round(total / count, 2)
+        return result
+
+    def total(self, rows: np.ndarray) -> float:
+        """Sum of the amounts of rows."""
+        return round(float(self.amounts[rows].sum()), 2)
+
+    def date_of(self, row: int) -> Optional[datetime]:
+        """Return the date of a row as a datetime (None when missing)."""
+        value = self.dates[row]
+        return None if np.isnat(value) else value.astype(datetime)
+
+    def row(self, row: int) -> Dict[str, Any]:
+        """Return a compact dictionary describing one transaction."""
+        date = self.date_of(row)
+        raw_id = self.ids[row]
+        fields = self.messages[row]
+        return {
+            "id": str(uuid.UUID(bytes=raw_id.ljust(16, b"\0"))) if raw_id else None,
+            "date": date.isoformat() if date else None,
+            "type": self.types.labels[self.type_codes[row]],
+            "amount": float(self.amounts[row]),
+            "merchant": self.merchants.labels[self.merchant_codes[row]],
+            "title": self.titles.labels[self.title_codes[row]],
+            "category": self.categories.labels[self.category_codes[row]],
+            "account_id": self.accounts.labels[self.account_codes[row]],
+            "masked_account": fields.account,
+            "bank": fields.bank,
+            "upi_ref": fields.upi_ref,
+            "balance_after": fields.balance,
+            "description": self.descriptions[row],
+        }
+
+    def net_flow_after(self, cutoff: datetime, account_id: str) -> Tuple[int, float]:
+        """
+        Net amount that moved through an account after a point in time.
+
+        Credits count as incoming; debits and transfers as outgoing.
+
+        Args:
+            cutoff: Only transactions strictly after this moment are counted
+            account_id: Account to inspect
+
+        Returns:
+            Tuple of (number of transactions, incoming minus outgoing amount)
+        """
+        later = self.mask(account_id=account_id) & (
+            self.dates > np.datetime64(_naive(cutoff), "us")
+        )
+        credit = later & (self.type_codes == self.types.lookup("credit"))
+        net = self.amounts[credit].sum() - self.amounts[later & ~credit].sum()
+        return int(later.sum()), float(net)
+
+    def most_recent(self, rows: np.ndarray, limit: int) -> np.ndarray:
+        """Return up to limit rows ordered from newest to oldest."""
+        rows = np.asarray(rows, dtype=np.int64)
+        # NaT is the smallest int64, so undated rows come last
+        order = np.lexsort((rows, self.dates[rows].view(np.int64)))
+        return rows[order[::-1][:limit]]
+
+
+_store_cache = register_cache(
+    "transaction_store",
+    LRUCache(maxsize=int(os.getenv("TRANSACTION_STORE_CACHE_SIZE", "16"))),
+)
+
+
+def get_transaction_store(
+    finance_info: FinanceInfo, finance_hash: Optional[str] = None
+) -> TransactionStore:
+    """
+    Return the columnar store for finance_info, building it once per content hash.
+
+    Args:
+        finance_info: FinanceInfo object containing user's financial data
+        finance_hash: Precomputed content hash of finance_info, if known
+
+    Returns:
+        TransactionStore instance
+    """
+    key = finance_hash or compute_finance_hash(finance_info)
+    store = _store_cache.get(key)
+    if store is None:
+        with stage("flatten", transactions=len(finance_info.transactions or [])):
+            store = TransactionStore.from_finance_info(finance_info)
+        _store_cache.set(key, store)
+    return store
@@ -1,19 +1,117 @@
-from pydantic_ai import Agent, RunContext
-from pydantic_ai.messages import ModelRequest, ModelResponse, UserPromptPart, TextPart
-from typing import List, AsyncIterator, Tuple
+from pydantic_ai.messages import (
+    ModelRequest,
+    ModelResponse,
+    TextPart,
+    UserPromptPart,
+)
+from pydantic import TypeAdapter
+from typing import List, Optional
+import hashlib
+import math
 import re
 
-from app.configs.model_config import LLMModelName
 from app.model.agent_model import ChatMessage
-from app.services.finance_service import flatten_finance_info
-from app.services.llm_service import get_llm_model_config
-from app.model.finance_model import FinanceInfo
+from app.model.finance_model import FinanceInfo, Transaction
+
+_TRANSACTIONS = TypeAdapter(List[Transaction])
+
+
+_WORD_RE = re.compile(r"[a-z0-9@.]+")
+
+# Common words ignored when matching a query against transaction text
+_STOPWORDS = frozenset(
+    "a an and are at be by can did do does for from have how i in is it me my "
+    "of on or show the this to was what when where which who why with you your "
+    "much many give tell list all".split()
+)
+
+
+def compute_finance_hash(
+    finance_info: FinanceInfo, transactions_digest: Optional[str] = None
+) -> str:
+    """
+    Compute a stable content hash of a FinanceInfo object.
+
+    The object is serialised in its canonical (aliased) JSON form so that two
+    byte-different uploads carrying the same data share the same hash. The
+    transactions are hashed on their own, as the canonical JSON array of the
+    rows, and that digest is combined with the rest of the object. Uploads
+    whose rows went straight into a TransactionStore therefore get the same
+    hash as the same data sent inline, from a digest computed while ingesting
+    (see ingest_service.TransactionsDigest).
+
+    Args:
+        finance_info: FinanceInfo object containing user's financial data
+        transactions_digest: Hex SHA-256 of the canonical JSON array of the
+            transactions; computed from finance_info.transactions when omitted
+
+    Returns:
+        Hex encoded SHA-256 digest
+    """
+    if transactions_digest is None:
+        transactions = _TRANSACTIONS.dump_json(finance_info.transactions or [], by_alias=True)
+        transactions_digest = hashlib.sha256(transactions).hexdigest()
+    rest = finance_info.model_dump_json(by_alias=True, exclude={"transactions"})
+    return hashlib.sha256((rest + transactions_digest).encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheaply estimate the number of LLM tokens in a text.
+
+    Uses the common ~4 characters per token heuristic, which is close enough
+    for budgeting prompt sections without loading a tokenizer.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated token count
+    """
+    return math.ceil(len(text) / 4)
+
+
+def extract_query_terms(query: str) -> List[str]:
+    """
+    Extract the meaningful lowercase search terms from a user query.
+
+    Args:
+        query: The user's question
+
+    Returns:
+        Sorted list of unique terms, suitable for matching and cache keys
+    """
+    terms = {
+        word.strip(".")
+        for word in _WORD_RE.findall(query.lower())
+        if word not in _STOPWORDS
+    }
+    return sorted(term for term in terms if len(term) > 2)
+
+
+# Client role names mapped onto the user and assistant roles. System and
+# developer messages are deliberately absent: clients must not be able to add
+# instructions with system authority, so they are kept as labelled user text
+_ROLE_ALIASES = {
+    "user": "user",
+    "human": "user",
+    "assistant": "assistant",
+    "ai": "assistant",
+    "bot": "assistant",
+    "model": "assistant",
+}
 
 
 def convert_chat_history_to_messages(chat_history: List[ChatMessage]) -> list:
     """
     Convert chat history to PydanticAI message format.
 
+    User messages become user prompts and assistant messages model responses.
+    Messages with any other role, including "system" and "developer", are
+    kept as user prompts labelled with their role instead of being dropped,
+    so a client cannot inject system instructions. Consecutive request parts
+    are merged into one ModelRequest so requests and responses alternate.
+
     Args:
         chat_history: List of ChatMessage objects
 
@@ -22,8 +120,16 @@ def convert_chat_history_to_messages(chat_history: List[ChatMessage]) -> list:
     """
     messages = []
     for msg in chat_history:
-        if msg.role == "user":
-            messages.append(ModelRequest(parts=[UserPromptPart(content=msg.content)]))
-        elif msg.role == "assistant":
+        role = _ROLE_ALIASES.get(msg.role.lower())
+        if role == "assistant":
             messages.append(ModelResponse(parts=[TextPart(content=msg.content)]))
+            continue
+        if role == "user":
+            part = UserPromptPart(content=msg.content)
+        else:
+            part = UserPromptPart(content=f"[{msg.role}] {msg.content}")
+        if messages and isinstance(messages[-1], ModelRequest):
+            messages[-1].parts.append(part)
+        else:
+            messages.append(ModelRequest(parts=[part]))
     return messages
@@ -0,0 +1,388 @@
+"""
+Benchmark and load-test /agent/chat with a stubbed LLM.
+
+The finance agents are overridden with a pydantic-ai FunctionModel that
+streams a scripted answer at a configurable token rate, so the numbers
+reflect this service's own overhead and no network or API keys are needed.
+Synthetic exports of 10 to 100k transactions are derived from output.json.
+
+For every export size the script reports the request parse time, the time
+to flatten the transactions into a columnar store (what an inline request
+pays on a store cache miss) and the estimated prompt tokens, then drives the
+app with N concurrent streams, in-process through an ASGI client and/or
+out-of-process against uvicorn (this script restarted with --serve), and
+reports time to first byte, throughput and the server's peak RSS. Each
+concurrent stream sends its own X-API-Key unless --users says otherwise;
+requests refused by admission control (429/503) are counted as rejected.
+
+Usage:
+    python benchmarks/bench_chat.py [--sizes 10 1000 10000 100000]
+        [--concurrency 1 8 32] [--requests 32] [--server asgi uvicorn]
+        [--mode inline|dataset] [--users N] [--tokens 40] [--token-rate 200]
+        [--first-token-delay 0]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import copy
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+import uuid
+import warnings
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Offline: placeholder provider keys, no telemetry export, no cached answers
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("GOOGLE_API_KEY", "bench")
+os.environ.setdefault("LOGFIRE_SEND_TO_LOGFIRE", "false")
+os.environ.setdefault("LOGFIRE_CONSOLE", "false")
+os.environ.setdefault("RESPONSE_CACHE_ENABLED", "false")
+# Library deprecation warnings would interleave with the tables
+warnings.simplefilter("ignore")
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+from pydantic_ai.models.function import DeltaToolCall, FunctionModel  # noqa: E402
+
+import main  # noqa: E402
+from app.model.agent_model import AgentRequest  # noqa: E402
+from app.services.agent_services import (  # noqa: E402
+    FinanceAgentService,
+    estimate_prompt_tokens,
+)
+from app.services.transaction_service import TransactionStore  # noqa: E402
+
+MERCHANTS = [
+    "Swiggy", "Zomato", "Amazon", "Flipkart", "Uber", "Ola", "BigBasket", "Airtel",
+    "Jio", "Netflix", "Spotify", "Starbucks", "Dmart", "Myntra", "Apollo Pharmacy",
+    "IRCTC", "Decathlon", "Croma", "Landlord", "Electricity Board",
+]
+QUERY = "Summarise my spending on {merchant} and suggest where I can save (#{n})"
+
+
+def make_export(sample: dict, size: int, seed: int = 0) -> bytes:
+    """Build a JSON export with size transactions cloned from the sample."""
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1)
+    transactions = []
+    for i in range(size):
+        trans = copy.deepcopy(rng.choice(sample["transactions"]))
+        merchant = rng.choice(MERCHANTS)
+        trans["id"] = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        trans["date"] = (start + timedelta(minutes=30 * i)).isoformat()
+        trans["title"] = merchant
+        trans["amount"] = round(rng.uniform(10, 20000), 2)
+        if trans.get("smsContent"):
+            trans["smsContent"] = (
+                f"A/c *{rng.randint(1000, 9999)} debited Rs. {trans['amount']} "
+                f"to {merchant}. UPI:{rng.randint(10**11, 10**12 - 1)}. -Indian Bank"
+            )
+        transactions.append(trans)
+    export = dict(sample, transactions=transactions)
+    export["exportInfo"] = dict(sample["exportInfo"], totalTransactions=size)
+    return json.dumps(export).encode("utf-8")
+
+
+def stub_model(tokens: int, token_rate: float, first_token_delay: float) -> FunctionModel:
+    """A model that streams a scripted answer of tokens words at token_rate/s."""
+    words = [f"word{i % 10} " for i in range(tokens)]
+
+    async def stream(messages, info):
+        await asyncio.sleep(first_token_delay)
+        if info.output_tools:
+            yield {0: DeltaToolCall(name=info.output_tools[0].name, json_args='{"response_text": "')}
+            for word in words:
+                await asyncio.sleep(1 / token_rate)
+                yield {0: DeltaToolCall(json_args=word)}
+            yield {0: DeltaToolCall(json_args='"}')}
+        else:
+            for word in words:
+                await asyncio.sleep(1 / token_rate)
+                yield word
+
+    return FunctionModel(stream_function=stream)
+
+
+# Keeps the agent overrides active for the rest of the process
+_overrides = contextlib.ExitStack()
+
+
+def install_stub(args) -> None:
+    """Override every finance agent with the stub model."""
+    model = stub_model(args.tokens, args.token_rate, args.first_token_delay)
+    FinanceAgentService()
+    for agent in FinanceAgentService._agents.values():
+        _overrides.enter_context(agent.override(model=model))
+
+
+def peak_rss_mb(pid: int = None) -> float:
+    """Peak resident set size of this process, or of a running child by pid."""
+    if pid is not None:
+        # A forked child's rusage includes the parent's pages from before the
+        # exec, so read the child's own high-water mark where procfs exists
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def chat_body(export: bytes, dataset_id, n: int) -> bytes:
+    """The request body of the n-th chat request; queries differ, so none coalesce."""
+    query = json.dumps(QUERY.format(merchant=MERCHANTS[n % len(MERCHANTS)], n=n))
+    if dataset_id:
+        return f'{{"user_query": {query}, "dataset_id": "{dataset_id}"}}'.encode("utf-8")
+    return b'{"user_query": ' + query.encode("utf-8") + b', "finance_info": ' + export + b"}"
+
+
+async def load(upload, post, export: bytes, args, concurrency: int):
+    """Send args.requests chat requests, concurrency at a time, and time them.
+
+    Args:
+        upload: Coroutine function storing an export, returning its dataset id
+        post: Coroutine function sending a chat body with headers, returning
+            the status code and the seconds to the first body byte (or None)
+        export: The finance export of this run
+        args: Parsed command line
+        concurrency: Requests in flight at a time
+    """
+    dataset_id = await upload(export) if args.mode == "dataset" else None
+    users = args.users or concurrency
+    semaphore = asyncio.Semaphore(concurrency)
+    first_bytes, totals, rejected, errors = [], [], 0, 0
+
+    async def one(n: int) -> None:
+        nonlocal rejected, errors
+        body = chat_body(export, dataset_id, n)
+        headers = {"Content-Type": "application/json", "X-API-Key": f"bench-{n % users}"}
+        async with semaphore:
+            start = time.perf_counter()
+            status, first = await post(body, headers)
+            total = time.perf_counter() - start
+        if status in (429, 503):
+            rejected += 1
+        elif status != 200 or first is None:
+            errors += 1
+        else:
+            first_bytes.append(first)
+            totals.append(total)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(args.requests)))
+    return first_bytes, totals, rejected, errors, time.perf_counter() - start
+
+
+def report(server: str, size: int, concurrency: int, result) -> None:
+    first_bytes, totals, rejected, errors, wall = result
+    ttfb = np.percentile(first_bytes, [50, 95]) * 1000 if first_bytes else [np.nan] * 2
+    total = np.percentile(totals, 50) * 1000 if totals else np.nan
+    print(
+        f"{server:>8} {size:>7} {concurrency:>5} {len(totals) / wall:>8.1f} "
+        f"{ttfb[0]:>9.1f} {ttfb[1]:>9.1f} {total:>9.1f} {rejected:>9} {errors:>7}"
+    )
+
+
+async def asgi_post(app, path: str, body: bytes, headers: dict):
+    """POST body to the ASGI app in-process; returns the status and first-byte time.
+
+    httpx's ASGITransport collects the whole response before returning it, so
+    the app is driven directly to time the first streamed chunk.
+    """
+    start = time.perf_counter()
+    done = asyncio.Event()
+    status, first, chunks = None, None, []
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("ascii"),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()]
+        + [(b"content-length", str(len(body)).encode("ascii"))],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, first
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            if message.get("body"):
+                chunks.append(message["body"])
+                if first is None:
+                    first = time.perf_counter() - start
+            if not message.get("more_body", False):
+                done.set()
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        done.set()
+    return status, first, b"".join(chunks)
+
+
+async def run_asgi(exports, args) -> None:
+    async def upload(export: bytes) -> str:
+        status, _, body = await asgi_post(
+            main.app, "/agent/datasets", export, {"Content-Type": "application/json"}
+        )
+        if status != 200:
+            raise RuntimeError(f"dataset upload failed with {status}")
+        return json.loads(body)["dataset_id"]
+
+    async def post(body: bytes, headers: dict):
+        status, first, _ = await asgi_post(main.app, "/agent/chat", body, headers)
+        return status, first
+
+    for size, export in exports.items():
+        for concurrency in args.concurrency:
+            report("asgi", size, concurrency, await load(upload, post, export, args, concurrency))
+
+
+async def run_uvicorn(exports, args, port: int) -> None:
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{port}", timeout=None, limits=limits
+    ) as client:
+        for _ in range(100):
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    break
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+        else:
+            raise RuntimeError("uvicorn did not start")
+
+        async def upload(export: bytes) -> str:
+            response = await client.post("/agent/datasets", content=export)
+            response.raise_for_status()
+            return response.json()["dataset_id"]
+
+        async def post(body: bytes, headers: dict):
+            start = time.perf_counter()
+            first = None
+            async with client.stream("POST", "/agent/chat", content=body, headers=headers) as response:
+                async for _ in response.aiter_bytes():
+                    if first is None:
+                        first = time.perf_counter() - start
+            return response.status_code, first
+
+        for size, export in exports.items():
+            for concurrency in args.concurrency:
+                report(
+                    "uvicorn", size, concurrency,
+                    await load(upload, post, export, args, concurrency),
+                )
+
+
+def serve(args) -> None:
+    """Run the app under uvicorn with the stubbed model (the --serve mode)."""
+    import uvicorn
+
+    install_stub(args)
+    uvicorn.run(main.app, host="127.0.0.1", port=args.serve, log_level="warning")
+
+
+def main_bench() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000, 100000])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--server", nargs="+", choices=["asgi", "uvicorn"],
+                        default=["asgi", "uvicorn"])
+    parser.add_argument("--mode", choices=["inline", "dataset"], default="inline",
+                        help="send the export with every request, or upload it once")
+    parser.add_argument("--users", type=int, default=0,
+                        help="distinct X-API-Key users (default: one per concurrent stream)")
+    parser.add_argument("--tokens", type=int, default=40, help="streamed answer length")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="tokens per second")
+    parser.add_argument("--first-token-delay", type=float, default=0.0,
+                        help="simulated provider latency before the first token (s)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args)
+        return
+
+    with open(os.path.join(ROOT, "output.json")) as f:
+        sample = json.load(f)
+    exports = {size: make_export(sample, size) for size in args.sizes}
+
+    print(f"{'rows':>7} {'body MB':>8} {'parse ms':>9} {'flatten ms':>11} {'prompt tokens':>14}")
+    for size, export in exports.items():
+        body = chat_body(export, None, 0)
+        parse = best_of(lambda: AgentRequest.model_validate_json(body), args.repeat)
+        request = AgentRequest.model_validate_json(body)
+        flatten = best_of(
+            lambda: TransactionStore.from_finance_info(request.finance_info), args.repeat
+        )
+        tokens = estimate_prompt_tokens(request.user_query, request.finance_info, [])
+        print(
+            f"{size:>7} {len(body) / 1e6:>8.2f} {parse * 1000:>9.1f} "
+            f"{flatten * 1000:>11.1f} {tokens:>14}"
+        )
+
+    print()
+    print(
+        f"{'server':>8} {'rows':>7} {'conc':>5} {'req/s':>8} {'ttfb p50':>9} "
+        f"{'ttfb p95':>9} {'total p50':>9} {'rejected':>9} {'errors':>7}"
+    )
+    if "asgi" in args.server:
+        install_stub(args)
+        asyncio.run(run_asgi(exports, args))
+        print(f"{'asgi':>8} peak RSS {peak_rss_mb():.0f} MB (benchmark process)")
+    if "uvicorn" in args.server:
+        command = [sys.executable, os.path.abspath(__file__), "--serve", str(args.port),
+                   "--tokens", str(args.tokens), "--token-rate", str(args.token_rate),
+                   "--first-token-delay", str(args.first_token_delay)]
+        server = subprocess.Popen(command)
+        try:
+            asyncio.run(run_uvicorn(exports, args, args.port))
+            peak = peak_rss_mb(server.pid)
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{'uvicorn':>8} peak RSS {peak:.0f} MB (server)")
+
+
+if __name__ == "__main__":
+    main_bench()
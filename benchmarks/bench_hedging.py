@@ -0,0 +1,108 @@
+"""
+Benchmark hedged and fallback LLM streaming with fake models.
+
+Two local pydantic-ai FunctionModel agents stand in for the providers: the
+primary answers quickly except for a slow tail and occasional errors, the
+fallback is a little slower but steady. The same requests are run through
+hedged_stream with hedging disabled (failover only) and enabled, and the
+time-to-first-token percentiles are compared. No network or API keys needed.
+
+Usage:
+    python benchmarks/bench_hedging.py [--requests 300] [--hedge-delay 0.15]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+from pydantic_ai import Agent  # noqa: E402
+from pydantic_ai.models.function import FunctionModel  # noqa: E402
+
+from app.services import resilience_service  # noqa: E402
+from app.services.resilience_service import (  # noqa: E402
+    CircuitBreaker,
+    StreamCandidate,
+    hedged_stream,
+)
+
+
+def make_agent(
+    name: str,
+    rng: random.Random,
+    fast: float,
+    slow: float,
+    slow_rate: float,
+    fault_rate: float,
+) -> Agent:
+    """Build an agent whose model injects latency and faults."""
+
+    async def stream(messages, info):
+        if rng.random() < fault_rate:
+            raise RuntimeError(f"{name} unavailable")
+        await asyncio.sleep(slow if rng.random() < slow_rate else fast)
+        for word in ("Your ", "balance ", "is ", "fine."):
+            yield word
+
+    return Agent(FunctionModel(stream_function=stream), output_type=str)
+
+
+async def text_stream(agent: Agent):
+    async with agent.run_stream("balance?") as result:
+        async for delta in result.stream_text(delta=True, debounce_by=None):
+            yield delta
+
+
+async def run(args, hedge_delay):
+    rng = random.Random(args.seed)
+    primary = make_agent("primary", rng, 0.04, 1.0, args.slow_rate, args.fault_rate)
+    fallback = make_agent("fallback", rng, 0.08, 0.08, 0.0, 0.0)
+    # Fresh circuits per run so both modes start from the same state
+    resilience_service._breakers.clear()
+    resilience_service._breakers.update(
+        {"primary": CircuitBreaker(), "fallback": CircuitBreaker()}
+    )
+
+    timings, errors = [], 0
+    for _ in range(args.requests):
+        candidates = [
+            StreamCandidate("primary", "primary", lambda: text_stream(primary)),
+            StreamCandidate("fallback", "fallback", lambda: text_stream(fallback)),
+        ]
+        start = time.perf_counter()
+        first = None
+        try:
+            async for _ in hedged_stream(candidates, hedge_delay):
+                if first is None:
+                    first = time.perf_counter() - start
+        except Exception:
+            errors += 1
+            continue
+        timings.append(first)
+    return np.array(timings), errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--hedge-delay", type=float, default=0.15)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--fault-rate", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'mode':>10} {'p50 (s)':>8} {'p95 (s)':>8} {'p99 (s)':>8} {'errors':>7}")
+    for mode, delay in (("failover", None), ("hedged", args.hedge_delay)):
+        timings, errors = asyncio.run(run(args, delay))
+        p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+        print(f"{mode:>10} {p50:>8.3f} {p95:>8.3f} {p99:>8.3f} {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark finance export ingestion.
+
+Compares the model path (FinanceInfo.model_validate_json followed by building
+the TransactionStore from the Transaction models) with the fast path
+(ingest_finance_json, which writes rows straight into the store) and the
+incremental streaming path (ingest_finance_stream, fed 64 KB chunks) on
+synthetic exports derived from output.json.
+
+Usage:
+    python benchmarks/bench_ingest.py [--sizes 1000 10000 100000] [--repeat 3]
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.model.finance_model import FinanceInfo  # noqa: E402
+from app.services.ingest_service import (  # noqa: E402
+    ingest_finance_json,
+    ingest_finance_stream,
+)
+from app.services.transaction_service import TransactionStore  # noqa: E402
+
+
+def make_payload(sample: dict, size: int, seed: int = 0) -> bytes:
+    """Build a JSON export with size transactions cloned from the sample."""
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1)
+    transactions = []
+    for i in range(size):
+        trans = copy.deepcopy(rng.choice(sample["transactions"]))
+        trans["id"] = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        trans["date"] = (start + timedelta(minutes=30 * i)).isoformat()
+        transactions.append(trans)
+    return json.dumps(dict(sample, transactions=transactions)).encode("utf-8")
+
+
+def model_path(payload: bytes) -> TransactionStore:
+    finance_info = FinanceInfo.model_validate_json(payload)
+    return TransactionStore.from_finance_info(finance_info)
+
+
+def fast_path(payload: bytes) -> TransactionStore:
+    return ingest_finance_json(payload)[1]
+
+
+def stream_path(payload: bytes) -> TransactionStore:
+    async def chunks():
+        for start in range(0, len(payload), 64 * 1024):
+            yield payload[start : start + 64 * 1024]
+
+    return asyncio.run(ingest_finance_stream(chunks()))[1]
+
+
+def best_of(func, payload: bytes, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(payload)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, "output.json")) as f:
+        sample = json.load(f)
+
+    print(
+        f"{'rows':>8} {'MB':>7} {'model (s)':>10} {'fast (s)':>10} "
+        f"{'speedup':>8} {'stream (s)':>11}"
+    )
+    for size in args.sizes:
+        payload = make_payload(sample, size)
+        model = best_of(model_path, payload, args.repeat)
+        fast = best_of(fast_path, payload, args.repeat)
+        stream = best_of(stream_path, payload, args.repeat)
+        print(
+            f"{size:>8} {len(payload) / 1e6:>7.1f} {model:>10.3f} "
+            f"{fast:>10.3f} {model / fast:>7.2f}x {stream:>11.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
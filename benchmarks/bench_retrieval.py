@@ -0,0 +1,175 @@
+"""
+Benchmark transaction retrieval for the prompt's transaction sample.
+
+Compares the previous approach (a substring scan of every row's text for each
+query term, then a full sort) with the BM25 index of retrieval_service on
+synthetic exports derived from output.json, with a few hundred merchants and
+varied SMS texts. Also reports the index build time, the cost of indexing an
+append, the size and load time of the persisted segments, and the size of
+the resulting transaction sample, which stays flat as the history grows.
+
+Usage:
+    python benchmarks/bench_retrieval.py [--sizes 1000 10000 100000] [--repeat 20]
+"""
+
+import argparse
+import copy
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.model.finance_model import Transaction  # noqa: E402
+from app.services.finance_service import build_transaction_sample  # noqa: E402
+from app.services.ingest_service import ingest_finance_json  # noqa: E402
+from app.services.retrieval_service import (  # noqa: E402
+    IndexSegment,
+    TransactionIndex,
+    _row_texts,
+)
+from app.services.utility_service import estimate_tokens, extract_query_terms  # noqa: E402
+
+MERCHANTS = [
+    f"{prefix} {suffix}"
+    for prefix in [
+        "Swiggy", "Zomato", "Amazon", "Flipkart", "Uber", "Ola", "BigBasket",
+        "Airtel", "Jio", "Netflix", "Spotify", "Starbucks", "Dmart", "Myntra",
+        "Apollo", "Reliance", "Croma", "Decathlon", "IRCTC", "MakeMyTrip",
+    ]
+    for suffix in ["", "Store", "Online", "Pay", "Mart", "India", "Express", "Hub",
+                   "Plus", "Daily", "Foods", "Retail", "Services", "Travels", "One"]
+]
+SMS = [
+    "A/c *{acct} debited Rs. {amount} on {day} to {merchant}. UPI:{ref}. "
+    "Not you? SMS BLOCK to 9289592895 - Indian Bank",
+    "Sent Rs.{amount} From HDFC Bank A/C *{acct} To {merchant} On {day} Ref {ref}",
+    "Rs.{amount} credited to a/c *{acct} on {day} by a/c linked to VPA "
+    "{ref}@okaxis (UPI Ref no {ref}).Indian Bank",
+]
+QUERIES = [
+    "How much did I spend on Swiggy last month?",
+    "show my netflix subscription payments",
+    "uber rides in march",
+    "transactions at decathlon store",
+    "what did I pay to irctc",
+    "food delivery spending",
+    "largest transactions",
+]
+
+
+def make_transactions(sample: dict, size: int, offset: int = 0, seed: int = 0) -> list:
+    """Clone size transactions from the sample with varied merchants and SMS."""
+    rng = random.Random(seed + offset)
+    start = datetime(2020, 1, 1)
+    transactions = []
+    for i in range(size):
+        trans = copy.deepcopy(rng.choice(sample["transactions"]))
+        date = start + timedelta(minutes=30 * (offset + i))
+        merchant = rng.choice(MERCHANTS).strip()
+        trans["id"] = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        trans["date"] = date.isoformat()
+        trans["title"] = merchant
+        trans["amount"] = round(rng.uniform(10, 20000), 2)
+        trans["smsContent"] = rng.choice(SMS).format(
+            acct=rng.randint(1000, 9999),
+            amount=trans["amount"],
+            day=date.strftime("%d-%m-%y"),
+            merchant=merchant,
+            ref=rng.randint(10**11, 10**12 - 1),
+        )
+        transactions.append(trans)
+    return transactions
+
+
+def scan_rank(texts: list, dates: np.ndarray, terms: list) -> np.ndarray:
+    """The previous ranking: substring matches of every term in every row."""
+    count = len(texts)
+    by_date = np.lexsort((np.arange(count), dates.view(np.int64)))
+    recency = np.empty(count, dtype=np.float64)
+    recency[by_date] = np.arange(1, count + 1) / count
+    matched = np.zeros(count, dtype=np.float64)
+    for term in terms:
+        matched += np.fromiter((term in text for text in texts), dtype=bool, count=count)
+    scores = 2.0 * matched / max(len(terms), 1) + recency
+    return np.lexsort((recency, scores))[::-1]
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, "output.json")) as f:
+        sample = json.load(f)
+    query_terms = [extract_query_terms(query) for query in QUERIES]
+
+    print(
+        f"{'rows':>7} {'scan ms':>9} {'index ms':>9} {'speedup':>8} {'build s':>8} "
+        f"{'append ms':>10} {'stored MB':>10} {'load ms':>8} {'sample tokens':>14}"
+    )
+    for size in args.sizes:
+        payload = json.dumps(dict(sample, transactions=make_transactions(sample, size)))
+        store = ingest_finance_json(payload)[1]
+        store.merchants  # SMS parsing is shared with the tools; not part of the index
+
+        texts = _row_texts(store, 0)
+        scan = statistics.median(
+            timed(lambda: [scan_rank(texts, store.dates, terms)[:50] for terms in query_terms])
+            / len(query_terms)
+            for _ in range(max(1, args.repeat // 10))
+        )
+
+        index = None
+
+        def build():
+            nonlocal index
+            index = TransactionIndex(store, dense=False)
+
+        build_time = timed(build)
+        search = statistics.median(
+            timed(lambda: [index.search(terms, 50) for terms in query_terms]) / len(query_terms)
+            for _ in range(args.repeat)
+        )
+
+        added = [
+            Transaction.model_validate(trans)
+            for trans in make_transactions(sample, 100, offset=size)
+        ]
+        appended = store.extend(added)
+        appended.merchants
+        append = timed(lambda: index.update(appended))
+
+        blobs = [segment.to_bytes() for segment in index.segments]
+        load = timed(
+            lambda: TransactionIndex(
+                appended, [IndexSegment.from_bytes(blob) for blob in blobs], dense=False
+            )
+        )
+        sample_tokens = estimate_tokens(
+            build_transaction_sample(appended, 8000, QUERIES[0], 50, index=index)
+        )
+        print(
+            f"{size:>7} {scan * 1000:>9.2f} {search * 1000:>9.3f} {scan / search:>7.0f}x "
+            f"{build_time:>8.2f} {append * 1000:>10.1f} "
+            f"{sum(map(len, blobs)) / 1e6:>10.1f} {load * 1000:>8.1f} {sample_tokens:>14}"
+        )
+
+
+if __name__ == "__main__":
+    main()
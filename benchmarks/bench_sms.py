@@ -0,0 +1,107 @@
+"""
+Benchmark SMS parsing throughput on synthetic bank alert corpora.
+
+Messages are generated from debit, credit, balance and notification templates
+of several banks with random payees, amounts, accounts and UPI references.
+The same corpus is parsed one message at a time, in one batch with
+parse_messages (every compiled pattern scans the joined corpus once) and
+through parse_transaction_messages twice, to show the per-id cache.
+
+Usage:
+    python benchmarks/bench_sms.py [--sizes 1000 10000 100000] [--repeat 3]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.services import sms_service  # noqa: E402
+from app.services.sms_service import (  # noqa: E402
+    parse_messages,
+    parse_transaction_messages,
+)
+
+TEMPLATES = [
+    "A/c *{acct} debited Rs. {amount} on {day}-11-25 to {payee}. UPI:{ref}. "
+    "Not you? SMS BLOCK to 9289592895, Dial 1930 for Cyber Fraud - Indian Bank",
+    "Your A/c XXX555{acct}  is credited by Rs. {amount} Total Bal : Rs. {balance} CR"
+    "  Clr Bal : Rs. {balance} CR as on:{day}/11/2025 22:06 -IndianBank",
+    "Rs.{amount} credited to a/c *{acct} on {day}/11/2025 by a/c linked to VPA "
+    "{vpa}@okaxis (UPI Ref no {ref}).Indian Bank",
+    "Sent Rs.{amount} From HDFC Bank A/C *{acct} To {payee} On {day}/11/25 "
+    "Ref {ref} Not You? Call 18002586161",
+    "Dear Customer, Rs.{amount} debited from A/c XX{acct} on {day}-Nov-25 to "
+    "{payee}. UPI Ref No. {ref}. Avl Bal INR {balance}. -SBI",
+    "Refund of Rs {amount} has been initiated for {merchant} order {ref}. "
+    "Updated balance should reflect in 2 hours.",
+    "Your OTP for login is 482913. Do not share it with anyone.",
+]
+PAYEES = ["Swiggy", "Zomato", "AMAZON PAY", "Mr Amrit Kum", "SK MABUD  AL", "NETFLIX COM"]
+
+
+def make_corpus(size: int, seed: int = 0):
+    """Return (ids, sms_contents, descriptions) for size synthetic transactions."""
+    rng = random.Random(seed)
+    ids, texts, descriptions = [], [], []
+    for _ in range(size):
+        ids.append(uuid.UUID(int=rng.getrandbits(128), version=4).bytes)
+        texts.append(
+            rng.choice(TEMPLATES).format(
+                acct=rng.randint(1000, 9999),
+                amount=f"{rng.uniform(10, 50000):.2f}",
+                balance=f"{rng.uniform(0, 500000):,.2f}",
+                day=f"{rng.randint(1, 28):02d}",
+                payee=rng.choice(PAYEES),
+                merchant=rng.choice(PAYEES[:3]),
+                vpa=f"{rng.randint(6000000000, 9999999999)}",
+                ref=rng.randint(10**11, 10**12 - 1),
+            )
+        )
+        descriptions.append(f"Transaction ({rng.randint(1000, 9999)})")
+    return ids, texts, descriptions
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def best_of(func, repeat: int) -> float:
+    return min(timed(func) for _ in range(repeat))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"{'messages':>9} {'per-message/s':>14} {'batched/s':>11} {'speedup':>8} "
+        f"{'cold ids/s':>11} {'cached ids/s':>13}"
+    )
+    for size in args.sizes:
+        ids, texts, descriptions = make_corpus(size)
+        single = best_of(lambda: [parse_messages([text]) for text in texts], args.repeat)
+        batched = best_of(lambda: parse_messages(texts), args.repeat)
+
+        sms_service._parse_cache.clear()
+        cold = timed(lambda: parse_transaction_messages(ids, texts, descriptions))
+        cached = best_of(
+            lambda: parse_transaction_messages(ids, texts, descriptions), args.repeat
+        )
+        print(
+            f"{size:>9} {size / single:>14,.0f} {size / batched:>11,.0f} "
+            f"{single / batched:>7.2f}x {size / cold:>11,.0f} {size / cached:>13,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
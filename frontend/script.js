@@ -1,10 +1,14 @@
 // Global state
 let financeData = null;
+let datasetId = null;
+let datasetUpload = null;
 let chatHistory = [];
+const conversationId = crypto.randomUUID();
 let isProcessing = false;
 
 // API Configuration - Will be loaded from backend
 let API_BASE_URL = window.location.origin; // Default to current origin
+let STREAM_MODE = 'full'; // 'delta' streams only newly generated text per frame
 
 // DOM Elements
 const uploadSection = document.getElementById('uploadSection');
@@ -36,6 +40,7 @@ async function loadConfig() {
     if (response.ok) {
       const config = await response.json();
       API_BASE_URL = config.apiBaseUrl;
+      STREAM_MODE = config.streamMode || STREAM_MODE;
       console.log('API Base URL loaded:', API_BASE_URL);
     } else {
       console.warn('Failed to load config, using default:', API_BASE_URL);
@@ -172,6 +177,7 @@ function validateAndStoreFinanceData(data, name) {
 
   // Store the data
   financeData = data;
+  datasetId = null;
 
   // Convert snake_case to camelCase for API compatibility
   financeData = convertToCamelCase(data);
@@ -209,6 +215,7 @@ function displayFileInfo(name, data) {
 
 function resetFileUpload() {
   financeData = null;
+  datasetId = null;
   fileInput.value = '';
   dropZone.style.display = 'block';
   fileInfo.style.display = 'none';
@@ -216,12 +223,74 @@ function resetFileUpload() {
   fileStats.textContent = '';
 }
 
+async function uploadDataset() {
+  // Upload the finance data once; later chat turns only send the dataset id
+  try {
+    const response = await fetch(`${API_BASE_URL}/agent/datasets`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(financeData),
+    });
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    const dataset = await response.json();
+    datasetId = dataset.dataset_id;
+  } catch (error) {
+    // Fall back to sending the full finance data with every message
+    console.warn('Dataset upload failed, sending data inline:', error);
+    datasetId = null;
+  }
+}
+
+function buildChatRequestBody(userQuery) {
+  const body = {
+    user_query: userQuery,
+    chat_history: chatHistory.slice(0, -1), // Exclude the current user message
+    stream_mode: STREAM_MODE, // Opt-in 'delta' sends only newly generated text
+    conversation_id: conversationId, // Lets the server reuse its summary of older turns
+  };
+  if (datasetId) {
+    body.dataset_id = datasetId;
+  } else {
+    body.finance_info = financeData;
+  }
+  return body;
+}
+
+async function postChatMessage(userQuery) {
+  if (datasetUpload) {
+    await datasetUpload;
+  }
+
+  const request = () =>
+    fetch(`${API_BASE_URL}/agent/chat`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(buildChatRequestBody(userQuery)),
+    });
+
+  let response = await request();
+  if (response.status === 404 && datasetId) {
+    // The server no longer has our dataset (restart or eviction), upload again
+    await uploadDataset();
+    response = await request();
+  }
+  return response;
+}
+
 function showChatSection() {
   if (!financeData) {
     showError('Please upload a file first');
     return;
   }
 
+  datasetUpload = uploadDataset();
+
   uploadSection.style.display = 'none';
   chatSection.style.display = 'flex';
 
@@ -357,17 +426,7 @@ async function sendChatMessage(userQuery) {
   sendBtn.disabled = true;
 
   try {
-    const response = await fetch(`${API_BASE_URL}/agent/chat`, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({
-        user_query: userQuery,
-        finance_info: financeData,
-        chat_history: chatHistory.slice(0, -1), // Exclude the current user message
-      }),
-    });
+    const response = await postChatMessage(userQuery);
 
     if (!response.ok) {
       throw new Error(`HTTP error! status: ${response.status}`);
@@ -390,6 +449,35 @@ async function sendChatMessage(userQuery) {
     chatMessages.appendChild(messageDiv);
     const messageText = messageDiv.querySelector('.message-text');
     let gotFirstChunk = false;
+    let streamingText = null;
+
+    // Delta frames ({seq, delta}) are appended as plain text while streaming;
+    // the final frame ({response_text, done}) is rendered once with formatting.
+    // Frames with response_text but no done flag are legacy full snapshots.
+    const handleFrame = (frame) => {
+      if (frame.delta === undefined && !frame.response_text) {
+        return;
+      }
+      if (!gotFirstChunk) {
+        hideTypingIndicator();
+        gotFirstChunk = true;
+      }
+      if (frame.delta !== undefined) {
+        if (streamingText === null) {
+          messageText.style.whiteSpace = 'pre-wrap';
+          streamingText = document.createTextNode('');
+          messageText.appendChild(streamingText);
+        }
+        streamingText.appendData(frame.delta);
+        assistantMessage += frame.delta;
+      } else {
+        assistantMessage = frame.response_text;
+        messageText.style.whiteSpace = '';
+        streamingText = null;
+        messageText.innerHTML = formatMessage(assistantMessage);
+      }
+      scrollToBottom();
+    };
 
     // Read the stream
     while (true) {
@@ -413,19 +501,7 @@ async function sendChatMessage(userQuery) {
       for (const line of lines) {
         if (line.trim()) {
           try {
-            // Parse the JSON object
-            const jsonResponse = JSON.parse(line);
-
-            // Extract response_text from the validated response
-            if (jsonResponse.response_text) {
-              assistantMessage = jsonResponse.response_text;
-              if (!gotFirstChunk) {
-                hideTypingIndicator();
-                gotFirstChunk = true;
-              }
-              messageText.innerHTML = formatMessage(assistantMessage);
-              scrollToBottom();
-            }
+            handleFrame(JSON.parse(line));
           } catch (parseError) {
             console.error('Error parsing JSON chunk:', parseError);
             // Continue processing other chunks
@@ -437,16 +513,7 @@ async function sendChatMessage(userQuery) {
     // Process any remaining data in buffer
     if (buffer.trim()) {
       try {
-        const jsonResponse = JSON.parse(buffer);
-        if (jsonResponse.response_text) {
-          assistantMessage = jsonResponse.response_text;
-          if (!gotFirstChunk) {
-            hideTypingIndicator();
-            gotFirstChunk = true;
-          }
-          messageText.innerHTML = formatMessage(assistantMessage);
-          scrollToBottom();
-        }
+        handleFrame(JSON.parse(buffer));
       } catch (parseError) {
         console.error('Error parsing final JSON chunk:', parseError);
       }
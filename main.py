@@ -1,22 +1,44 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from dotenv import load_dotenv
 import uvicorn
 import os
 from pathlib import Path
-import json
 
 from app.endpoint.agent import router
+from app.endpoint.dataset import router as dataset_router
+from app.services.agent_services import warm_up_agents
+from app.services.llm_service import close_http_clients
+from app.services.telemetry_service import (
+    TelemetryMiddleware,
+    configure_telemetry,
+    render_metrics,
+    shutdown_telemetry,
+)
 
 # Load environment variables from .env file
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build agents and HTTP connection pools at startup, close them on shutdown."""
+    configure_telemetry()
+    warm_up_agents()
+    yield
+    await close_http_clients()
+    shutdown_telemetry()
+
+
 app = FastAPI(
     title="Your Finance Bro API",
     description="AI-powered financial assistant API",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -26,8 +48,11 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so request timings include CORS handling
+app.add_middleware(TelemetryMiddleware)
 
 app.include_router(router=router, prefix="/agent", tags=["Agent"])
+app.include_router(router=dataset_router, prefix="/agent/datasets", tags=["Dataset"])
 
 frontend_path = Path(__file__).parent / "frontend"
 
@@ -46,7 +71,11 @@ async def get_config():
     backend_url = os.getenv("BACKEND_URL", "http://127.0.0.1:8000")
     if not backend_url.startswith(("http://", "https://")):
         backend_url = f"https://{backend_url}"
-    return {"apiBaseUrl": backend_url}
+    # Chat framing requested by the frontend: "full" snapshots or opt-in "delta"
+    stream_mode = os.getenv("FRONTEND_STREAM_MODE", "full")
+    if stream_mode not in ("full", "delta"):
+        stream_mode = "full"
+    return {"apiBaseUrl": backend_url, "streamMode": stream_mode}
 
 
 @app.get("/demo-data", tags=["Frontend"])
@@ -55,12 +84,8 @@ async def get_demo_data():
     sample_path = Path(__file__).parent / "output.json"
     if not sample_path.exists():
         raise HTTPException(status_code=404, detail="Demo data not found")
-    try:
-        with sample_path.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to load demo data: {e}")
+    # Streamed from disk as is; the client parses it
+    return FileResponse(sample_path, media_type="application/json")
 
 
 @app.get("/health", tags=["Health"])
@@ -69,6 +94,13 @@ async def health_check():
     return {"status": "healthy", "message": "Your Finance Bro API is running"}
 
 
+@app.get("/metrics", tags=["Health"])
+async def metrics():
+    """Prometheus metrics: request and stage latencies, tokens, caches, admission."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8080))
     uvicorn.run(app, host="0.0.0.0", port=port, reload=True)
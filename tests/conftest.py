@@ -0,0 +1,103 @@
+import asyncio
+import contextlib
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Offline: placeholder provider keys, every model call goes to a FunctionModel.
+# Cached answers are off unless a test turns them on.
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("RESPONSE_CACHE_ENABLED", "false")
+os.environ.setdefault("DATASET_STORE", "memory")
+
+import httpx  # noqa: E402
+from pydantic_ai.models.function import DeltaToolCall, FunctionModel  # noqa: E402
+
+from app.model.finance_model import FinanceInfo  # noqa: E402
+from app.services.agent_services import FinanceAgentService  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def export_bytes() -> bytes:
+    """The bundled sample export."""
+    return (ROOT / "output.json").read_bytes()
+
+
+@pytest.fixture
+def finance_info(export_bytes) -> FinanceInfo:
+    return FinanceInfo.model_validate_json(export_bytes)
+
+
+def _scripted_model(text: str = "You spent 100 on food.", delay: float = 0.0, seen=None):
+    """
+    A FunctionModel that streams text word by word.
+
+    The structured output tool is used when the run has one, plain text
+    otherwise. Every request's messages are appended to seen, if given.
+    """
+    words = [word + " " for word in text.split(" ")]
+    words[-1] = words[-1].rstrip()
+
+    async def stream(messages, info):
+        if seen is not None:
+            seen.append(messages)
+        if info.output_tools:
+            tool = info.output_tools[0].name
+            yield {0: DeltaToolCall(name=tool, json_args='{"response_text": "')}
+            for word in words:
+                await asyncio.sleep(delay)
+                yield {0: DeltaToolCall(json_args=word)}
+            yield {0: DeltaToolCall(json_args='"}')}
+        else:
+            for word in words:
+                await asyncio.sleep(delay)
+                yield word
+
+    return FunctionModel(stream_function=stream)
+
+
+@pytest.fixture
+def scripted_model():
+    """Factory of FunctionModels streaming a scripted answer."""
+    return _scripted_model
+
+
+@pytest.fixture
+def use_model():
+    """Override every finance agent with the given model for the test."""
+    FinanceAgentService()
+    stack = contextlib.ExitStack()
+
+    def install(model: FunctionModel) -> None:
+        for agent in FinanceAgentService._agents.values():
+            stack.enter_context(agent.override(model=model))
+
+    yield install
+    stack.close()
+
+
+@pytest.fixture
+def run_app():
+    """
+    Run an async scenario against the app in this thread.
+
+    Agent overrides live in context variables, which the TestClient's
+    portal thread would not see, so requests go through an ASGI transport.
+    """
+    import main
+
+    def run(scenario):
+        async def drive():
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await scenario(client)
+
+        return asyncio.run(drive())
+
+    return run
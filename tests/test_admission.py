@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from app.services import admission_service, agent_services, response_cache_service
+from app.services.admission_service import AdmissionController
+from app.services.model_router_service import get_model_router
+
+QUERY = "How much did I spend on food?"
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    """Install an admission controller with the given limits."""
+
+    def install(**kwargs):
+        settings = {"max_concurrent": 1, "max_per_user": 1, "max_queue": 0, "queue_timeout": 1}
+        controller = AdmissionController(**{**settings, **kwargs})
+        monkeypatch.setattr(admission_service, "_controller", controller)
+        return controller
+
+    return install
+
+
+def _body(finance_info, query=QUERY):
+    return {
+        "user_query": query,
+        "finance_info": finance_info.model_dump(mode="json", by_alias=True),
+        "chat_history": [],
+    }
+
+
+async def _chat(client, body, api_key):
+    response = await client.post("/agent/chat", json=body, headers={"X-API-Key": api_key})
+    return response.status_code, response.headers.get("retry-after")
+
+
+async def _while_running(client, first, second):
+    """Send second while first is running, and return both statuses."""
+    running = asyncio.ensure_future(_chat(client, *first))
+    await asyncio.sleep(0.05)
+    result = await _chat(client, *second)
+    return await running, result
+
+
+def test_user_over_concurrency_gets_429(
+    limits, use_model, scripted_model, finance_info, run_app
+):
+    limits(max_concurrent=4)
+    use_model(scripted_model(delay=0.05))
+
+    first, second = run_app(
+        lambda client: _while_running(
+            client,
+            (_body(finance_info), "alice"),
+            (_body(finance_info, "What is my biggest expense?"), "alice"),
+        )
+    )
+
+    assert first == (200, None)
+    assert second[0] == 429 and int(second[1]) >= 1
+
+
+def test_overloaded_worker_sheds_with_503(
+    limits, use_model, scripted_model, finance_info, run_app
+):
+    limits()
+    use_model(scripted_model(delay=0.05))
+
+    first, second = run_app(
+        lambda client: _while_running(
+            client,
+            (_body(finance_info), "alice"),
+            (_body(finance_info, "What is my biggest expense?"), "bob"),
+        )
+    )
+
+    assert first == (200, None)
+    assert second[0] == 503 and second[1] is not None
+
+
+def test_duplicates_share_the_leaders_slot(
+    limits, use_model, scripted_model, finance_info, run_app
+):
+    controller = limits()
+    seen = []
+    use_model(scripted_model(delay=0.05, seen=seen))
+
+    first, second = run_app(
+        lambda client: _while_running(
+            client, (_body(finance_info), "alice"), (_body(finance_info), "alice")
+        )
+    )
+
+    assert first == second == (200, None)
+    assert len(seen) == 1
+    assert controller.stats()["admitted"] == 1
+
+
+def test_cache_hits_are_not_admission_controlled(
+    limits, monkeypatch, use_model, scripted_model, finance_info, run_app
+):
+    monkeypatch.setattr(response_cache_service, "RESPONSE_CACHE_ENABLED", True)
+    response_cache_service._exact_cache.clear()
+    controller = limits()
+    use_model(scripted_model())
+
+    async def scenario(client):
+        first = await _chat(client, _body(finance_info), "alice")
+        # No user may start a run now; the cached answer needs none
+        controller.max_per_user = 0
+        return first, await _chat(client, _body(finance_info), "alice")
+
+    first, cached = run_app(scenario)
+    response_cache_service._exact_cache.clear()
+
+    assert first == cached == (200, None)
+    assert controller.stats()["admitted"] == 1
+
+
+def test_estimate_uses_the_routed_model(
+    limits, monkeypatch, use_model, scripted_model, finance_info, run_app
+):
+    limits()
+    use_model(scripted_model())
+    estimates = []
+    estimate = agent_services.estimate_prompt_tokens
+
+    def spy(*args):
+        estimates.append(args[-2:])
+        return estimate(*args)
+
+    monkeypatch.setattr(agent_services, "estimate_prompt_tokens", spy)
+    query = "Compare my spending trend across categories over the last six months"
+    route = get_model_router().route(
+        query, history_messages=0, row_count=len(finance_info.transactions)
+    )
+
+    status, _ = run_app(lambda client: _chat(client, _body(finance_info, query), "alice"))
+
+    assert status == 200
+    assert estimates == [(route.model, route.tier)]
@@ -0,0 +1,56 @@
+from app.model.finance_model import FinanceInfo, Transaction
+from app.services.analytics_service import FinanceAnalytics, get_finance_analytics
+from app.services.dataset_service import FinanceDataset
+
+ACCOUNT_ID = "f4cdf4f6-433b-483e-9df1-d29cc4bb051c"
+
+
+def _appended():
+    """A monthly subscription and a salary credit, spanning new and existing months."""
+    rows = [
+        {"date": f"2025-{month:02d}-05T08:00:00", "type": "debit", "title": "Netflix",
+         "amount": 649.0, "category": "other"}
+        for month in (8, 9, 10, 11)
+    ]
+    rows.append(
+        {"date": "2025-11-06T10:00:00", "type": "credit", "title": "Salary",
+         "amount": 42000.0, "category": "other"}
+    )
+    return [
+        Transaction.model_validate(
+            {**row, "id": f"6f1c2e0a-2222-4a8b-9c3d-{i:012d}", "accountId": ACCOUNT_ID}
+        )
+        for i, row in enumerate(rows)
+    ]
+
+
+def _analytics(dataset: FinanceDataset) -> FinanceAnalytics:
+    return get_finance_analytics(dataset.finance_info, dataset.store, dataset.content_hash)
+
+
+def test_incremental_update_matches_a_full_recompute(export_bytes):
+    dataset = FinanceDataset.create(FinanceInfo.model_validate_json(export_bytes))
+    _analytics(dataset).report()
+
+    dataset.append_transactions(_appended())
+
+    incremental = _analytics(dataset)
+    full = FinanceAnalytics(dataset.finance_info, dataset.store)
+    assert incremental.rows == len(dataset.store)
+    assert incremental.report() == full.report()
+    assert [payment.merchant for payment in incremental.recurring()] == ["Netflix"]
+
+
+def test_append_leaves_analytics_of_the_shared_content_unchanged(export_bytes):
+    appended = FinanceDataset.create(FinanceInfo.model_validate_json(export_bytes))
+    untouched = FinanceDataset.create(FinanceInfo.model_validate_json(export_bytes))
+    assert appended.content_hash == untouched.content_hash
+    shared = _analytics(untouched)
+    before = shared.report()
+
+    appended.append_transactions(_appended())
+
+    assert _analytics(appended) is not shared
+    assert _analytics(untouched) is shared
+    assert shared.rows == len(untouched.store)
+    assert shared.report() == before
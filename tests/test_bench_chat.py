@@ -0,0 +1,56 @@
+import asyncio
+import json
+import subprocess
+import sys
+
+from app.model.finance_model import FinanceInfo
+from benchmarks import bench_chat
+
+
+def test_make_export_clones_the_sample_to_the_requested_size(export_bytes):
+    sample = json.loads(export_bytes)
+
+    export = bench_chat.make_export(sample, 50)
+
+    info = FinanceInfo.model_validate_json(export)
+    assert len(info.transactions) == 50
+    assert len({trans.id for trans in info.transactions}) == 50
+    assert info.export_info.total_transactions == 50
+    assert bench_chat.make_export(sample, 50) == export
+
+
+def test_asgi_post_times_the_first_streamed_byte(use_model, scripted_model, export_bytes):
+    import main
+
+    use_model(scripted_model("You spent 100 on food.", delay=0.01))
+    body = bench_chat.chat_body(export_bytes, None, 0)
+
+    status, first, response = asyncio.run(
+        bench_chat.asgi_post(
+            main.app, "/agent/chat", body, {"Content-Type": "application/json"}
+        )
+    )
+
+    assert status == 200
+    assert first is not None and first > 0
+    assert json.loads(response.splitlines()[-1]) == {"response_text": "You spent 100 on food."}
+
+
+def test_benchmark_runs_end_to_end_in_process():
+    result = subprocess.run(
+        [
+            sys.executable, bench_chat.__file__,
+            "--sizes", "10", "--concurrency", "2", "--requests", "4",
+            "--server", "asgi", "--tokens", "3", "--token-rate", "1000", "--repeat", "1",
+        ],
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+    assert result.returncode == 0, result.stderr
+    rows = [line.split() for line in result.stdout.splitlines()]
+    (load,) = [row for row in rows if row[:2] == ["asgi", "10"]]
+    # server, rows, concurrency, req/s, ttfb p50/p95, total p50, rejected, errors
+    assert load[2] == "2" and float(load[3]) > 0
+    assert load[-2:] == ["0", "0"]
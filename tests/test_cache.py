@@ -0,0 +1,64 @@
+from app.services import agent_services, cache_service
+from app.services.agent_services import FinanceAgentService
+from app.services.cache_service import LRUCache
+from app.services.utility_service import compute_finance_hash
+
+
+def test_lru_evicts_the_least_recently_used_entry():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache_service.time, "monotonic", lambda: now[0])
+    cache = LRUCache(maxsize=4, ttl=10)
+    cache.set("key", "value")
+
+    now[0] += 9
+    assert cache.get("key") == "value"
+    now[0] += 2
+    assert cache.get("key") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_system_prompt_is_built_once_per_content_hash(monkeypatch, finance_info):
+    finance_hash = compute_finance_hash(finance_info)
+    agent_services._summary_cache.pop(finance_hash)
+    built = []
+    build = agent_services.build_finance_summary
+
+    def spy(*args):
+        built.append(1)
+        return build(*args)
+
+    monkeypatch.setattr(agent_services, "build_finance_summary", spy)
+
+    first, _ = FinanceAgentService._get_finance_prompt(
+        finance_info, "How much did I spend on food?", finance_hash
+    )
+    second, _ = FinanceAgentService._get_finance_prompt(
+        finance_info, "What is my biggest expense?", finance_hash
+    )
+
+    assert built == [1]
+    assert second is first
+
+
+def test_cache_stats_route_reports_registered_caches(run_app):
+    async def scenario(client):
+        return (await client.get("/agent/cache/stats")).json()
+
+    stats = run_app(scenario)
+
+    assert {"finance_summary", "system_prompt", "finance_prompt"} <= set(stats)
+    assert set(stats["system_prompt"]) >= {"size", "hits", "misses", "hit_rate"}
@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+from pydantic_ai.models.function import FunctionModel
+
+from app.services.agent_services import process_agent_output
+
+ANSWER = "You spent ₹1,200 on food this month, mostly at Swiggy."
+
+
+def _frames(finance_info, query, stream_mode):
+    async def collect():
+        return [
+            json.loads(frame)
+            async for frame in process_agent_output(
+                query, finance_info, [], stream_mode=stream_mode
+            )
+        ]
+
+    return asyncio.run(collect())
+
+
+def test_delta_frames_add_up_to_the_validated_answer(use_model, scripted_model, finance_info):
+    answer = "You spent ₹1,200 on food."
+    # Slower than the output debounce, so the words arrive as separate deltas
+    use_model(scripted_model(answer, delay=0.12))
+
+    frames = _frames(finance_info, "How much did I spend on food?", "delta")
+
+    *deltas, final = frames
+    assert len(deltas) > 1
+    assert [frame["seq"] for frame in frames] == list(range(len(frames)))
+    assert all(set(frame) == {"seq", "delta"} for frame in deltas)
+    assert "".join(frame["delta"] for frame in deltas) == answer
+    assert final == {"response_text": answer, "seq": len(deltas), "done": True}
+
+
+def test_delta_mode_keeps_the_structured_output(use_model, scripted_model, finance_info):
+    model = scripted_model(ANSWER)
+    output_tools = []
+
+    async def stream(messages, info):
+        output_tools.append([tool.name for tool in info.output_tools])
+        async for chunk in model.stream_function(messages, info):
+            yield chunk
+
+    use_model(FunctionModel(stream_function=stream))
+
+    full = _frames(finance_info, "How much did I spend on food?", "full")
+    delta = _frames(finance_info, "How much did I spend on food?", "delta")
+
+    # Both runs answer through the AgentResponse output tool, not plain text
+    assert len(output_tools) == 2 and output_tools[0] == output_tools[1] != []
+    assert full[-1] == {"response_text": ANSWER}
+    assert delta[-1]["response_text"] == ANSWER
+
+
+def test_chat_endpoint_streams_delta_frames(use_model, scripted_model, finance_info, run_app):
+    use_model(scripted_model(ANSWER))
+    body = {
+        "user_query": "How much did I spend on food?",
+        "finance_info": finance_info.model_dump(mode="json", by_alias=True),
+        "chat_history": [],
+        "stream_mode": "delta",
+    }
+
+    async def scenario(client):
+        response = await client.post("/agent/chat", json=body)
+        return response.status_code, [json.loads(line) for line in response.text.splitlines()]
+
+    status, frames = run_app(scenario)
+
+    assert status == 200
+    assert frames[-1]["done"] is True
+    assert "".join(frame.get("delta", "") for frame in frames[:-1]) == ANSWER
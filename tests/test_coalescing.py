@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from app.services import generation_service
+from app.services.agent_services import process_agent_output
+from app.services.generation_service import coalesce
+
+
+@pytest.fixture(autouse=True)
+def no_runs_left():
+    yield
+    assert generation_service.get_coalescing_stats()["in_flight"] == 0
+
+
+def _counting_run(frames, delay=0.01):
+    """A run factory that counts how many runs were started."""
+    starts = []
+
+    def start(_admitted):
+        starts.append(1)
+
+        async def run():
+            for frame in frames:
+                await asyncio.sleep(delay)
+                yield frame
+
+        return run()
+
+    return start, starts
+
+
+async def _read(frames):
+    return [frame async for frame in frames]
+
+
+def test_concurrent_identical_requests_share_one_run():
+    start, starts = _counting_run(["a", "b", "c"])
+
+    async def scenario():
+        return await asyncio.gather(
+            *[_read(await coalesce("key", start)) for _ in range(3)]
+        )
+
+    results = asyncio.run(scenario())
+
+    assert starts == [1]
+    assert results == [["a\n", "b\n", "c\n"]] * 3
+
+
+def test_run_is_cancelled_when_every_subscriber_leaves():
+    start, _ = _counting_run(["a", "b", "c"], delay=0.05)
+
+    async def scenario():
+        frames = await coalesce("key", start)
+        async for _ in frames:
+            break
+        await frames.aclose()
+        await asyncio.sleep(0)
+        return generation_service.get_coalescing_stats()
+
+    before = generation_service.get_coalescing_stats()["cancelled"]
+    stats = asyncio.run(scenario())
+
+    assert stats["cancelled"] == before + 1
+    assert stats["in_flight"] == 0
+
+
+def test_errors_reach_every_subscriber():
+    def start(_admitted):
+        async def run():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("provider down")
+            yield
+
+        return run()
+
+    async def scenario():
+        return await asyncio.gather(
+            *[_read(await coalesce("key", start)) for _ in range(2)],
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(scenario())
+
+    assert [str(result) for result in results] == ["provider down"] * 2
+
+
+def test_rejected_leader_rejects_waiting_duplicates():
+    start, starts = _counting_run(["a"])
+
+    async def admit():
+        await asyncio.sleep(0.02)
+        raise ValueError("busy")
+
+    async def scenario():
+        return await asyncio.gather(
+            coalesce("key", start, admit),
+            coalesce("key", start, admit),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(scenario())
+
+    assert starts == []
+    assert [str(result) for result in results] == ["busy"] * 2
+    assert generation_service.get_coalescing_stats()["in_flight"] == 0
+
+
+def test_identical_chat_requests_call_the_model_once(use_model, scripted_model, finance_info):
+    seen = []
+    use_model(scripted_model(delay=0.01, seen=seen))
+
+    async def ask():
+        return [
+            frame
+            async for frame in process_agent_output(
+                "How much did I spend on food?", finance_info, []
+            )
+        ]
+
+    async def scenario():
+        return await asyncio.gather(ask(), ask())
+
+    first, second = asyncio.run(scenario())
+
+    assert len(seen) == 1
+    assert first == second
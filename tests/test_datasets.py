@@ -0,0 +1,103 @@
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from app.model.finance_model import FinanceInfo, Transaction
+from app.services import dataset_service
+from app.services.dataset_service import (
+    FinanceDataset,
+    SQLiteDatasetStore,
+    append_transactions,
+    create_dataset,
+)
+from app.services.utility_service import compute_finance_hash
+
+SECOND_ID = "6f1c2e0a-1111-4a8b-9c3d-000000000002"
+NEW_TRANSACTION = {
+    "id": "6f1c2e0a-1111-4a8b-9c3d-000000000001",
+    "date": "2025-11-05T10:00:00",
+    "type": "debit",
+    "title": "Swiggy",
+    "amount": 249.0,
+    "category": "other",
+}
+
+
+def test_dataset_lifecycle(use_model, scripted_model, export_bytes, run_app):
+    use_model(scripted_model())
+
+    async def scenario(client):
+        uploaded = (await client.post("/agent/datasets", content=export_bytes)).json()
+        dataset_id = uploaded["dataset_id"]
+        read = (await client.get(f"/agent/datasets/{dataset_id}")).json()
+        analytics = await client.get(f"/agent/datasets/{dataset_id}/analytics")
+        appended = (
+            await client.post(
+                f"/agent/datasets/{dataset_id}/transactions",
+                json={"transactions": [NEW_TRANSACTION]},
+            )
+        ).json()
+        chat = await client.post(
+            "/agent/chat",
+            json={
+                "user_query": "How much did I spend on food?",
+                "dataset_id": dataset_id,
+                "chat_history": [],
+                "new_transactions": [{**NEW_TRANSACTION, "id": SECOND_ID}],
+            },
+        )
+        after = (await client.get(f"/agent/datasets/{dataset_id}")).json()
+        deleted = await client.delete(f"/agent/datasets/{dataset_id}")
+        missing = await client.get(f"/agent/datasets/{dataset_id}")
+        return uploaded, read, analytics, appended, chat, after, deleted, missing
+
+    uploaded, read, analytics, appended, chat, after, deleted, missing = run_app(scenario)
+
+    inline = compute_finance_hash(FinanceInfo.model_validate_json(export_bytes))
+    total = len(json.loads(export_bytes)["transactions"])
+    assert uploaded["content_hash"] == inline
+    assert read == uploaded
+    assert analytics.status_code == 200
+    assert (appended["added"], appended["skipped"]) == (1, 0)
+    assert chat.status_code == 200
+    assert json.loads(chat.text.splitlines()[-1])["response_text"]
+    assert after["total_transactions"] == total + 2
+    assert after["content_hash"] != inline
+    assert deleted.status_code == 200
+    assert missing.status_code == 404
+
+
+def test_resent_transactions_without_an_id_are_skipped(finance_info):
+    dataset = FinanceDataset.create(finance_info)
+    anonymous = Transaction.model_validate({**NEW_TRANSACTION, "id": None})
+
+    first = dataset.append_transactions([anonymous])
+    again = dataset.append_transactions([anonymous.model_copy()])
+
+    assert len(first) == 1 and again == []
+    assert len(dataset.store) == len(finance_info.transactions) + 1
+
+
+def test_sqlite_reload_keeps_the_order_of_concurrent_appends(
+    monkeypatch, tmp_path, finance_info
+):
+    store = SQLiteDatasetStore(str(tmp_path / "datasets.sqlite3"))
+    monkeypatch.setattr(dataset_service, "_store", store)
+    dataset = create_dataset(finance_info)
+    batches = [
+        [
+            Transaction.model_validate(
+                {**NEW_TRANSACTION, "id": str(uuid.UUID(int=batch * 10 + i)), "amount": batch}
+            )
+            for i in range(5)
+        ]
+        for batch in range(1, 9)
+    ]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda batch: append_transactions(dataset, batch), batches))
+    reloaded = SQLiteDatasetStore(store.path).get(dataset.dataset_id)
+
+    rows = range(len(dataset.store))
+    assert [reloaded.store.row(i) for i in rows] == [dataset.store.row(i) for i in rows]
+    assert reloaded.content_hash == dataset.content_hash
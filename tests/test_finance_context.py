@@ -0,0 +1,64 @@
+import uuid
+from datetime import datetime, timedelta
+
+from app.services.finance_service import build_finance_summary, build_transaction_sample
+from app.services.transaction_service import TransactionStore, TransactionStoreBuilder
+from app.services.utility_service import estimate_tokens
+
+MERCHANTS = ["Swiggy", "Zomato", "Amazon", "Uber", "Netflix"]
+
+
+def _synthetic_store(rows: int) -> TransactionStore:
+    builder = TransactionStoreBuilder()
+    start = datetime(2024, 1, 1)
+    for i in range(rows):
+        builder.add(
+            uuid.UUID(int=i + 1),
+            start + timedelta(hours=i),
+            "debit",
+            MERCHANTS[i % len(MERCHANTS)],
+            100.0 + i,
+            "other",
+            None,
+            None,
+            None,
+            None,
+        )
+    return builder.build()
+
+
+def test_sample_stays_within_the_token_budget():
+    store = _synthetic_store(20_000)
+
+    sample = build_transaction_sample(store, 2_000, query="recent spending")
+
+    assert estimate_tokens(sample) <= 2_000
+    assert sample.startswith("Transaction details (")
+    assert "of 20000" in sample.splitlines()[0]
+    assert str(uuid.UUID(int=1)) not in sample
+
+
+def test_sample_ranks_query_matches_first_and_is_deterministic():
+    store = _synthetic_store(500)
+
+    sample = build_transaction_sample(store, 1_000, query="What did I pay Netflix?")
+
+    rows = sample.splitlines()[1:]
+    assert rows and all("Netflix" in row for row in rows[:10])
+    assert build_transaction_sample(store, 1_000, query="What did I pay Netflix?") == sample
+
+
+def test_sample_is_empty_when_no_row_fits():
+    assert build_transaction_sample(_synthetic_store(10), 1) == ""
+    assert build_transaction_sample(TransactionStore.empty(), 1_000) == ""
+
+
+def test_summary_covers_accounts_budgets_and_totals(finance_info):
+    summary = build_finance_summary(finance_info)
+
+    assert "Balance: -₹49,533.32" in summary
+    assert "Net worth across all accounts:" in summary
+    assert "Number: *7252" in summary and "XXXXXX7252" not in summary
+    assert "Budgets vs actual spending" in summary
+    assert "Monthly totals" in summary
+    assert f"Transactions ({len(finance_info.transactions)} total)" in summary
@@ -0,0 +1,173 @@
+import asyncio
+import copy
+import gc
+import json
+import threading
+
+import pytest
+from pydantic import ValidationError
+
+from app.model.finance_model import FinanceInfo
+from app.services import ingest_service
+from app.services.ingest_service import (
+    TransactionsDigest,
+    ingest_finance_json,
+    ingest_finance_stream,
+)
+from app.services.transaction_service import TransactionStore
+from app.services.utility_service import compute_finance_hash
+
+
+@pytest.fixture
+def export(export_bytes) -> dict:
+    document = json.loads(export_bytes)
+    rows = document["transactions"]
+    # Canonical values the fast path has to serialise like the model does
+    rows[0]["date"] = rows[0]["date"][:19] + ".5"
+    rows[1]["date"] = rows[1]["date"][:19] + ".000"
+    rows[2]["amount"] = 100
+    rows[3]["photos"] = ["receipt.jpg", 1, {"width": 2.5}]
+    rows[4].pop("location", None)
+    return document
+
+
+@pytest.fixture
+def lax_export(export) -> dict:
+    """An export the fast path rejects but the models accept."""
+    document = copy.deepcopy(export)
+    document["transactions"][5]["id"] = document["transactions"][5]["id"].upper()
+    document["transactions"][6]["amount"] = "12.5"
+    return document
+
+
+def _stream(payload: bytes, batch_size: int, digest: TransactionsDigest):
+    async def chunks():
+        for start in range(0, len(payload), 777):
+            yield payload[start : start + 777]
+
+    return asyncio.run(ingest_finance_stream(chunks(), batch_size=batch_size, digest=digest))
+
+
+def _assert_same_store(store: TransactionStore, finance_info: FinanceInfo) -> None:
+    expected = TransactionStore.from_finance_info(finance_info)
+    assert len(store) == len(expected)
+    assert [store.row(i) for i in range(len(store))] == [
+        expected.row(i) for i in range(len(expected))
+    ]
+
+
+@pytest.mark.parametrize("name", ["export", "lax_export"])
+def test_ingest_matches_model_validation(request, name):
+    payload = json.dumps(request.getfixturevalue(name)).encode()
+    expected = FinanceInfo.model_validate_json(payload)
+
+    finance_info, store = ingest_finance_json(payload)
+
+    assert finance_info.transactions is None
+    assert finance_info.accounts == expected.accounts
+    _assert_same_store(store, expected)
+
+
+def test_fast_path_falls_back_on_lax_values(lax_export, monkeypatch):
+    calls = []
+    build_store = ingest_service._build_store
+
+    def spy(*args, **kwargs):
+        try:
+            return build_store(*args, **kwargs)
+        except ingest_service._SlowPath:
+            calls.append("slow")
+            raise
+
+    monkeypatch.setattr(ingest_service, "_build_store", spy)
+    ingest_finance_json(json.dumps(lax_export).encode())
+
+    assert calls == ["slow"]
+
+
+def test_invalid_export_raises_validation_error(export):
+    export["transactions"][0]["amount"] = "lots"
+    with pytest.raises(ValidationError):
+        ingest_finance_json(json.dumps(export).encode())
+
+
+@pytest.mark.parametrize("name", ["export", "lax_export"])
+def test_upload_hash_matches_inline_hash(request, name):
+    payload = json.dumps(request.getfixturevalue(name)).encode()
+    inline = compute_finance_hash(FinanceInfo.model_validate_json(payload))
+
+    digest = TransactionsDigest()
+    finance_info, _ = ingest_finance_json(payload, digest)
+    assert compute_finance_hash(finance_info, digest.hexdigest()) == inline
+
+    # Small batches mix fast and slow batches in one stream
+    for batch_size in (3, 1000):
+        digest = TransactionsDigest()
+        finance_info, store = _stream(payload, batch_size, digest)
+        assert compute_finance_hash(finance_info, digest.hexdigest()) == inline
+        _assert_same_store(store, FinanceInfo.model_validate_json(payload))
+
+
+def _large_export(export: dict, rows: int) -> bytes:
+    template = export["transactions"]
+    document = {**export, "transactions": [template[i % len(template)] for i in range(rows)]}
+    return json.dumps(document).encode()
+
+
+def test_streamed_upload_keeps_the_event_loop_responsive(export):
+    payload = _large_export(export, 50_000)
+
+    async def chunks():
+        # Never awaits, so only the ingest itself can give the loop back
+        for start in range(0, len(payload), 64 * 1024):
+            yield payload[start : start + 64 * 1024]
+
+    async def scenario():
+        gaps = []
+        ingest = asyncio.ensure_future(ingest_finance_stream(chunks()))
+        while not ingest.done():
+            before = asyncio.get_running_loop().time()
+            await asyncio.sleep(0.005)
+            gaps.append(asyncio.get_running_loop().time() - before)
+        return await ingest, gaps
+
+    # A full collection pauses every thread; keep it out of the measurement
+    gc.collect()
+    (_, store), gaps = asyncio.run(scenario())
+
+    assert len(store) == 50_000
+    assert max(gaps) < 0.1
+
+
+def test_streamed_upload_reports_malformed_json(export_bytes):
+    async def chunks():
+        yield export_bytes[:-10]
+        yield b"not json"
+        # The parser fails before the body is fully read
+        for _ in range(100):
+            yield b" " * 1024
+
+    with pytest.raises(ValidationError) as info:
+        asyncio.run(ingest_finance_stream(chunks()))
+    assert info.value.errors()[0]["type"] == "json_invalid"
+
+
+def test_failed_upload_stops_the_parser_thread(export_bytes, monkeypatch):
+    stopped = threading.Event()
+    ingest_chunks = ingest_service.ingest_finance_chunks
+
+    def spy(*args):
+        try:
+            return ingest_chunks(*args)
+        finally:
+            stopped.set()
+
+    monkeypatch.setattr(ingest_service, "ingest_finance_chunks", spy)
+
+    async def chunks():
+        yield export_bytes[:100]
+        raise ConnectionResetError("client went away")
+
+    with pytest.raises(ConnectionResetError):
+        asyncio.run(ingest_finance_stream(chunks()))
+    assert stopped.wait(timeout=5)
@@ -0,0 +1,55 @@
+from app.model.finance_model import FinanceInfo
+from app.services.finance_service import format_amount
+from app.services.intent_service import answer_intent
+from app.services.transaction_service import TransactionStore
+
+
+def _answer(query, finance_info):
+    store = TransactionStore.from_finance_info(finance_info)
+    return answer_intent(query, finance_info, lambda: store)
+
+
+def test_format_amount_puts_the_sign_first():
+    assert format_amount(-49533.32) == "-₹49,533.32"
+    assert format_amount(1234.5) == "₹1,234.50"
+
+
+def test_balance_shows_negative_accounts_sign_first(finance_info):
+    answer = _answer("what is my balance", finance_info)
+
+    assert "-₹49,533.32" in answer
+    assert "₹-" not in answer
+
+
+def test_recent_transactions_fall_back_to_the_title():
+    finance_info = FinanceInfo.model_validate(
+        {
+            "transactions": [
+                {
+                    "id": "6f1c2e0a-1111-4a8b-9c3d-000000000001",
+                    "date": "2025-03-02T10:00:00",
+                    "type": "credit",
+                    "title": "Salary March",
+                    "amount": 85000,
+                    "category": "other",
+                }
+            ]
+        }
+    )
+
+    answer = _answer("show my last transaction", finance_info)
+
+    assert answer.splitlines()[-1].startswith("1. 2025-03-02 10:00 | credit | ₹85,000.00")
+    assert "Salary March" in answer
+    assert "Unknown" not in answer
+
+
+def test_intent_stats_route(run_app):
+    async def scenario(client):
+        response = await client.get("/agent/intent/stats")
+        return response.status_code, response.json()
+
+    status, stats = run_app(scenario)
+
+    assert status == 200
+    assert {"queries", "hits", "fallbacks", "by_intent"} <= set(stats)
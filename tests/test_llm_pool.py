@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from app.configs.model_config import LLMModelName
+from app.services import llm_service
+from app.services.agent_services import FinanceAgentService, warm_up_agents
+from app.services.model_router_service import get_model_router
+from app.services.resilience_service import FALLBACK_MODELS
+
+
+@pytest.fixture
+def fresh_pool(monkeypatch):
+    """Empty client and provider pools, so closing them does not affect other tests."""
+    monkeypatch.setattr(llm_service, "_http_clients", {})
+    monkeypatch.setattr(llm_service, "_providers", {})
+
+
+def test_http_client_is_shared_per_provider(fresh_pool):
+    openai = llm_service.get_http_client("openai")
+
+    assert llm_service.get_http_client("openai") is openai
+    assert llm_service.get_http_client("google") is not openai
+
+
+def test_models_of_a_provider_share_its_provider_and_client(fresh_pool):
+    mini = llm_service.openai_model(LLMModelName.GPT_4O_MINI)
+    reasoning = llm_service.openai_model(LLMModelName.GPT_5_MINI)
+
+    assert mini._provider is reasoning._provider
+    assert mini.client._client is llm_service.get_http_client("openai")
+
+
+def test_close_http_clients_empties_the_pools(fresh_pool):
+    client = llm_service.get_http_client("openai")
+    llm_service.openai_model(LLMModelName.GPT_4O_MINI)
+
+    asyncio.run(llm_service.close_http_clients())
+
+    assert client.is_closed
+    assert llm_service._providers == {}
+    assert llm_service.get_http_client("openai") is not client
+
+
+def test_warm_up_builds_one_agent_per_routed_model():
+    ready = warm_up_agents()
+
+    expected = get_model_router().models() + [
+        model for model in FALLBACK_MODELS if model not in get_model_router().models()
+    ]
+    assert ready == [model.value for model in expected]
+    for model in get_model_router().models():
+        assert FinanceAgentService.get_agent(model) is FinanceAgentService.get_agent(model)
+    assert FinanceAgentService.get_agent() is FinanceAgentService.get_agent(
+        get_model_router().default_model()
+    )
@@ -0,0 +1,73 @@
+import pytest
+
+from app.configs.model_config import MODEL_COSTS_PER_1M, LLMModelName
+from app.services.llm_service import openai_model
+from app.services.model_router_service import ModelRouter, get_model_router
+
+TIER_MODELS = {
+    "fast": LLMModelName.GEMINI_2_0_FLASH_LITE,
+    "standard": LLMModelName.GPT_4O_MINI,
+    "strong": LLMModelName.GPT_5_MINI,
+}
+
+
+@pytest.mark.parametrize(
+    "query, history, rows, tier, reason",
+    [
+        ("hi", 0, 0, "fast", "small_talk"),
+        ("ok thanks!", 0, 0, "fast", "small_talk"),
+        ("How much did I spend on food?", 0, 0, "standard", "default"),
+        ("Why did my spending go up?", 0, 0, "strong", "analysis"),
+        ("Compare March and April", 0, 0, "strong", "analysis"),
+        (" ".join(["spent"] * 31), 0, 0, "strong", "long_query"),
+        ("What was the total?", 8, 6000, "strong", "large_context"),
+        ("What was the total?", 8, 10, "standard", "default"),
+    ],
+)
+def test_queries_are_routed_by_their_wording_and_context(query, history, rows, tier, reason):
+    route = ModelRouter(TIER_MODELS).route(query, history, rows)
+
+    assert (route.tier, route.model, route.reason) == (tier, TIER_MODELS[tier], reason)
+
+
+def test_default_fast_tier_is_cheaper_than_standard():
+    router = get_model_router()
+
+    fast, standard = router.tier_models["fast"], router.tier_models["standard"]
+    assert fast != standard
+    assert MODEL_COSTS_PER_1M[fast][0] < MODEL_COSTS_PER_1M[standard][0]
+
+
+def test_small_talk_goes_to_standard_without_a_fast_tier():
+    router = ModelRouter({"standard": TIER_MODELS["standard"]})
+
+    route = router.route("hello")
+
+    assert (route.tier, route.reason) == ("standard", "small_talk")
+    assert router.models() == [TIER_MODELS["standard"]]
+
+
+def test_slow_tier_is_downgraded():
+    router = ModelRouter(TIER_MODELS, latency_slos={"strong": 2.0})
+    for _ in range(20):
+        router.record_latency(TIER_MODELS["strong"], 5.0)
+
+    route = router.route("Why did my spending go up?")
+
+    assert (route.tier, route.reason) == ("standard", "analysis+latency_slo")
+    assert router.stats()["decisions"] == {
+        "standard:gpt-4o-mini-2024-07-18:analysis+latency_slo": 1
+    }
+
+
+def test_expensive_tier_is_downgraded():
+    router = ModelRouter(TIER_MODELS, max_request_cost=0.005)
+
+    route = router.route("Why did my spending go up?")
+
+    assert route.tier == "standard" and route.reason.endswith("+cost_slo")
+
+
+def test_reasoning_models_are_built_without_a_temperature():
+    assert openai_model(LLMModelName.GPT_5_MINI).settings is None
+    assert openai_model(LLMModelName.GPT_4O_MINI).settings == {"temperature": 0.7}
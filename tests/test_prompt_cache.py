@@ -0,0 +1,87 @@
+import asyncio
+import json
+import uuid
+
+import httpx
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.models.google import GoogleModel
+from pydantic_ai.providers.google import GoogleProvider
+
+from app.services import prompt_cache_service
+from app.services.prompt_cache_service import GeminiContextCacheModel, get_prompt_cache_stats
+
+CACHE_NAME = "cachedContents/finance-summary"
+
+
+def _gemini_api(requests):
+    """A Gemini API that records request bodies and answers every call."""
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content or b"{}")
+        requests.append((request.url.path, body))
+        if request.url.path.endswith("/cachedContents"):
+            return httpx.Response(200, json={"name": CACHE_NAME})
+        return httpx.Response(
+            200,
+            json={
+                "candidates": [
+                    {"content": {"role": "model", "parts": [{"text": "ok"}]}, "finishReason": "STOP"}
+                ],
+                "usageMetadata": {"promptTokenCount": 10, "candidatesTokenCount": 1},
+            },
+        )
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handle))
+
+
+# The service silences this expected warning; pytest resets warning filters
+@pytest.mark.filterwarnings("ignore:`google_cached_content` is set")
+def test_repeated_instructions_are_served_from_cached_content(monkeypatch):
+    monkeypatch.setattr(prompt_cache_service, "GEMINI_CONTEXT_CACHE_MIN_TOKENS", 10)
+    requests = []
+    provider = GoogleProvider(api_key="test", http_client=_gemini_api(requests))
+    model = GeminiContextCacheModel(GoogleModel("gemini-2.0-flash", provider=provider))
+    # Unique instructions, so no cache entry of another test is reused
+    agent = Agent(model, instructions=f"Finance summary {uuid.uuid4()}. " * 20)
+
+    @agent.tool_plain
+    def balance() -> str:
+        """Return the account balance."""
+        return "₹1,200"
+
+    before = get_prompt_cache_stats()["gemini_context_cache"]
+
+    async def two_turns():
+        await agent.run("What is my balance?")
+        await asyncio.gather(*prompt_cache_service._tasks)
+        await agent.run("And last month?")
+
+    asyncio.run(two_turns())
+
+    (_, first), (create_path, created), (_, second) = requests
+    after = get_prompt_cache_stats()["gemini_context_cache"]
+    # The first turn is sent whole while the cache is created in the background
+    assert {"systemInstruction", "tools"} <= set(first) and "cachedContent" not in first
+    assert create_path.endswith("/cachedContents")
+    assert created["systemInstruction"] == first["systemInstruction"]
+    assert created["tools"] == first["tools"]
+    # The next turn references the cache instead of resending its contents
+    assert second["cachedContent"] == CACHE_NAME
+    assert not {"systemInstruction", "tools", "toolConfig"} & set(second)
+    assert after["creations"] == before["creations"] + 1
+    assert after["hits"] == before["hits"] + 1
+
+
+def test_short_instructions_are_sent_uncached():
+    requests = []
+    provider = GoogleProvider(api_key="test", http_client=_gemini_api(requests))
+    agent = Agent(
+        GeminiContextCacheModel(GoogleModel("gemini-2.0-flash", provider=provider)),
+        instructions="Answer briefly.",
+    )
+
+    asyncio.run(agent.run("Hi"))
+
+    assert [path for path, _ in requests] == ["/v1beta/models/gemini-2.0-flash:generateContent"]
+    assert "cachedContent" not in requests[0][1]
@@ -0,0 +1,75 @@
+import pytest
+
+from app.configs.prompt import PROMPT_SECTIONS, PROMPT_TEMPLATES
+from app.services.model_router_service import TIERS
+from app.services.prompt_template_service import (
+    PromptRegistry,
+    compile_template,
+    get_prompt_registry,
+)
+
+# Figures of the sample financial context the prompt used to embed
+SAMPLE_FIGURES = ("49,533.32", "89,666.68", "54,868.00", "57,679.02", "39329492349234")
+
+
+def test_v2_compiles_tier_specific_sections():
+    compiled = compile_template("finance", "v2", PROMPT_TEMPLATES["finance"]["v2"])
+
+    assert set(compiled) == set(TIERS)
+    assert "greetings" in compiled["fast"].sections
+    assert "examples" not in compiled["fast"].sections
+    assert "examples" in compiled["strong"].sections
+    assert "greetings" not in compiled["strong"].sections
+    # Tier-specific sections only make the shared prompt shorter
+    full = compile_template("finance", "v1", PROMPT_TEMPLATES["finance"]["v1"])
+    assert all(compiled[tier].tokens < full[tier].tokens for tier in TIERS)
+    assert compiled["standard"].key == "finance:v2:standard"
+
+
+def test_compiled_text_keeps_the_template_order():
+    prompt = compile_template("finance", "v1", PROMPT_TEMPLATES["finance"]["v1"])["standard"]
+
+    positions = [prompt.text.index(PROMPT_SECTIONS[name]) for name in prompt.sections]
+    assert positions == sorted(positions)
+
+
+def test_prompts_hold_no_sample_financial_data():
+    registry = get_prompt_registry()
+    for template, versions in PROMPT_TEMPLATES.items():
+        for version in versions:
+            for tier in TIERS:
+                text = registry.get(template, version, tier).text
+                assert not [figure for figure in SAMPLE_FIGURES if figure in text]
+
+
+def test_unknown_section_or_version_is_rejected():
+    with pytest.raises(KeyError):
+        compile_template("finance", "v9", [("missing", None)])
+    with pytest.raises(KeyError):
+        PromptRegistry(PROMPT_TEMPLATES, "finance", ["v9"])
+
+
+def test_versions_are_assigned_by_a_stable_key():
+    registry = PromptRegistry(PROMPT_TEMPLATES, "finance", ["v1", "v2"])
+    keys = [f"dataset-{i}" for i in range(40)]
+
+    first = [registry.select("standard", key).version for key in keys]
+    again = [registry.select("standard", key).version for key in keys]
+
+    assert first == again
+    assert set(first) == {"v1", "v2"}
+    assert registry.select("standard").version == "v1"
+
+
+def test_stats_report_runs_and_latency_per_prompt():
+    registry = PromptRegistry(PROMPT_TEMPLATES, "finance", ["v2"])
+    prompt = registry.select("fast")
+    registry.record_request(prompt)
+    registry.record_latency(prompt, 0.2)
+
+    stats = registry.stats()["prompts"]
+
+    assert stats["finance:v2:fast"]["requests"] == 1
+    assert stats["finance:v2:fast"]["time_to_first_token"]["p50"] == 0.2
+    assert stats["finance:v1:fast"]["requests"] == 0
+    assert stats["finance:v1:fast"]["time_to_first_token"] is None
@@ -0,0 +1,102 @@
+import asyncio
+import uuid
+
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.models.function import FunctionModel
+
+from app.services.resilience_service import (
+    EmptyStreamError,
+    StreamCandidate,
+    get_circuit_breaker,
+    get_resilience_stats,
+    hedged_stream,
+)
+
+
+def _provider() -> str:
+    """A provider name of its own, so circuit state does not leak between tests."""
+    return f"test-{uuid.uuid4().hex[:8]}"
+
+
+def _candidate(model: FunctionModel, name: str) -> StreamCandidate:
+    agent = Agent(model)
+
+    async def start():
+        async with agent.run_stream("How much did I spend on food?") as result:
+            async for delta in result.stream_text(delta=True):
+                yield delta
+
+    return StreamCandidate(_provider(), name, start)
+
+
+def _failing_model() -> FunctionModel:
+    async def stream(messages, info):
+        raise RuntimeError("provider unavailable")
+        yield  # pragma: no cover
+
+    return FunctionModel(stream_function=stream)
+
+
+def _empty_candidate() -> StreamCandidate:
+    async def start():
+        return
+        yield  # pragma: no cover
+
+    return StreamCandidate(_provider(), "empty", start)
+
+
+def _run(candidates, hedge_delay=None):
+    winners = []
+
+    async def collect():
+        frames = [
+            frame async for frame in hedged_stream(candidates, hedge_delay, winners.append)
+        ]
+        return "".join(frames)
+
+    return asyncio.run(collect()), [winner.name for winner in winners]
+
+
+def test_slow_primary_is_hedged_by_the_fallback(scripted_model):
+    slow = _candidate(scripted_model("slow answer", delay=1.0), "slow")
+    fast = _candidate(scripted_model("fast answer"), "fast")
+    hedges = get_resilience_stats()["hedges"]
+
+    text, winners = _run([slow, fast], hedge_delay=0.05)
+
+    assert (text, winners) == ("fast answer", ["fast"])
+    assert get_resilience_stats()["hedges"] == hedges + 1
+
+
+def test_failing_primary_fails_over_and_opens_its_circuit(scripted_model):
+    fallback = _candidate(scripted_model("fallback answer"), "fallback")
+    failovers = get_resilience_stats()["failovers"]
+    provider = _provider()
+
+    for _ in range(3):
+        failing = _candidate(_failing_model(), "failing")
+        failing.provider = provider
+        text, winners = _run([failing, fallback])
+        assert (text, winners) == ("fallback answer", ["fallback"])
+
+    assert get_resilience_stats()["failovers"] == failovers + 3
+    assert get_circuit_breaker(provider).state == "open"
+    assert get_circuit_breaker(fallback.provider).stats()["successes"] == 3
+
+
+def test_empty_stream_does_not_win_the_hedge(scripted_model):
+    empty = _empty_candidate()
+    fallback = _candidate(scripted_model("fallback answer", delay=0.05), "fallback")
+
+    text, winners = _run([empty, fallback], hedge_delay=0.01)
+
+    assert (text, winners) == ("fallback answer", ["fallback"])
+    assert get_circuit_breaker(empty.provider).stats()["failures"] == 1
+
+
+def test_empty_stream_without_fallback_raises():
+    empty = _empty_candidate()
+
+    with pytest.raises(EmptyStreamError):
+        _run([empty])
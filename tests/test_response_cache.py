@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from app.model.agent_model import ChatMessage
+from app.services import response_cache_service
+from app.services.agent_services import process_agent_output
+from app.services.response_cache_service import lookup_response, store_response
+
+MODEL = "gpt-4.1-mini"
+HASH = "a" * 64
+QUERY = "How much did I spend on Swiggy in March?"
+HISTORY = [
+    ChatMessage(role="user", content="Hi"),
+    ChatMessage(role="assistant", content="Hello! How can I help?"),
+]
+
+
+@pytest.fixture(autouse=True)
+def response_cache(monkeypatch):
+    monkeypatch.setattr(response_cache_service, "RESPONSE_CACHE_ENABLED", True)
+    response_cache_service._exact_cache.clear()
+    response_cache_service._semantic_cache.clear()
+    yield
+    response_cache_service._exact_cache.clear()
+    response_cache_service._semantic_cache.clear()
+
+
+def test_exact_hit_ignores_case_and_punctuation():
+    store_response(MODEL, HASH, QUERY, HISTORY, "₹414.00")
+
+    hit = lookup_response(MODEL, HASH, "how much did i spend on swiggy in march", HISTORY)
+    assert hit == "₹414.00"
+
+
+@pytest.mark.parametrize(
+    "model, finance_hash, history",
+    [
+        ("gemini-2.5-flash", HASH, HISTORY),
+        (MODEL, "b" * 64, HISTORY),
+        (MODEL, HASH, HISTORY[:1]),
+        (MODEL, HASH, []),
+    ],
+    ids=["model", "finance_hash", "history", "no_history"],
+)
+def test_answers_are_partitioned(model, finance_hash, history):
+    store_response(MODEL, HASH, QUERY, HISTORY, "₹414.00")
+
+    assert lookup_response(model, finance_hash, QUERY, history) is None
+
+
+def test_disabled_cache_never_answers(monkeypatch):
+    store_response(MODEL, HASH, QUERY, HISTORY, "₹414.00")
+    monkeypatch.setattr(response_cache_service, "RESPONSE_CACHE_ENABLED", False)
+
+    assert lookup_response(MODEL, HASH, QUERY, HISTORY) is None
+
+
+def test_semantic_tier_requires_the_same_numbers(monkeypatch):
+    monkeypatch.setattr(response_cache_service, "SEMANTIC_CACHE_ENABLED", True)
+    store_response(MODEL, HASH, "What did I spend on Swiggy in 2024?", [], "₹9,100.00")
+
+    assert lookup_response(MODEL, HASH, "what was my spend on swiggy in 2024", []) == "₹9,100.00"
+    assert lookup_response(MODEL, HASH, "what was my spend on swiggy in 2023", []) is None
+
+
+def test_stream_modes_share_cached_answers(use_model, scripted_model, finance_info):
+    seen = []
+    use_model(scripted_model("You spent ₹414.00 at Swiggy.", seen=seen))
+
+    async def ask(stream_mode):
+        return [
+            frame
+            async for frame in process_agent_output(
+                QUERY, finance_info, [], stream_mode=stream_mode
+            )
+        ]
+
+    asyncio.run(ask("full"))
+    delta = asyncio.run(ask("delta"))
+
+    assert len(seen) == 1
+    assert '"done":true' in delta[-1]
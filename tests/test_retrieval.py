@@ -0,0 +1,85 @@
+import numpy as np
+
+from app.model.finance_model import FinanceInfo, Transaction
+from app.services import dataset_service, retrieval_service
+from app.services.dataset_service import (
+    FinanceDataset,
+    SQLiteDatasetStore,
+    append_transactions,
+    create_dataset,
+)
+from app.services.retrieval_service import IndexSegment, TransactionIndex, get_transaction_index
+
+NETFLIX = {
+    "id": "6f1c2e0a-3333-4a8b-9c3d-000000000001",
+    "date": "2025-11-05T08:00:00",
+    "type": "debit",
+    "title": "Netflix",
+    "amount": 649.0,
+    "category": "other",
+}
+
+
+def _merchants(store, rows):
+    return [store.row(int(row))["merchant"] for row in rows]
+
+
+def test_bm25_ranks_rarer_terms_first_and_fills_with_recent_rows(finance_info):
+    dataset = FinanceDataset.create(finance_info)
+    index = TransactionIndex(dataset.store)
+
+    # One SANJIT KUMAR payment against two AMAZON PAY ones: the rarer term wins
+    ranked = index.search(["amazon", "sanjit"], 3)
+    assert _merchants(dataset.store, ranked) == ["SANJIT KUMAR", "AMAZON PAY", "AMAZON PAY"]
+    assert np.array_equal(index.search(["amazon", "sanjit"], 3), ranked)
+
+    # Prefixes expand to indexed terms; leftover slots go to the newest rows
+    ranked = index.search(["amaz"], 4)
+    assert _merchants(dataset.store, ranked[:2]) == ["AMAZON PAY", "AMAZON PAY"]
+    newest = int(np.argmax(dataset.store.dates))
+    assert ranked[2] == newest
+
+
+def test_append_indexes_a_copy_and_leaves_the_shared_index(export_bytes):
+    appended = FinanceDataset.create(FinanceInfo.model_validate_json(export_bytes))
+    untouched = FinanceDataset.create(FinanceInfo.model_validate_json(export_bytes))
+    assert appended.content_hash == untouched.content_hash
+    shared = get_transaction_index(untouched.store, untouched.content_hash)
+    before = shared.search(["netflix", "swiggy"], 5)
+
+    appended.append_transactions([Transaction.model_validate(NETFLIX)])
+
+    index = get_transaction_index(appended.store, appended.content_hash)
+    assert index is not shared
+    assert len(index.segments) == 2 and index.segments[0] is shared.segments[0]
+    assert index.search(["netflix"], 1).tolist() == [len(untouched.store)]
+    assert get_transaction_index(untouched.store, untouched.content_hash) is shared
+    assert (shared.rows, len(shared.segments)) == (len(untouched.store), 1)
+    assert np.array_equal(shared.search(["netflix", "swiggy"], 5), before)
+
+
+def test_sqlite_reload_uses_the_persisted_segments(monkeypatch, tmp_path, finance_info):
+    store = SQLiteDatasetStore(str(tmp_path / "datasets.sqlite3"))
+    monkeypatch.setattr(dataset_service, "_store", store)
+    dataset = create_dataset(finance_info)
+    append_transactions(dataset, [Transaction.model_validate(NETFLIX)])
+    expected = get_transaction_index(dataset.store, dataset.content_hash).search(
+        ["netflix", "amazon"], 4
+    )
+
+    # A fresh process: nothing cached, and no segment may be rebuilt
+    retrieval_service._index_cache.pop(dataset.content_hash)
+    built = []
+    original_build = IndexSegment.build
+    monkeypatch.setattr(
+        IndexSegment, "build", classmethod(lambda cls, *a: built.append(a) or original_build(*a))
+    )
+    reloaded = SQLiteDatasetStore(store.path).get(dataset.dataset_id)
+
+    index = get_transaction_index(reloaded.store, reloaded.content_hash)
+    assert built == []
+    assert [(s.start, s.end) for s in index.segments] == [
+        (0, len(finance_info.transactions)),
+        (len(finance_info.transactions), len(dataset.store)),
+    ]
+    assert np.array_equal(index.search(["netflix", "amazon"], 4), expected)
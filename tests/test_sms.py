@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from app.services import sms_service
+from app.services.sms_service import MessageFields, parse_messages, parse_transaction_messages
+
+INDIAN_BANK = "Indian Bank"
+
+# SMS and description of transactions in the bundled sample export
+SAMPLES = [
+    (
+        "A/c *7252 debited Rs. 50000.00 on 04-11-25 to SK MABUD  AL. UPI:589061111461. "
+        "Not you? SMS BLOCK to 9289592895, Dial 1930 for Cyber Fraud - Indian Bank",
+        "Transaction (7252)\nRef: 589061111461",
+        MessageFields("SK MABUD AL", "589061111461", "*7252", None, INDIAN_BANK),
+    ),
+    (
+        "Your A/c XXX5557252  is credited by Rs. 54,800 Total Bal : Rs. 58,117.30 CR  "
+        "Clr Bal : Rs. 58,117.30 CR as on:03/11/2025 22:06 -IndianBank",
+        "Transaction (7252)",
+        MessageFields(None, None, "*7252", 58117.30, INDIAN_BANK),
+    ),
+    (
+        "Rs.108.00 credited to a/c *7252 on 02/11/2025 by a/c linked to VPA "
+        "swiggy.refunds@axisbank (UPI Ref no 504778163065).Indian Bank",
+        "Transaction (7252)",
+        MessageFields("swiggy.refunds", "504778163065", "*7252", None, INDIAN_BANK),
+    ),
+    (
+        "Dear Swiggy customer, your refund reference number for Rs 108 is "
+        "245170207223-1-R1. https://r.swiggy.com/refunds",
+        "Transaction",
+        MessageFields("Swiggy", None, None, None, None),
+    ),
+    (
+        "Refund of Rs 108 has been initiated for Swiggy order 221061275962868. "
+        "Updated balance should reflect in 2 hours. https://r.swiggy.com/refunds",
+        "Transaction",
+        MessageFields("Swiggy", None, None, None, None),
+    ),
+    (
+        None,
+        "Transaction (7252)\nRef: 807631716690",
+        MessageFields(None, "807631716690", "*7252", None, None),
+    ),
+]
+
+
+@pytest.mark.parametrize("sms, description, expected", SAMPLES)
+def test_sample_messages_are_parsed(sms, description, expected):
+    assert parse_transaction_messages([b""], [sms], [description]) == [expected]
+
+
+def test_balances_are_signed_and_bank_aliases_resolved():
+    assert parse_messages(["Bal: Rs.500 DR - HDFC Bank", "Avl Bal INR 1,234.00 via Kotak"]) == [
+        MessageFields(None, None, None, -500.0, "HDFC Bank"),
+        MessageFields(None, None, None, 1234.0, "Kotak Mahindra Bank"),
+    ]
+
+
+def test_batch_parsing_matches_parsing_one_by_one(export_bytes):
+    transactions = json.loads(export_bytes)["transactions"]
+    texts = [f"{t['smsContent']}\n{t['description']}" for t in transactions] + [None, ""]
+
+    batch = parse_messages(texts)
+
+    assert batch == [parse_messages([text])[0] for text in texts]
+    assert batch[-2:] == [sms_service._EMPTY, sms_service._EMPTY]
+
+
+def test_parsed_fields_are_cached_per_id_until_the_text_changes(monkeypatch):
+    calls = []
+    parse = sms_service.parse_messages
+    monkeypatch.setattr(
+        sms_service, "parse_messages", lambda texts: calls.append(texts) or parse(texts)
+    )
+    raw_id = b"sms-cache-test-id"
+    sms = SAMPLES[0][0]
+
+    first = parse_transaction_messages([raw_id], [sms], [None])
+    again = parse_transaction_messages([raw_id], [sms], [None])
+    edited = parse_transaction_messages([raw_id], [sms.replace("SK MABUD  AL", "Zomato")], [None])
+
+    assert first == again
+    assert edited[0].merchant == "Zomato"
+    assert len(calls) == 2
@@ -0,0 +1,70 @@
+import json
+
+ANSWER = "You spent ₹1,200 on food."
+
+
+def _events(text):
+    """(id, data) of every SSE event that carries data."""
+    events = []
+    for block in text.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        if "data" in fields:
+            events.append((fields.get("id"), json.loads(fields["data"])))
+    return events
+
+
+def _body(finance_info):
+    return {
+        "user_query": "How much did I spend on food?",
+        "finance_info": finance_info.model_dump(mode="json", by_alias=True),
+        "chat_history": [],
+    }
+
+
+def test_sse_resumes_after_last_event_id(use_model, scripted_model, finance_info, run_app):
+    seen = []
+    # Slower than the output debounce, so the answer spans several events
+    use_model(scripted_model(ANSWER, delay=0.12, seen=seen))
+
+    async def scenario(client):
+        response = await client.post("/agent/chat/sse", json=_body(finance_info))
+        generation_id = response.headers["x-generation-id"]
+        events = _events(response.text)
+        resumed = await client.get(
+            f"/agent/chat/sse/{generation_id}", headers={"Last-Event-ID": events[0][0]}
+        )
+        return generation_id, events, _events(resumed.text)
+
+    generation_id, events, resumed = run_app(scenario)
+
+    assert len(events) > 2
+    assert [event_id for event_id, _ in events] == [
+        f"{generation_id}:{seq}" for seq in range(len(events))
+    ]
+    assert events[-1][1]["done"] is True
+    assert events[-1][1]["response_text"] == ANSWER
+    # The rest of the buffered generation, without a second model run
+    assert resumed == events[1:]
+    assert len(seen) == 1
+
+
+def test_sse_resume_rejects_unknown_generations(run_app):
+    async def scenario(client):
+        unknown = await client.get("/agent/chat/sse/nope")
+        return unknown.status_code
+
+    assert run_app(scenario) == 404
+
+
+def test_sse_resume_rejects_foreign_event_ids(use_model, scripted_model, finance_info, run_app):
+    use_model(scripted_model(ANSWER))
+
+    async def scenario(client):
+        response = await client.post("/agent/chat/sse", json=_body(finance_info))
+        generation_id = response.headers["x-generation-id"]
+        resumed = await client.get(
+            f"/agent/chat/sse/{generation_id}", headers={"Last-Event-ID": "other:0"}
+        )
+        return resumed.status_code
+
+    assert run_app(scenario) == 400
@@ -0,0 +1,101 @@
+import pytest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import StatusCode
+from prometheus_client import REGISTRY
+
+from app.services import telemetry_service
+from app.services.telemetry_service import stage
+
+CHAT_STAGES = {"validate", "prompt", "history", "agent", "first_token", "stream"}
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    """Finished spans of the test, recorded in memory."""
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(telemetry_service, "_tracer", provider.get_tracer(__name__))
+    yield exporter.get_finished_spans
+    provider.shutdown()
+
+
+def _chat(run_app, finance_info, *paths):
+    body = {
+        "user_query": "How much did I spend on food?",
+        "finance_info": finance_info.model_dump(mode="json", by_alias=True),
+        "chat_history": [],
+    }
+
+    async def scenario(client):
+        chat = await client.post("/agent/chat", json=body)
+        return [chat] + [await client.get(path) for path in paths]
+
+    return run_app(scenario)
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_chat_stages_are_spans_of_the_request(
+    spans, use_model, scripted_model, finance_info, run_app
+):
+    use_model(scripted_model())
+
+    (chat,) = _chat(run_app, finance_info)
+
+    assert chat.status_code == 200
+    (request,) = [span for span in spans() if span.name == "POST chat"]
+    stages = {
+        span.name.removeprefix("chat."): span
+        for span in spans()
+        if span.name.startswith("chat.")
+    }
+    assert CHAT_STAGES <= set(stages)
+    assert all(span.context.trace_id == request.context.trace_id for span in stages.values())
+    assert stages["agent"].parent.span_id == request.context.span_id
+    assert stages["stream"].attributes["frames"] > 0
+    assert request.attributes["http.response.status_code"] == 200
+    assert [event.name for event in request.events] == ["usage"]
+
+
+def test_metrics_endpoint_exports_request_stage_and_token_metrics(
+    use_model, scripted_model, finance_info, run_app
+):
+    use_model(scripted_model())
+    requests = "finance_bro_http_request_duration_seconds_count"
+    agent_stage = "finance_bro_stage_duration_seconds_count"
+    before = (
+        _sample(requests, method="POST", handler="chat", status="200"),
+        _sample(agent_stage, stage="agent"),
+    )
+
+    chat, metrics = _chat(run_app, finance_info, "/metrics")
+
+    assert chat.status_code == metrics.status_code == 200
+    assert metrics.headers["content-type"].startswith("text/plain")
+    assert _sample(requests, method="POST", handler="chat", status="200") == before[0] + 1
+    assert _sample(agent_stage, stage="agent") == before[1] + 1
+    for family in (
+        "finance_bro_tokens_total",
+        "finance_bro_time_to_first_token_seconds",
+        "finance_bro_cache_hits_total",
+        "finance_bro_admission_requests_total",
+    ):
+        assert f"\n{family}" in metrics.text
+
+
+def test_failed_stage_is_timed_and_marked_as_an_error(spans):
+    before = _sample("finance_bro_stage_duration_seconds_count", stage="unit")
+
+    with pytest.raises(RuntimeError):
+        with stage("unit", rows=3):
+            raise RuntimeError("boom")
+
+    (span,) = spans()
+    assert span.name == "chat.unit" and span.attributes["rows"] == 3
+    assert span.status.status_code == StatusCode.ERROR
+    assert _sample("finance_bro_stage_duration_seconds_count", stage="unit") == before + 1
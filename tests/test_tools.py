@@ -0,0 +1,113 @@
+import asyncio
+import json
+from collections import defaultdict
+from datetime import datetime
+
+import pytest
+from pydantic_ai.messages import ToolReturnPart
+from pydantic_ai.models.function import DeltaToolCall, FunctionModel
+
+from app.services.agent_services import process_agent_output
+from app.services.transaction_service import TransactionStore
+
+
+@pytest.fixture
+def store(finance_info):
+    return TransactionStore.from_finance_info(finance_info)
+
+
+def _expected_total(finance_info, keep):
+    return round(sum(trans.amount for trans in finance_info.transactions if keep(trans)), 2)
+
+
+def test_filter_matches_a_row_by_row_scan(store, finance_info):
+    start, end = datetime(2025, 11, 1), datetime(2025, 11, 4, 23, 59, 59)
+
+    rows = store.filter(start, end, type="debit")
+
+    def keep(trans):
+        return trans.type.value == "debit" and start <= trans.date <= end
+
+    assert len(rows) == sum(map(keep, finance_info.transactions))
+    assert store.total(rows) == _expected_total(finance_info, keep)
+
+
+def test_search_and_merchant_filters_are_case_insensitive(store, finance_info):
+    merchant = next(
+        trans.title
+        for trans in finance_info.transactions
+        if trans.title.lower() not in ("payment", "money received")
+    )
+
+    by_merchant = store.filter(merchant=merchant.upper())
+    by_search = store.filter(search=merchant.lower())
+
+    assert len(by_merchant) >= 1
+    assert set(by_merchant.tolist()) <= set(by_search.tolist())
+
+
+def test_group_by_month_sums_every_type(store, finance_info):
+    expected = defaultdict(float)
+    for trans in finance_info.transactions:
+        expected[trans.date.strftime("%Y-%m")] += trans.amount
+
+    sums = store.group_by(store.filter(), "month")
+    counts = store.group_by(store.filter(), "month", "count")
+
+    assert sums == {month: round(total, 2) for month, total in sorted(expected.items())}
+    assert sum(counts.values()) == len(finance_info.transactions)
+
+
+def _tool_calling_model(tool, args, returns):
+    """A FunctionModel that calls one tool, records its result and answers."""
+
+    async def stream(messages, info):
+        results = [
+            part
+            for message in messages
+            for part in getattr(message, "parts", [])
+            if isinstance(part, ToolReturnPart) and part.tool_name == tool
+        ]
+        if not results:
+            yield {0: DeltaToolCall(name=tool, json_args=json.dumps(args))}
+            return
+        returns.append(results[0].content)
+        output = info.output_tools[0].name
+        yield {0: DeltaToolCall(name=output, json_args='{"response_text": "Done."}')}
+
+    return FunctionModel(stream_function=stream)
+
+
+def _ask(finance_info, query):
+    async def collect():
+        return [frame async for frame in process_agent_output(query, finance_info, [])]
+
+    return asyncio.run(collect())
+
+
+def test_agent_totals_come_from_the_filter_tool(use_model, finance_info):
+    returns = []
+    use_model(_tool_calling_model("filter_transactions", {"type": "debit", "limit": 3}, returns))
+
+    frames = _ask(finance_info, "How much did I spend in total?")
+
+    (result,) = returns
+    assert result["count"] == sum(t.type.value == "debit" for t in finance_info.transactions)
+    assert result["total_amount"] == _expected_total(
+        finance_info, lambda trans: trans.type.value == "debit"
+    )
+    assert len(result["transactions"]) == 3
+    assert json.loads(frames[-1]) == {"response_text": "Done."}
+
+
+def test_agent_aggregates_with_the_grouping_tool(use_model, store, finance_info):
+    returns = []
+    use_model(
+        _tool_calling_model(
+            "aggregate_transactions", {"group_by": "type", "metric": "count"}, returns
+        )
+    )
+
+    _ask(finance_info, "How many transactions of each type do I have?")
+
+    assert returns == [store.group_by(store.filter(), "type", "count")]
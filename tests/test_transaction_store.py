@@ -0,0 +1,76 @@
+import uuid
+
+import numpy as np
+
+from app.model.finance_model import Transaction
+from app.services.transaction_service import TransactionStore
+
+NEW = {
+    "date": "2025-11-06T08:30:00",
+    "type": "debit",
+    "title": "Zepto",
+    "amount": 512.5,
+    "category": "other",
+}
+
+
+def test_build_fills_typed_columns(finance_info):
+    store = TransactionStore.from_finance_info(finance_info)
+    transactions = finance_info.transactions
+
+    assert len(store) == len(transactions)
+    assert store.amounts.dtype == np.float64
+    assert store.dates.dtype == np.dtype("datetime64[us]")
+    assert store.type_codes.dtype == np.int8
+    assert store.amounts.tolist() == [trans.amount for trans in transactions]
+    assert [store.types.labels[code] for code in store.type_codes] == [
+        trans.type.value for trans in transactions
+    ]
+    assert [store.date_of(i) for i in range(len(store))] == [
+        trans.date.replace(tzinfo=None) for trans in transactions
+    ]
+    assert store.id_set() == {trans.id.bytes for trans in transactions}
+
+
+def test_id_set_keeps_trailing_zero_bytes():
+    raw = uuid.UUID("6f1c2e0a-1111-4a8b-9c3d-000000000000")
+    store = TransactionStore.empty().extend([Transaction.model_validate({**NEW, "id": raw})])
+
+    assert store.id_set() == {raw.bytes}
+
+
+def test_extend_returns_a_new_store_sharing_vocabularies(finance_info):
+    store = TransactionStore.from_finance_info(finance_info)
+    merchants = store.merchant_codes.copy()
+    before = [store.row(i) for i in range(len(store))]
+
+    extended = store.extend([Transaction.model_validate(NEW)])
+
+    assert len(store) == len(before)
+    assert [store.row(i) for i in range(len(store))] == before
+    assert len(extended) == len(store) + 1
+    assert extended.types is store.types
+    assert extended.merchant_codes[: len(store)].tolist() == merchants.tolist()
+
+    row = extended.row(len(store))
+    assert (row["id"], row["type"], row["amount"], row["merchant"]) == (
+        None,
+        "debit",
+        512.5,
+        "Zepto",
+    )
+
+
+def test_extended_store_matches_a_full_build(finance_info):
+    extra = Transaction.model_validate(NEW)
+    extended = TransactionStore.from_finance_info(finance_info).extend([extra])
+    rebuilt = TransactionStore.from_finance_info(
+        finance_info.model_copy(update={"transactions": [*finance_info.transactions, extra]})
+    )
+
+    assert [extended.row(i) for i in range(len(extended))] == [
+        rebuilt.row(i) for i in range(len(rebuilt))
+    ]
+    assert extended.group_by(extended.filter(), "category") == rebuilt.group_by(
+        rebuilt.filter(), "category"
+    )